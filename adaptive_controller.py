@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自适应并发控制 - 按主机用 AIMD（加性增、乘性减）调整同时进行的请求数
+正常响应时并发窗口缓慢增大；429 / 503 或延迟明显高于基线时减半并按 Retry-After 暂停该主机，
+从而在服务器的实际承载能力附近运行，而不是依赖手工调好的暂停时间
+"""
+
+import time
+import weakref
+import threading
+from urllib.parse import urlsplit
+
+import requests
+
+from config import (
+    PER_HOST_LIMIT, ADAPTIVE_INITIAL_CONCURRENCY, ADAPTIVE_DECREASE,
+    ADAPTIVE_LATENCY_TOLERANCE, ADAPTIVE_DEFAULT_BACKOFF,
+)
+from retry_policy import RetryPolicy, classify_exception, parse_retry_after
+
+BACKOFF_STATUSES = (429, 503)
+
+
+class HostWindow:
+    def __init__(self, initial, max_limit):
+        self.limit = float(initial)
+        self.max_limit = max_limit
+        self.in_flight = 0
+        self.backoff_until = 0.0
+        self.baseline = None        # 观察到的最低延迟（秒）
+        self.latency = None         # 延迟的指数滑动平均（秒）
+        self.last_decrease = 0.0
+        self.requests = 0
+        self.backoffs = 0           # 429 / 503 次数
+        self.slowdowns = 0          # 因延迟升高而减小窗口的次数
+        self.errors = 0             # 连接错误和超时次数
+        self.peak = float(initial)
+
+
+class AdaptiveController:
+    def __init__(self, max_limit=PER_HOST_LIMIT, initial=ADAPTIVE_INITIAL_CONCURRENCY,
+                 decrease=ADAPTIVE_DECREASE, latency_tolerance=ADAPTIVE_LATENCY_TOLERANCE,
+                 default_backoff=ADAPTIVE_DEFAULT_BACKOFF, retry_policy=None):
+        self.max_limit = max(1, int(max_limit))
+        self.initial = min(max(1, int(initial)), self.max_limit)
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.default_backoff = default_backoff
+        # 重试由控制器按策略完成；RetrySession 通过 request_once 发送，避免两层重试
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self._condition = threading.Condition()
+        self._windows = {}
+
+    def _window(self, host):
+        window = self._windows.get(host)
+        if window is None:
+            window = self._windows[host] = HostWindow(self.initial, self.max_limit)
+        return window
+
+    def acquire(self, url):
+        """等待主机的并发窗口有空位且不在退避期内，返回主机名"""
+        host = urlsplit(url).netloc.lower()
+        with self._condition:
+            window = self._window(host)
+            while True:
+                now = time.monotonic()
+                if now < window.backoff_until:
+                    self._condition.wait(window.backoff_until - now)
+                elif window.in_flight >= int(window.limit):
+                    self._condition.wait()
+                else:
+                    break
+            window.in_flight += 1
+            window.requests += 1
+        return host
+
+    def release(self, host, status=None, latency=None, retry_after=None, error=False):
+        """请求结束后调用：根据状态码、延迟和 Retry-After 调整窗口"""
+        with self._condition:
+            window = self._window(host)
+            window.in_flight -= 1
+            now = time.monotonic()
+
+            if error or status in BACKOFF_STATUSES:
+                if error:
+                    window.errors += 1
+                else:
+                    window.backoffs += 1
+                    delay = retry_after if retry_after is not None else self.default_backoff
+                    window.backoff_until = max(window.backoff_until, now + delay)
+                self._decrease(window, now)
+            elif latency is not None:
+                window.latency = latency if window.latency is None else 0.8 * window.latency + 0.2 * latency
+                window.baseline = latency if window.baseline is None else min(window.baseline, latency)
+
+                if window.latency > window.baseline * self.latency_tolerance:
+                    if self._decrease(window, now):
+                        window.slowdowns += 1
+                else:
+                    # 加性增：每个窗口的请求全部正常完成后并发数约加一
+                    window.limit = min(window.max_limit, window.limit + 1.0 / window.limit)
+                    window.peak = max(window.peak, window.limit)
+
+            self._condition.notify_all()
+
+    def _decrease(self, window, now):
+        """乘性减；同一轮延迟内只减一次，避免同一批并发请求的多个信号把窗口压到最小"""
+        if now - window.last_decrease < (window.latency or 0.0):
+            return False
+        window.limit = max(1.0, window.limit * self.decrease)
+        window.last_decrease = now
+        return True
+
+    def request(self, session, method, url, throttle=None, **kwargs):
+        """在并发窗口内发送请求，失败时按重试策略重试
+
+        429 / 503 先按 Retry-After 暂停该主机（acquire 中等待），其余可重试的错误按策略退避；
+        throttle(url) 在每次发送前调用（例如 HostScheduler.wait）；重试用完后返回最后的响应或抛出异常。
+        stream=True 时返回的响应在读完响应体并关闭（response.close()）之前一直占用窗口中的名额，
+        记录的延迟为整个传输的时间，与非流式请求一致；调用方必须关闭流式响应
+        """
+        policy = self.retry_policy
+        send = getattr(session, 'request_once', session.request)
+        started = time.monotonic()
+        attempts = {}
+        while True:
+            host = self.acquire(url)
+            if throttle is not None:
+                throttle(url)
+
+            start = time.monotonic()
+            try:
+                response = send(method, url, **kwargs)
+            except requests.RequestException as e:
+                self.release(host, error=True)
+                delay = policy.next_delay(classify_exception(e), attempts, started)
+                if delay is None:
+                    e.retry_exhausted = True
+                    raise
+                time.sleep(delay)
+                continue
+
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            delay = policy.next_delay(policy.classify_status(response.status_code), attempts, started)
+            if delay is None:
+                if kwargs.get('stream'):
+                    self._release_on_close(response, host, start, retry_after)
+                else:
+                    self.release(host, response.status_code, time.monotonic() - start, retry_after)
+                return response
+            self.release(host, response.status_code, time.monotonic() - start, retry_after)
+            response.close()
+            if response.status_code not in BACKOFF_STATUSES:
+                time.sleep(delay)
+
+    def _release_on_close(self, response, host, start, retry_after):
+        """流式响应在关闭时才释放名额（传输中断记为错误）；调用方忘记关闭时在响应被回收时释放"""
+        status = response.status_code
+        state = {'released': False, 'failed': False}
+        lock = threading.Lock()
+
+        def finish():
+            with lock:
+                if state['released']:
+                    return
+                state['released'] = True
+            if state['failed']:
+                self.release(host, error=True)
+            else:
+                self.release(host, status, time.monotonic() - start, retry_after)
+
+        iter_content = response.iter_content
+        close = response.close
+
+        def tracked_iter_content(*args, **kwargs):
+            try:
+                yield from iter_content(*args, **kwargs)
+            except requests.RequestException:
+                state['failed'] = True
+                raise
+
+        def tracked_close():
+            try:
+                close()
+            finally:
+                finish()
+
+        response.iter_content = tracked_iter_content
+        response.close = tracked_close
+        weakref.finalize(response, finish)
+
+    def get(self, session, url, throttle=None, **kwargs):
+        return self.request(session, 'GET', url, throttle=throttle, **kwargs)
+
+    def metrics(self):
+        """各主机的状态：当前并发窗口、进行中的请求、退避事件和延迟"""
+        with self._condition:
+            now = time.monotonic()
+            return {
+                host: {
+                    'limit': round(window.limit, 2),
+                    'peak': round(window.peak, 2),
+                    'in_flight': window.in_flight,
+                    'requests': window.requests,
+                    'backoffs': window.backoffs,
+                    'slowdowns': window.slowdowns,
+                    'errors': window.errors,
+                    'backoff_remaining': round(max(0.0, window.backoff_until - now), 2),
+                    'latency_ms': round(window.latency * 1000, 1) if window.latency is not None else None,
+                    'baseline_ms': round(window.baseline * 1000, 1) if window.baseline is not None else None,
+                }
+                for host, window in self._windows.items()
+            }
+
+    def summary(self):
+        """一行汇总，用于爬取结束时输出"""
+        metrics = self.metrics()
+        if not metrics:
+            return "自适应并发: 无请求"
+        hosts = ", ".join(
+            f"{host} 并发 {item['limit']:g} (峰值 {item['peak']:g}), "
+            f"退避 {item['backoffs']} 次, 降速 {item['slowdowns']} 次"
+            for host, item in sorted(metrics.items())
+        )
+        return f"自适应并发: {hosts}"
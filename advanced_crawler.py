@@ -7,16 +7,28 @@
 
 import os
 import re
-import time
-import subprocess
 import tempfile
 from pathlib import Path
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urlparse
+
+from link_extractor import extract_links
+from rate_limiter import get_scheduler
+from download_engine import DownloadEngine
+from http_client import get_session
+from dom_cache import get_dom_cache
+from browser_service import get_browser_service
 
 class AdvancedLevelCrawler:
     def __init__(self, base_url="https://ydydj.univsport.com/level/Levelnotice"):
         self.base_url = base_url
         self.download_dir = "downloads"
+        self.scheduler = get_scheduler()
+        # 附件通过共享连接池下载，不再为每个文件启动 curl
+        self.download_engine = DownloadEngine(get_session(), scheduler=self.scheduler)
+        # 渲染结果缓存：打包文件未变化的页面不再重复启动浏览器
+        self.dom_cache = get_dom_cache()
+        # 常驻浏览器渲染服务，不再为每个URL启动一次 --dump-dom 浏览器进程
+        self.browser_service = get_browser_service()
         self.setup_directories()
         
     def setup_directories(self):
@@ -24,35 +36,19 @@ class AdvancedLevelCrawler:
         Path(self.download_dir).mkdir(exist_ok=True)
     
     def open_browser_and_save_page(self, url, output_file):
-        """使用浏览器打开页面并保存内容"""
-        try:
-            # 使用chromium-browser保存页面
-            result = subprocess.run([
-                'chromium-browser',
-                '--headless',
-                '--disable-gpu',
-                '--no-sandbox',
-                '--disable-dev-shm-usage',
-                '--window-size=1920,1080',
-                '--dump-dom',
-                url
-            ], capture_output=True, text=True, timeout=60)
-            
-            if result.returncode == 0:
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    f.write(result.stdout)
-                return True
-            else:
-                print(f"浏览器命令失败: {result.stderr}")
-                return False
-                
-        except subprocess.TimeoutExpired:
-            print("浏览器操作超时")
-            return False
-        except Exception as e:
-            print(f"浏览器操作失败: {e}")
+        """使用浏览器打开页面并保存内容（优先使用渲染结果缓存）"""
+        html = self.dom_cache.fetch(url, self.render_page)
+        if not html:
             return False
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(html)
+        return True
     
+    def render_page(self, url):
+        """用常驻浏览器服务渲染页面，返回渲染后的DOM；失败时返回 None"""
+        self.scheduler.wait(url)
+        return self.browser_service.render(url)
+
     def extract_links_from_html(self, html_file):
         """从HTML文件中提取链接"""
         try:
@@ -61,48 +57,21 @@ class AdvancedLevelCrawler:
             
             links = []
             
-            # 各种链接模式
-            link_patterns = [
-                (r'<a[^>]*href="([^"]*)"[^>]*>(.*?)</a>', "a标签"),
-                (r'<button[^>]*onclick="[^\"]*["\']([^"\']+)["\'][^>]*>(.*?)</button>', "按钮"),
-                (r'<div[^>]*onclick="[^\"]*["\']([^"\']+)["\'][^>]*>(.*?)</div>', "div点击"),
-                (r'<span[^>]*onclick="[^\"]*["\']([^"\']+)["\'][^>]*>(.*?)</span>', "span点击"),
-            ]
+            # 单遍提取：a标签链接和按钮/div/span的onclick链接
+            link_types = {'a': "a标签", 'button': "按钮", 'div': "div点击", 'span': "span点击"}
             
-            for pattern, link_type in link_patterns:
-                matches = re.findall(pattern, content, re.IGNORECASE | re.DOTALL)
-                for match in matches:
-                    if isinstance(match, tuple):
-                        href = match[0]
-                        text = match[1] if len(match) > 1 else ""
-                    else:
-                        href = match
-                        text = ""
-                    
-                    # 清理文本
-                    text = re.sub(r'<[^>]*>', '', text).strip()
-                    
-                    if href and not href.startswith(('javascript:', 'mailto:', 'tel:')):
-                        # 转换为绝对URL
-                        full_url = urljoin(self.base_url, href)
-                        
-                        links.append({
-                            'url': full_url,
-                            'text': text or self.get_link_text_from_url(full_url),
-                            'type': link_type,
-                            'original_href': href
-                        })
+            def is_candidate(link):
+                return link['tag'] in link_types and (link['kind'] == 'href') == (link['tag'] == 'a')
             
-            # 去重
-            unique_links = []
-            seen_urls = set()
+            for link in extract_links(content, self.base_url, kinds=('href', 'onclick'), accept=is_candidate):
+                links.append({
+                    'url': link['url'],
+                    'text': link['text'] or self.get_link_text_from_url(link['url']),
+                    'type': link_types[link['tag']],
+                    'original_href': link['original_href']
+                })
             
-            for link in links:
-                if link['url'] not in seen_urls:
-                    unique_links.append(link)
-                    seen_urls.add(link['url'])
-            
-            return unique_links
+            return links
             
         except Exception as e:
             print(f"解析HTML文件失败: {e}")
@@ -133,14 +102,11 @@ class AdvancedLevelCrawler:
         
         return any(url.lower().endswith(ext) for ext in downloadable_extensions)
     
-    def download_with_curl(self, url, output_file):
-        """使用curl下载文件"""
+    def download_file(self, url, output_file):
+        """下载文件（共享连接池，支持断点续传）"""
         try:
-            result = subprocess.run([
-                'curl', '-s', '-L', '-o', output_file, url
-            ], capture_output=True, timeout=60)
-            
-            return result.returncode == 0
+            result = self.download_engine.download(url, output_file)
+            return result['size'] > 0
             
         except Exception as e:
             print(f"下载失败: {e}")
@@ -195,7 +161,7 @@ class AdvancedLevelCrawler:
                     filename = self.sanitize_filename(link['text'] + ".pdf")
                     filepath = os.path.join(self.download_dir, filename)
                     
-                    if self.download_with_curl(link['url'], filepath):
+                    if self.download_file(link['url'], filepath):
                         file_size = os.path.getsize(filepath)
                         print(f"  ✓ 下载完成: {filename} ({file_size} 字节)")
                         total_downloaded += 1
@@ -230,7 +196,7 @@ class AdvancedLevelCrawler:
                                 
                                 filepath = os.path.join(category_dir, filename)
                                 
-                                if self.download_with_curl(dl_link['url'], filepath):
+                                if self.download_file(dl_link['url'], filepath):
                                     file_size = os.path.getsize(filepath)
                                     print(f"  ✓ 下载完成: {filename} ({file_size} 字节)")
                                     total_downloaded += 1
@@ -245,14 +211,15 @@ class AdvancedLevelCrawler:
                     os.unlink(second_temp_html)
                 else:
                     print("  无法访问第二层页面")
-                
-                # 短暂暂停
-                time.sleep(2)
             
             print(f"\n" + "=" * 60)
             print(f"爬虫运行完成!")
             print(f"总共处理了 {len(first_level_links)} 个第一层链接")
             print(f"总共下载了 {total_downloaded} 个文件")
+            print(self.scheduler.summary())
+            print(self.download_engine.session.pool_stats.summary())
+            print(self.dom_cache.summary())
+            print(self.browser_service.summary())
             print(f"文件保存在: {os.path.abspath(self.download_dir)}")
             print("=" * 60)
             
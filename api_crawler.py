@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON API爬取 - 直接请求站点的JSON接口，不解析HTML、不启动浏览器
+每个请求注入配置的访问令牌（请求头或查询参数），按 页码/每页条数 或 游标 翻页：
+第一个请求不带分页参数，响应中有总数、列表或游标字段时才翻页：总页数已知时其余页并发请求，
+未知时按批并发请求直到出现不满一页的结果；游标分页只能逐页请求。结果按页码顺序逐页返回，由调用方从中提取下载链接
+"""
+
+import os
+import json
+import math
+import time
+import threading
+from urllib.parse import urljoin, urlparse, parse_qsl, urlencode, urlunparse
+
+import requests
+
+from config import (
+    API_AUTH_TOKEN, API_AUTH_HEADER, API_AUTH_SCHEME, API_AUTH_PARAM,
+    API_PAGE_PARAM, API_SIZE_PARAM, API_CURSOR_PARAM, API_FIRST_PAGE, API_PAGE_SIZE,
+    API_MAX_PAGES, API_CONCURRENCY, API_TIMEOUT,
+)
+from http_client import get_session
+from concurrent_fetcher import ConcurrentFetcher
+
+# 响应中表示总条数、总页数、下一页游标和是否还有下一页的常见字段名
+TOTAL_KEYS = ('total', 'totalCount', 'total_count', 'totalElements', 'count')
+PAGES_KEYS = ('pages', 'totalPages', 'total_pages', 'pageCount')
+CURSOR_KEYS = ('nextCursor', 'next_cursor', 'nextPageToken', 'next')
+HAS_MORE_KEYS = ('hasMore', 'has_more', 'hasNext', 'has_next')
+# 这些字段下的字典也视为分页信息所在的位置（例如 {"code": 200, "data": {"total": 35, "records": [...]}}）
+WRAPPER_KEYS = ('data', 'result', 'page', 'pagination', 'meta')
+
+# 表示未登录 / 令牌失效的状态码（HTTP 状态码或响应体中的 code）
+AUTH_ERROR_CODES = (401, 403)
+
+
+def find_value(data, keys, accept=None):
+    """在响应顶层及 WRAPPER_KEYS 下的字典中查找第一个存在且不为 None 的字段（给出 accept 时还须 accept(值) 为真）"""
+    scopes = [data] if isinstance(data, dict) else []
+    for scope in list(scopes):
+        scopes.extend(scope[key] for key in WRAPPER_KEYS if isinstance(scope.get(key), dict))
+    for scope in scopes:
+        for key in keys:
+            value = scope.get(key)
+            if value is not None and (accept is None or accept(value)):
+                return value
+    return None
+
+
+def find_cursor(data):
+    """下一页的游标或URL：只接受非空字符串（'next' 等字段也可能是页码或布尔值，不是游标）"""
+    return find_value(data, CURSOR_KEYS, accept=lambda value: isinstance(value, str) and value != '')
+
+
+def as_int(value):
+    """把总条数 / 总页数字段转换为整数（可能是数字字符串），无法转换时返回 None"""
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def page_items(data, depth=3):
+    """响应中的列表数据：最长的列表（在嵌套的字典中查找，最多 depth 层）"""
+    if isinstance(data, list):
+        return data
+    best = []
+    if isinstance(data, dict) and depth > 0:
+        for value in data.values():
+            items = page_items(value, depth - 1) if isinstance(value, dict) else value
+            if isinstance(items, list) and len(items) > len(best):
+                best = items
+    return best
+
+
+def is_auth_error(status, data):
+    """HTTP 状态码或响应体中的 code 表示未登录 / 令牌失效"""
+    if status in AUTH_ERROR_CODES:
+        return True
+    # 响应体中的 code 可能是字符串（"401"）
+    return isinstance(data, dict) and str(data.get('code')) in {str(code) for code in AUTH_ERROR_CODES}
+
+
+def with_params(request, values):
+    """返回设置了分页参数的请求副本：请求体是JSON对象时写入请求体，否则写入URL的查询参数"""
+    request = dict(request)
+    data = request.get('data')
+    if data is not None:
+        try:
+            body = json.loads(data)
+        except (TypeError, ValueError):
+            body = None
+        if isinstance(body, dict):
+            body.update(values)
+            request['data'] = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            return request
+
+    parsed = urlparse(request['url'])
+    query = [(name, value) for name, value in parse_qsl(parsed.query, keep_blank_values=True)
+             if name not in values]
+    query.extend((name, str(value)) for name, value in values.items())
+    request['url'] = urlunparse(parsed._replace(query=urlencode(query)))
+    return request
+
+
+class ApiCrawler:
+    def __init__(self, session=None, token=None, page_size=API_PAGE_SIZE, max_pages=API_MAX_PAGES,
+                 concurrency=API_CONCURRENCY, timeout=API_TIMEOUT, scheduler=None):
+        self.session = session if session is not None else get_session()
+        self.token = token if token is not None else (API_AUTH_TOKEN or os.environ.get('API_AUTH_TOKEN', ''))
+        self.page_size = page_size
+        self.max_pages = max(1, int(max_pages))
+        self.concurrency = max(1, int(concurrency))
+        self.timeout = timeout
+        # 页面请求经有界并发抓取器发送（每主机并发上限 + 令牌桶限速）
+        self.fetcher = ConcurrentFetcher(max_workers=self.concurrency, scheduler=scheduler)
+        self._lock = threading.Lock()
+        self.pages = 0
+        self.items = 0
+        self.auth_failures = 0
+        self.elapsed = 0.0
+
+    def authorize(self, request):
+        """返回注入访问令牌后的请求副本；没有配置令牌时原样返回"""
+        if not self.token:
+            return request
+        if API_AUTH_PARAM:
+            return with_params(request, {API_AUTH_PARAM: self.token})
+        request = dict(request)
+        headers = dict(request.get('headers') or {})
+        # 捕获的请求中可能已有旧的令牌，按名称（不区分大小写）替换
+        headers = {name: value for name, value in headers.items() if name.lower() != API_AUTH_HEADER.lower()}
+        headers[API_AUTH_HEADER] = f"{API_AUTH_SCHEME} {self.token}" if API_AUTH_SCHEME else self.token
+        request['headers'] = headers
+        return request
+
+    def page_request(self, request, page=None, cursor=None):
+        """第 page 页（或游标 cursor 对应的页）的请求"""
+        if cursor is not None:
+            if cursor.startswith('http') or cursor.startswith('/'):
+                # 下一页直接给出了URL
+                return dict(request, url=urljoin(request['url'], cursor))
+            return with_params(request, {API_CURSOR_PARAM: cursor})
+        return with_params(request, {API_PAGE_PARAM: page, API_SIZE_PARAM: self.page_size})
+
+    def _send(self, url, request):
+        """发送一页请求（由 ConcurrentFetcher 在主机限制内调用），返回结果字典
+
+        结果包含 request、status、data（无法解析为JSON时为 None）、response、error、auth_error
+        """
+        kwargs = dict(request)
+        kwargs.setdefault('method', 'GET')
+        start = time.monotonic()
+        try:
+            response = self.session.request(timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            return {'request': request, 'status': None, 'data': None, 'response': None,
+                    'error': e, 'auth_error': False}
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+
+        auth_error = is_auth_error(response.status_code, data)
+        with self._lock:
+            self.pages += 1
+            self.elapsed += time.monotonic() - start
+            if auth_error:
+                self.auth_failures += 1
+            elif response.status_code == 200:
+                self.items += len(page_items(data))
+        return {'request': request, 'status': response.status_code, 'data': data, 'response': response,
+                'error': None, 'auth_error': auth_error}
+
+    def fetch(self, request):
+        """请求单独一页"""
+        return self.fetch_all([request])[0]
+
+    def fetch_all(self, page_requests):
+        """并发请求多页，结果按 page_requests 的顺序返回"""
+        return self.fetcher.map(self._send, [request['url'] for request in page_requests], page_requests)
+
+    def crawl(self, request):
+        """生成器：请求 request 对应的端点并翻页，按页码顺序逐页产出结果字典
+
+        第一个请求原样发送（不加分页参数，有的接口不接受未知参数，或者本身不分页）；
+        失败、认证失败、不是JSON或响应中没有总数、列表和游标字段时只产出这一个结果。
+        响应带游标时逐页跟随；带总数或列表时改为按 page_request 的页码 / 每页条数从第一页重新请求，
+        不带分页参数的结果不再产出（它与第一页重复）
+        """
+        request = self.authorize(request)
+        first = self.fetch(request)
+        if first['status'] != 200 or first['auth_error'] or first['data'] is None:
+            yield first
+            return
+
+        cursor = find_cursor(first['data'])
+        if cursor is not None:
+            yield first
+            yield from self._crawl_cursor(request, first['data'], cursor)
+            return
+
+        items = page_items(first['data'])
+        total = as_int(find_value(first['data'], TOTAL_KEYS))
+        total_pages = as_int(find_value(first['data'], PAGES_KEYS))
+        paged = total_pages is not None or total is not None or bool(items)
+        if not paged or find_value(first['data'], HAS_MORE_KEYS) is False or \
+                (total is not None and total <= len(items)) or (total_pages is not None and total_pages <= 1):
+            # 不分页，或者一次已经返回了全部数据
+            yield first
+            return
+
+        first = self.fetch(self.page_request(request, page=API_FIRST_PAGE))
+        yield first
+        if first['status'] != 200 or first['auth_error'] or first['data'] is None:
+            return
+        items = page_items(first['data'])
+        if not items or find_value(first['data'], HAS_MORE_KEYS) is False:
+            return
+        yield from self._crawl_pages(request, first['data'], items)
+
+    def _crawl_pages(self, request, first_data, first_items):
+        """页码分页：总页数已知时一次并发请求其余所有页，否则每批 concurrency 页直到数据取完"""
+        last_page = API_FIRST_PAGE + self.max_pages - 1
+        total_pages = as_int(find_value(first_data, PAGES_KEYS))
+        total = as_int(find_value(first_data, TOTAL_KEYS))
+        if total_pages is not None:
+            last_page = min(last_page, API_FIRST_PAGE + total_pages - 1)
+        elif total is not None:
+            # 服务器可能把每页条数限制得比请求的小，按第一页实际返回的条数计算
+            last_page = min(last_page, API_FIRST_PAGE + math.ceil(total / len(first_items)) - 1)
+        elif len(first_items) < self.page_size:
+            return
+        known = total_pages is not None or total is not None
+
+        previous = first_items
+        page = API_FIRST_PAGE + 1
+        while page <= last_page:
+            batch_end = last_page if known else min(last_page, page + self.concurrency - 1)
+            results = self.fetch_all([self.page_request(request, page=number)
+                                      for number in range(page, batch_end + 1)])
+            for result in results:
+                items = page_items(result['data'])
+                # 服务器忽略分页参数时每页内容相同，不再继续
+                if result['status'] != 200 or result['auth_error'] or items == previous:
+                    return
+                yield result
+                if not known and (len(items) < len(first_items) or
+                                  find_value(result['data'], HAS_MORE_KEYS) is False):
+                    return
+                previous = items
+            page = batch_end + 1
+
+    def _crawl_cursor(self, request, data, cursor):
+        """游标分页：每页的游标来自上一页的响应，只能逐页请求"""
+        seen = set()
+        for _ in range(self.max_pages - 1):
+            if not cursor or find_value(data, HAS_MORE_KEYS) is False:
+                return
+            if cursor in seen:
+                return
+            seen.add(cursor)
+            result = self.fetch(self.page_request(request, cursor=cursor))
+            if result['status'] != 200 or result['auth_error'] or result['data'] is None:
+                return
+            yield result
+            data = result['data']
+            cursor = find_cursor(data)
+
+    def summary(self):
+        """一行汇总，用于爬取结束时输出"""
+        with self._lock:
+            average = f"{self.elapsed / self.pages * 1000:.0f} ms" if self.pages else "无"
+            return (f"API爬取: 请求 {self.pages} 页 (平均 {average}), 列表数据 {self.items} 条, "
+                    f"认证失败 {self.auth_failures} 次")
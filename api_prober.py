@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并发API探测器 - 基于 asyncio 同时探测候选端点
+候选端点大多返回 404 或超时，逐个探测时大部分时间在空等；
+这里在全局并发上限内同时发出所有探测请求，按完成顺序返回结果。
+请求在工作线程中通过共享连接池发送（复用 keep-alive 连接，不引入额外的异步HTTP依赖）
+"""
+
+import json
+import time
+import queue
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from config import PROBE_CONCURRENCY, PROBE_TIMEOUT
+from http_client import get_session
+
+
+class ApiProber:
+    def __init__(self, session=None, concurrency=PROBE_CONCURRENCY, timeout=PROBE_TIMEOUT, scheduler=None):
+        self.session = session if session is not None else get_session()
+        self.concurrency = max(1, int(concurrency))
+        self.timeout = timeout
+        # 可选的 HostScheduler：每个探测请求发送前按主机限速
+        self.scheduler = scheduler
+
+    def fetch(self, url, method='GET', **kwargs):
+        """发送一个探测请求（在工作线程中执行），返回结果字典
+
+        结果包含 url、status、response、error、elapsed；连接失败或超时时 response 为 None。
+        探测只发送一次，不按重试策略重试，超时的候选端点不会拖长整体耗时
+        """
+        if self.scheduler is not None:
+            self.scheduler.wait(url)
+        kwargs.setdefault('timeout', self.timeout)
+        send = getattr(self.session, 'request_once', self.session.request)
+
+        start = time.monotonic()
+        try:
+            response = send(method, url, **kwargs)
+        except requests.RequestException as e:
+            return {'url': url, 'status': None, 'response': None, 'error': e,
+                    'elapsed': time.monotonic() - start}
+        return {'url': url, 'status': response.status_code, 'response': response, 'error': None,
+                'elapsed': time.monotonic() - start}
+
+    async def probe_async(self, urls, method='GET', **kwargs):
+        """异步生成器：同时探测 urls（最多 concurrency 个同时进行），按完成顺序产出结果
+
+        urls 中的元素可以是URL，也可以是请求参数字典（url、method、data、headers 等，
+        例如重放浏览器中捕获的请求），字典中的参数覆盖 method / kwargs，结果中的 request 为该字典
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='api-probe')
+
+        def send(item):
+            if not isinstance(item, dict):
+                return self.fetch(item, method, **kwargs)
+            options = {**kwargs, **item}
+            result = self.fetch(options.pop('url'), options.pop('method', method), **options)
+            result['request'] = item
+            return result
+
+        async def run(item):
+            async with semaphore:
+                return await loop.run_in_executor(executor, send, item)
+
+        unique = {}
+        for item in urls:
+            key = item if not isinstance(item, dict) else json.dumps(item, sort_keys=True, default=str)
+            unique.setdefault(key, item)
+        tasks = [asyncio.ensure_future(run(item)) for item in unique.values()]
+        try:
+            for future in asyncio.as_completed(tasks):
+                yield await future
+        finally:
+            # 调用方提前结束时取消尚未开始的探测
+            for task in tasks:
+                task.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def probe(self, urls, method='GET', **kwargs):
+        """同步接口：在后台线程运行事件循环，按完成顺序逐个返回结果（生成器）"""
+        results = queue.Queue()
+        finished = object()
+        stop = threading.Event()
+
+        async def pump():
+            probes = self.probe_async(urls, method, **kwargs)
+            try:
+                async for result in probes:
+                    results.put(result)
+                    if stop.is_set():
+                        break
+            except Exception as e:
+                results.put(e)
+            finally:
+                await probes.aclose()
+                results.put(finished)
+
+        thread = threading.Thread(target=asyncio.run, args=(pump(),), daemon=True)
+        thread.start()
+        try:
+            while True:
+                result = results.get()
+                if result is finished:
+                    return
+                if isinstance(result, Exception):
+                    raise result
+                yield result
+        finally:
+            stop.set()
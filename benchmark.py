@@ -0,0 +1,660 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能基准测试 - 使用本地HTTP夹具服务器，不访问目标网站
+用法: python benchmark.py [基准名称 ...]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import tracemalloc
+import urllib.request
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """本地夹具：/page/<n> 返回带PDF链接的页面，/file/<name> 返回固定大小的文件
+
+    文件响应支持 HEAD 和单区间 Range；bandwidth 为每个连接的限速（字节/秒）；
+    capacity 为同时处理的请求数（其余请求排队，延迟随之增加），排队的请求也超过 capacity 时返回 429 和 Retry-After
+    """
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True   # 与常见服务器一致，keep-alive 连接上头部和响应体分开写时不等待 ACK
+    latency = 0.05
+    file_size = 256 * 1024
+    bandwidth = None
+    write_size = 64 * 1024
+    capacity = None
+    retry_after = 1
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+    def do_GET(self, head=False):
+        if self.capacity is None:
+            self.respond(head)
+            return
+
+        server = self.server
+        with server.load_lock:
+            if server.slots is None:
+                server.slots = threading.Semaphore(self.capacity)
+            server.active += 1
+            overloaded = server.active > 2 * self.capacity
+            if overloaded:
+                server.rejected += 1
+        try:
+            if overloaded:
+                self.send_response(429)
+                self.send_header('Retry-After', str(self.retry_after))
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+            else:
+                with server.slots:
+                    self.respond(head)
+        finally:
+            with server.load_lock:
+                server.active -= 1
+
+    def respond(self, head=False):
+        time.sleep(self.latency)
+
+        if self.path.startswith('/page/'):
+            body = (
+                '<html><body>'
+                f'<a href="/file/{self.path.rsplit("/", 1)[-1]}.pdf">附件</a>'
+                '</body></html>'
+            ).encode('utf-8')
+            self.send_body(body, 'text/html; charset=utf-8', head)
+        elif self.path.startswith('/file/'):
+            body = b'%PDF-1.4\n' + bytes(range(256)) * (self.file_size // 256)
+            self.send_body(body[:self.file_size], 'application/pdf', head, ranges=True)
+        else:
+            self.send_error(404)
+
+    def send_body(self, body, content_type, head=False, ranges=False):
+        """发送响应体，ranges 为 True 时支持 Range 请求"""
+        status = 200
+        start, end = 0, len(body) - 1
+        range_header = self.headers.get('Range')
+
+        etag = f'"{len(body):x}"'
+        if_range = self.headers.get('If-Range')
+        if if_range and if_range != etag:
+            range_header = None
+
+        if ranges and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        if ranges and range_header and range_header.startswith('bytes='):
+            first, _, last = range_header[6:].partition('-')
+            start = int(first) if first else 0
+            end = min(int(last), end) if last else end
+            status = 206
+
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(end - start + 1))
+        if ranges:
+            self.send_header('Accept-Ranges', 'bytes')
+            self.send_header('ETag', etag)
+        if status == 206:
+            self.send_header('Content-Range', f"bytes {start}-{end}/{len(body)}")
+        self.end_headers()
+
+        if head:
+            return
+
+        view = memoryview(body)[start:end + 1]
+        for offset in range(0, len(view), self.write_size):
+            self.wfile.write(view[offset:offset + self.write_size])
+            if self.bandwidth:
+                time.sleep(self.write_size / self.bandwidth)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer:
+    def __init__(self, handler=FixtureHandler, **attrs):
+        if attrs:
+            handler = type('ConfiguredFixtureHandler', (handler,), attrs)
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.server.daemon_threads = True
+        self.server.active = 0
+        self.server.rejected = 0
+        self.server.load_lock = threading.Lock()
+        self.server.slots = None
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def timed(func, *args, **kwargs):
+    """执行函数并返回 (结果, 耗时秒数)"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def bench_second_level_pages(pages=40):
+    """PDFCrawler.crawl_second_level_pages：顺序抓取 vs 有界并发抓取"""
+    from pdf_crawler import PDFCrawler
+    from rate_limiter import HostScheduler
+
+    with FixtureServer() as server:
+        urls = [f"{server.base_url}/page/{i}" for i in range(pages)]
+
+        for label, workers in (("顺序 (1线程)", 1), ("并发 (8线程)", 8)):
+            # 本地夹具不限速，只比较并发带来的差异
+            crawler = PDFCrawler(max_workers=workers, per_host_limit=workers,
+                                 scheduler=HostScheduler(rate=0),
+                                 download_dir=tempfile.mkdtemp(prefix='bench_pdf_'))
+            try:
+                downloaded, elapsed = timed(crawler.crawl_second_level_pages, urls)
+            finally:
+                shutil.rmtree(crawler.download_dir, ignore_errors=True)
+            print(f"  {label}: {pages} 个页面, 下载 {downloaded} 个PDF, "
+                  f"耗时 {elapsed:.2f} 秒, {pages / elapsed:.1f} 页/秒")
+
+
+def bench_chunked_download(size_mb=32, bandwidth_mb=16):
+    """DownloadEngine：单连接流式下载 vs Range 并行分块下载（每连接限速）"""
+    from download_engine import DownloadEngine
+
+    size = size_mb * 1024 * 1024
+    with FixtureServer(latency=0.01, file_size=size, bandwidth=bandwidth_mb * 1024 * 1024) as server:
+        url = f"{server.base_url}/file/large.zip"
+        target_dir = tempfile.mkdtemp(prefix='bench_dl_')
+        try:
+            for label, workers in (("单连接", 1), ("4路分块", 4)):
+                engine = DownloadEngine(max_workers=workers, part_size=4 * 1024 * 1024,
+                                        min_split_size=8 * 1024 * 1024)
+                filepath = os.path.join(target_dir, f"large_{workers}.zip")
+                result, elapsed = timed(engine.download, url, filepath)
+                print(f"  {label}: {result['size'] / 1024 / 1024:.0f} MB, {result['parts']} 个分块, "
+                      f"耗时 {elapsed:.2f} 秒, {result['size'] / 1024 / 1024 / elapsed:.1f} MB/秒")
+        finally:
+            shutil.rmtree(target_dir, ignore_errors=True)
+
+
+def disk_usage(directory):
+    """统计目录实际占用的字节数（同一 inode 只计一次）"""
+    seen = set()
+    total = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            stat = os.stat(os.path.join(root, name))
+            if (stat.st_dev, stat.st_ino) not in seen:
+                seen.add((stat.st_dev, stat.st_ino))
+                total += stat.st_size
+    return total
+
+
+def bench_blob_store(files=20, size_kb=512):
+    """BlobStore：同一内容以不同文件名下载时的磁盘占用（普通写入 vs 内容寻址去重）"""
+    from blob_store import BlobStore
+    from download_engine import DownloadEngine
+
+    with FixtureServer(latency=0.005, file_size=size_kb * 1024) as server:
+        for label, use_store in (("普通写入", False), ("内容寻址", True)):
+            target_dir = tempfile.mkdtemp(prefix='bench_blob_')
+            try:
+                store = BlobStore(os.path.join(target_dir, 'blob_store')) if use_store else None
+                engine = DownloadEngine(blob_store=store)
+                start = time.perf_counter()
+                for i in range(files):
+                    engine.download(f"{server.base_url}/file/{i}.pdf",
+                                    os.path.join(target_dir, f"page_{i}_pdf_1.pdf"))
+                elapsed = time.perf_counter() - start
+                usage = disk_usage(target_dir)
+                if store is not None:
+                    store.close()
+                print(f"  {label}: {files} 个文件, 磁盘占用 {usage / 1024:.0f} KB, 耗时 {elapsed:.2f} 秒")
+            finally:
+                shutil.rmtree(target_dir, ignore_errors=True)
+
+
+# 替换前 final_crawler.extract_possible_links 使用的多遍正则，作为对照
+LEGACY_LINK_PATTERNS = [
+    r'<a[^>]*href="([^"]*)"[^>]*>(.*?)</a>',
+    r'<button[^>]*onclick="[^\"]*["\']([^"\']+)["\'][^>]*>(.*?)</button>',
+    r'<div[^>]*onclick="[^\"]*["\']([^"\']+)["\'][^>]*>(.*?)</div>',
+    r'<span[^>]*onclick="[^\"]*["\']([^"\']+)["\'][^>]*>(.*?)</span>',
+    r'window\.location\.href\s*=\s*["\']([^"\']+)["\']',
+]
+
+
+def legacy_regex_links(html_content, base_url, patterns=LEGACY_LINK_PATTERNS):
+    """多遍正则提取链接（每个模式扫描一次全文，逐个匹配去除标签）"""
+    import re
+    from urllib.parse import urljoin
+
+    links = {}
+    for pattern in patterns:
+        for match in re.findall(pattern, html_content, re.IGNORECASE | re.DOTALL):
+            href, text = match if isinstance(match, tuple) else (match, "")
+            text = re.sub(r'<[^>]*>', '', text).strip()
+            if href and not href.startswith(('javascript:', 'mailto:', 'tel:')):
+                links.setdefault(urljoin(base_url, href), text)
+    return links
+
+
+def rendered_notice_page(rows=2000):
+    """模拟渲染后的通知列表页：a标签、按钮onclick、嵌套标签和内联脚本"""
+    parts = ['<html><head><script>var x = 1;</script></head><body><div class="list">']
+    for i in range(rows):
+        parts.append(
+            f'<div class="row" onclick="go(\'/level/detail/{i}\')"><span class="date">2024-01-{i % 28 + 1:02d}</span>'
+            f'<a href="/level/notice/{i}.html" class="title"><b>第{i}号</b> 运动员技术等级公示</a>'
+            f'<button onclick="location.href=\'/files/{i}.pdf\'">下载</button></div>'
+        )
+    parts.append('</div><script>if (a) { window.location.href = "/level/Levelnotice"; }</script></body></html>')
+    return ''.join(parts)
+
+
+def bench_link_extraction(repeat=20):
+    """link_extractor.extract_links vs 多遍正则 + 逐个去标签（两边都只提取 a 标签的 href 和 window.location 跳转）"""
+    from link_extractor import extract_links
+
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    documents = []
+    for name in ('website_content.html', 'spa_index.html'):
+        with open(os.path.join(package_dir, name), 'r', encoding='utf-8') as f:
+            documents.append((name, f.read(), 2000))
+    documents.append(("模拟列表页 (2000行)", rendered_notice_page(), repeat))
+
+    base_url = "https://ydydj.univsport.com/level/Levelnotice"
+    # 原来的 onclick 正则在属性值中有引号时会截错目标，不作比较；两边的结果应完全一致
+    patterns = [LEGACY_LINK_PATTERNS[0], LEGACY_LINK_PATTERNS[-1]]
+    kinds = ('href', 'redirect')
+    accept = lambda link: link['tag'] in ('a', 'script')
+    for name, html, rounds in documents:
+        legacy, legacy_time = timed(lambda: [legacy_regex_links(html, base_url, patterns) for _ in range(rounds)])
+        single, single_time = timed(lambda: [extract_links(html, base_url, kinds=kinds, accept=accept)
+                                             for _ in range(rounds)])
+        same = list(legacy[0].items()) == [(link['url'], link['text']) for link in single[0]]
+        print(f"  {name} ({len(html) / 1024:.1f} KB): 多遍正则 {legacy_time / rounds * 1000:.2f} 毫秒/次 "
+              f"({len(legacy[0])} 个链接), 单遍解析 {single_time / rounds * 1000:.2f} 毫秒/次 "
+              f"({len(single[0])} 个链接, 结果{'一致' if same else '不一致'})")
+
+
+def dedup_list_rebuild(urls):
+    """替换前 system_crawler.extract_links_from_text 的去重：每个匹配都重建URL列表"""
+    links = []
+    for url in urls:
+        if url not in [l['url'] for l in links]:
+            links.append({'url': url})
+    return links
+
+
+def dedup_list_membership(urls):
+    """替换前 PDFCrawler.find_pdf_links 的去重：在列表中查找"""
+    links = []
+    for url in urls:
+        if url not in links:
+            links.append(url)
+    return links
+
+
+def dedup_link_set(urls):
+    """LinkSet：规范化键 + 哈希表"""
+    from link_set import LinkSet
+
+    links = LinkSet()
+    for url in urls:
+        links.add({'url': url})
+    return links.to_list()
+
+
+def bench_link_set(sizes=(10000, 100000), measured_limit=10000):
+    """LinkSet：有序集合去重 vs 列表去重（二次方复杂度）"""
+    strategies = [
+        ("列表重建", dedup_list_rebuild),
+        ("列表查找", dedup_list_membership),
+        ("LinkSet", dedup_link_set),
+    ]
+    measured = {}
+    for size in sizes:
+        # 约10%的重复链接，模拟JSON数据中同一附件被多处引用
+        urls = [f"https://ydydj.univsport.com/uploads/notice_{i % (size - size // 10)}.pdf"
+                for i in range(size)]
+        for label, func in strategies:
+            if func is dedup_link_set or size <= measured_limit:
+                result, elapsed = timed(func, urls)
+                measured[label] = (size, elapsed)
+                note = f"{len(result)} 个唯一链接"
+            else:
+                # 二次方算法在大规模下按已测结果平方外推
+                base_size, base_elapsed = measured[label]
+                elapsed = base_elapsed * (size / base_size) ** 2
+                note = f"按 {base_size} 条的结果平方外推"
+            print(f"  {size} 条 {label}: {elapsed:.3f} 秒 ({note})")
+
+
+def notice_url(i):
+    return f"https://ydydj.univsport.com/level/notice/detail?id={i}&page={i % 97}"
+
+
+def set_memory(size):
+    """保存 size 个URL的 set 新分配的字节数（含URL字符串本身）"""
+    tracemalloc.start()
+    visited = set(map(notice_url, range(size)))
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return allocated
+
+
+def bench_bloom_filter(sizes=(100000, 1000000), probes=100000):
+    """已访问集合：普通 set vs 可扩展布隆过滤器的内存占用和误判率"""
+    from bloom_filter import ScalableBloomFilter
+
+    strategies = [
+        ("set", set),
+        ("布隆 p=0.01", lambda: ScalableBloomFilter(error_rate=0.01)),
+        ("布隆 p=0.001", lambda: ScalableBloomFilter(error_rate=0.001)),
+    ]
+    for size in sizes:
+        for label, factory in strategies:
+            visited = factory()
+            start = time.perf_counter()
+            for i in range(size):
+                visited.add(notice_url(i))
+            elapsed = time.perf_counter() - start
+
+            # set 用 tracemalloc 统计（URL字符串只被集合引用），布隆过滤器只占位数组
+            memory = set_memory(size) if isinstance(visited, set) else visited.nbytes
+            false_positives = sum(1 for i in range(size, size + probes) if notice_url(i) in visited)
+            print(f"  {size} 条 {label}: {memory / 1024 / 1024:.1f} MB, 加入耗时 {elapsed:.2f} 秒, "
+                  f"误判率 {false_positives / probes:.3%}")
+
+def fetch_page(url):
+    with urllib.request.urlopen(url) as response:
+        return response.read()
+
+
+def bench_host_scheduler(requests_per_host=10, rate=2.0):
+    """每主机令牌桶 vs 固定 time.sleep()：主站和附件CDN两个主机，每个主机同样限速"""
+    from concurrent_fetcher import ConcurrentFetcher
+    from rate_limiter import HostScheduler
+
+    with FixtureServer() as site, FixtureServer() as cdn:
+        # 交替请求主站页面和CDN附件，两个主机的端口不同，视为不同主机
+        urls = []
+        for i in range(requests_per_host):
+            urls.append(f"{site.base_url}/page/{i}")
+            urls.append(f"{cdn.base_url}/file/{i}.pdf")
+
+        def sleep_between_requests():
+            for url in urls:
+                fetch_page(url)
+                time.sleep(1 / rate)
+
+        _, elapsed = timed(sleep_between_requests)
+        print(f"  固定暂停 {1 / rate:.1f} 秒: {len(urls)} 个请求, 耗时 {elapsed:.2f} 秒, "
+              f"等待 {len(urls) / rate:.1f} 秒")
+
+        scheduler = HostScheduler(rate=rate, burst=1, host_rates={})
+        fetcher = ConcurrentFetcher(max_workers=4, per_host_limit=2, scheduler=scheduler)
+        _, elapsed = timed(fetcher.map, fetch_page, urls)
+        print(f"  令牌桶 {rate:.0f} 请求/秒/主机: {len(urls)} 个请求, 耗时 {elapsed:.2f} 秒, "
+              f"各线程累计等待 {scheduler.total_wait:.1f} 秒")
+
+
+def bench_adaptive_concurrency(pages=300, capacity=3, workers=8):
+    """自适应并发（AIMD）vs 固定并发：服务器同时处理 capacity 个请求，排队过多时返回 429"""
+    import requests
+    from adaptive_controller import AdaptiveController
+    from concurrent_fetcher import ConcurrentFetcher
+    from rate_limiter import HostScheduler
+
+    # 固定并发 8：超过服务器容量；固定并发 1：手工调低的保守值；自适应：窗口上限 8
+    for label, threads, adaptive in (("固定并发", workers, False), ("固定并发", 1, False),
+                                     ("自适应并发", workers, True)):
+        with FixtureServer(capacity=capacity, latency=0.05) as server:
+            urls = [f"{server.base_url}/page/{i}" for i in range(pages)]
+            session = requests.Session()
+            controller = AdaptiveController(max_limit=workers)
+            fetcher = ConcurrentFetcher(max_workers=threads, per_host_limit=threads,
+                                        scheduler=HostScheduler(rate=0))
+
+            def fetch(url):
+                if adaptive:
+                    return controller.get(session, url, timeout=10).status_code
+                return session.get(url, timeout=10).status_code
+
+            statuses, elapsed = timed(fetcher.map, fetch, urls)
+            print(f"  {label} ({threads}线程): 成功 {statuses.count(200)}/{pages}, "
+                  f"服务器拒绝 {server.server.rejected} 次, 耗时 {elapsed:.2f} 秒")
+            if adaptive:
+                print(f"    {controller.summary()}")
+
+
+def bench_http_client(pages=300):
+    """每个URL启动一次 curl 子进程 vs 每次新建连接 vs 共享连接池（keep-alive），顺序请求"""
+    import subprocess
+    import requests
+    from http_client import create_session
+
+    with FixtureServer(latency=0) as server:
+        urls = [f"{server.base_url}/page/{i}" for i in range(pages)]
+
+        def curl_each():
+            for url in urls:
+                subprocess.run(['curl', '-s', '-L', url], capture_output=True, check=True)
+
+        def new_connection_each():
+            for url in urls:
+                requests.get(url, timeout=10).raise_for_status()
+
+        def pooled_session():
+            session = create_session()
+            for url in urls:
+                session.get(url, timeout=10).raise_for_status()
+
+        for label, func in (("curl 子进程", curl_each), ("requests.get 每次新建连接", new_connection_each),
+                            ("共享连接池", pooled_session)):
+            _, elapsed = timed(func)
+            print(f"  {label}: {pages} 个请求, 耗时 {elapsed:.2f} 秒, {pages / elapsed:.0f} 请求/秒")
+
+
+class ProbeHandler(FixtureHandler):
+    """候选API端点：/api/ 返回JSON，/slow/ 长时间不响应（超过探测超时），其余返回 404"""
+    hang = 3
+
+    def respond(self, head=False):
+        if self.path.startswith('/slow/'):
+            # 客户端早已超时断开，不再写响应
+            time.sleep(self.hang)
+            self.close_connection = True
+        elif self.path.startswith('/api/'):
+            time.sleep(self.latency)
+            self.send_body(b'{"data": []}', 'application/json', head)
+        else:
+            time.sleep(self.latency)
+            self.send_error(404)
+
+
+def bench_api_probe(candidates=40, slow=8, timeout=1.0):
+    """候选API端点：逐个探测 vs ApiProber 并发探测（大多数 404，部分超时）"""
+    import requests
+    from api_prober import ApiProber
+    from http_client import create_session
+
+    with FixtureServer(ProbeHandler) as server:
+        urls = [f"{server.base_url}/slow/{i}" for i in range(slow)]
+        urls += [f"{server.base_url}/api/{i}" for i in range(2)]
+        urls += [f"{server.base_url}/missing/{i}" for i in range(candidates - len(urls))]
+
+        def sequential():
+            session = requests.Session()
+            found = 0
+            for url in urls:
+                try:
+                    found += session.get(url, timeout=timeout).status_code == 200
+                except requests.RequestException:
+                    pass
+            return found
+
+        found, elapsed = timed(sequential)
+        print(f"  逐个探测: {len(urls)} 个候选, 可用 {found} 个, 耗时 {elapsed:.2f} 秒")
+
+        prober = ApiProber(create_session(), timeout=timeout)
+        results, elapsed = timed(lambda: list(prober.probe(urls)))
+        found = sum(1 for result in results if result['status'] == 200)
+        print(f"  并发探测 ({prober.concurrency} 并发): {len(urls)} 个候选, 可用 {found} 个, 耗时 {elapsed:.2f} 秒")
+
+
+class PagedApiHandler(FixtureHandler):
+    """分页JSON接口：/api/list?pageNum=&pageSize= 返回 {"data": {"total", "records"}}，每条记录带一个PDF链接"""
+    total = 1000
+
+    def respond(self, head=False):
+        import json
+        from urllib.parse import urlparse, parse_qs
+
+        query = {name: values[0] for name, values in parse_qs(urlparse(self.path).query).items()}
+        page, size = int(query.get('pageNum', 1)), int(query.get('pageSize', 10))
+        records = [{'title': f"通知{i}", 'fileUrl': f"/file/notice_{i}.pdf"}
+                   for i in range((page - 1) * size, min(page * size, self.total))]
+        time.sleep(self.latency)
+        body = json.dumps({'code': 200, 'data': {'total': self.total, 'records': records}})
+        self.send_body(body.encode('utf-8'), 'application/json', head)
+
+
+def bench_api_crawler(total=1000, page_size=50):
+    """api_crawler：逐页顺序翻页 vs ApiCrawler 并发翻页（总条数已知）"""
+    import requests
+    from api_crawler import ApiCrawler, page_items
+    from rate_limiter import HostScheduler
+
+    with FixtureServer(PagedApiHandler, total=total) as server:
+        url = f"{server.base_url}/api/list"
+
+        def sequential():
+            session = requests.Session()
+            records, page = 0, 1
+            while True:
+                data = session.get(url, params={'pageNum': page, 'pageSize': page_size}, timeout=10).json()
+                records += len(data['data']['records'])
+                if records >= data['data']['total']:
+                    return page, records
+                page += 1
+
+        (pages, records), elapsed = timed(sequential)
+        print(f"  逐页请求: {pages} 页 / {records} 条, 耗时 {elapsed:.2f} 秒")
+
+        crawler = ApiCrawler(requests.Session(), token='', page_size=page_size, scheduler=HostScheduler(rate=0))
+        results, elapsed = timed(lambda: list(crawler.crawl({'url': url, 'method': 'GET'})))
+        records = sum(len(page_items(result['data'])) for result in results)
+        print(f"  并发翻页 ({crawler.concurrency} 并发): {len(results)} 页 / {records} 条, 耗时 {elapsed:.2f} 秒")
+
+
+LEGACY_JS_PATTERNS = [
+    r'["\'](/api/[^"\']+)["\']', r'["\'](/data/[^"\']+)["\']', r'["\'](/json/[^"\']+)["\']',
+    r'["\'](/ajax/[^"\']+)["\']', r'["\'](/v[12]/[^"\']+)["\']', r'["\'](/rest/[^"\']+)["\']',
+    r'["\'](/notice/[^"\']+)["\']', r'["\'](/level/[^"\']+)["\']', r'["\'](/download/[^"\']+)["\']',
+    r'["\'](/file/[^"\']+)["\']',
+    r'"(/api/[^"]+)"', r'"(/level/[^"]+)"', r'url:\s*["\']([^"\']+)["\']',
+    r'fetch\(["\']([^"\']+)["\']', r'axios\.get\(["\']([^"\']+)["\']',
+]
+
+
+def legacy_js_scan(js_content):
+    """改动前的写法：每个端点正则各扫描一遍，每个关键词各复制一次小写全文"""
+    import re
+    from js_scanner import JS_KEYWORDS
+
+    endpoints = []
+    for pattern in LEGACY_JS_PATTERNS:
+        endpoints.extend(re.findall(pattern, js_content))
+    keywords = [keyword for keyword in JS_KEYWORDS if keyword.lower() in js_content.lower()]
+    return {'endpoints': list(dict.fromkeys(endpoints)), 'keywords': keywords}
+
+
+def bench_js_scanner(repeat=5):
+    """js_scanner：多遍正则 + 逐关键词 lower() vs 单遍扫描（字符串 / mmap / 分块）"""
+    from js_scanner import get_js_scanner
+
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    path = os.path.join(package_dir, 'system_downloads', 'ydydj.univsport.com', 'level', 'assets', 'index-I-BbFchG.js')
+    if not os.path.exists(path):
+        print(f"  未找到打包文件 {path}，跳过")
+        return
+    with open(path, 'rb') as f:
+        data = f.read()
+    js_content = data.decode('utf-8', 'replace')
+    scanner = get_js_scanner()
+
+    def chunks():
+        return (data[i:i + 64 * 1024] for i in range(0, len(data), 64 * 1024))
+
+    cases = [
+        ("多遍正则", lambda: legacy_js_scan(js_content)),
+        ("单遍扫描 (字符串)", lambda: scanner.scan(js_content)),
+        ("单遍扫描 (mmap)", lambda: scanner.scan_file(path)),
+        ("单遍扫描 (64KB 分块)", lambda: scanner.scan_chunks(chunks())),
+    ]
+    print(f"  {os.path.basename(path)} ({len(data) / 1024:.1f} KB)")
+    for name, func in cases:
+        results, elapsed = timed(lambda: [func() for _ in range(repeat)])
+        result = results[0]
+        print(f"    {name}: {elapsed / repeat * 1000:.1f} 毫秒/次 "
+              f"({len(result['endpoints'])} 个端点, {len(result['keywords'])} 个关键词)")
+
+
+BENCHMARKS = {
+    'second_level_pages': bench_second_level_pages,
+    'chunked_download': bench_chunked_download,
+    'blob_store': bench_blob_store,
+    'link_extraction': bench_link_extraction,
+    'link_set': bench_link_set,
+    'bloom_filter': bench_bloom_filter,
+    'host_scheduler': bench_host_scheduler,
+    'adaptive_concurrency': bench_adaptive_concurrency,
+    'http_client': bench_http_client,
+    'api_probe': bench_api_probe,
+    'api_crawler': bench_api_crawler,
+    'js_scanner': bench_js_scanner,
+}
+
+
+def main():
+    """主函数"""
+    # PDFCrawler 等模块在导入时会写日志文件，切换到临时目录运行
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    work_dir = tempfile.mkdtemp(prefix='bench_')
+    os.chdir(work_dir)
+
+    names = sys.argv[1:] or list(BENCHMARKS)
+    try:
+        for name in names:
+            func = BENCHMARKS[name]
+            print(f"\n[{name}] {func.__doc__}")
+            func()
+    finally:
+        os.chdir('/')
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内容寻址附件存储 - 按SHA-256摘要只保存一份文件内容
+人类可读的 分类/文件名 布局通过硬链接暴露，清单记录 路径 -> 摘要 的对应关系。
+下载目录中的文件与对象是同一个 inode，原地写入会同时改坏对象和所有指向它的文件，
+因此对象设为只读（0444）：更新文件必须写到新文件再替换（DownloadEngine 的 .part + 重命名即是如此）
+"""
+
+import os
+import time
+import shutil
+import sqlite3
+import hashlib
+import threading
+
+from config import BLOB_STORE_DIR
+
+HASH_CHUNK_SIZE = 1024 * 1024
+BLOB_MODE = 0o444
+
+
+def new_hasher():
+    """创建内容摘要使用的哈希对象"""
+    return hashlib.sha256()
+
+
+def hash_file(filepath, length=None):
+    """计算文件（或文件前 length 字节）的摘要"""
+    hasher = new_hasher()
+    update_hasher_from_file(hasher, filepath, length)
+    return hasher.hexdigest()
+
+
+def update_hasher_from_file(hasher, filepath, length=None):
+    """把文件内容（或前 length 字节）喂给哈希对象"""
+    remaining = length
+    with open(filepath, 'rb') as f:
+        while remaining is None or remaining > 0:
+            size = HASH_CHUNK_SIZE if remaining is None else min(HASH_CHUNK_SIZE, remaining)
+            chunk = f.read(size)
+            if not chunk:
+                break
+            hasher.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+
+
+class BlobStore:
+    def __init__(self, root=BLOB_STORE_DIR):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, 'manifest.db'), check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS manifest (
+                path TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                url TEXT,
+                size INTEGER,
+                updated_at REAL
+            )
+        """)
+        self._conn.commit()
+
+        # 本次运行的去重统计
+        self.stats = {'stored': 0, 'deduplicated': 0, 'bytes_saved': 0}
+
+    def blob_path(self, digest):
+        """摘要对应的对象路径（按前两位分目录）"""
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def has(self, digest):
+        """对象是否已存在"""
+        return os.path.exists(self.blob_path(digest))
+
+    def ingest(self, source_path, digest, dest_path, url=None):
+        """把已下载的临时文件放入存储，并在 dest_path 创建指向对象的链接
+
+        内容已存在时丢弃临时文件，不再保存第二份；返回是否为重复内容
+        """
+        blob_path = self.blob_path(digest)
+        size = os.path.getsize(source_path)
+
+        with self._lock:
+            deduplicated = os.path.exists(blob_path)
+            if deduplicated:
+                # 重复内容：丢弃新下载的这一份，改为链接到已有对象
+                if not os.path.samefile(source_path, blob_path):
+                    os.remove(source_path)
+                self.stats['deduplicated'] += 1
+                self.stats['bytes_saved'] += size
+            else:
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                shutil.move(source_path, blob_path)
+                os.chmod(blob_path, BLOB_MODE)
+                self.stats['stored'] += 1
+
+            self.link(blob_path, dest_path)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO manifest VALUES (?, ?, ?, ?, ?)",
+                (os.path.abspath(dest_path), digest, url, size, time.time())
+            )
+            self._conn.commit()
+
+        return deduplicated
+
+    def ingest_file(self, filepath, url=None):
+        """把已经存在的普通文件（例如curl下载的文件）转为指向对象的链接，返回是否为重复内容"""
+        return self.ingest(filepath, hash_file(filepath), filepath, url)
+
+    def link(self, blob_path, dest_path):
+        """在 dest_path 创建对象的硬链接，不支持硬链接时复制
+
+        先在同一目录下以临时名称创建链接，再用 os.replace 原子地替换 dest_path，
+        替换过程中 dest_path 始终存在（旧内容或新内容）
+        """
+        if os.path.exists(dest_path) and os.path.samefile(blob_path, dest_path):
+            return
+
+        dest_dir = os.path.dirname(dest_path)
+        if dest_dir:
+            os.makedirs(dest_dir, exist_ok=True)
+
+        temp_path = f"{dest_path}.{os.getpid()}.link"
+        try:
+            try:
+                os.link(blob_path, temp_path)
+            except OSError:
+                # 跨文件系统或文件系统不支持硬链接
+                shutil.copy2(blob_path, temp_path)
+            os.replace(temp_path, dest_path)
+        finally:
+            if os.path.lexists(temp_path):
+                os.remove(temp_path)
+
+    def lookup(self, dest_path):
+        """查询清单中某个路径对应的摘要"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest FROM manifest WHERE path = ?", (os.path.abspath(dest_path),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        """关闭清单数据库"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+布隆过滤器 - 大规模爬取时代替保存完整URL字符串的 visited 集合
+位数组保存在 bytearray 中，或者 mmap 到文件以便中断后继续使用；
+可扩展布隆过滤器在容量用完时追加更大、误判率更低的新层，总误判率不超过设定值
+"""
+
+import os
+import math
+import mmap
+import struct
+import hashlib
+
+from config import VISITED_BACKEND, BLOOM_ERROR_RATE, BLOOM_INITIAL_CAPACITY
+
+# 文件头：魔数、容量、误判率、已加入数量、位数、哈希函数个数
+HEADER = struct.Struct('<8sQdQQI4x')
+COUNT_OFFSET = 24
+MAGIC = b'BLOOMv1\x00'
+
+
+def item_hashes(item):
+    """元素的两个64位哈希值，各层按双重哈希由它们生成位位置"""
+    if isinstance(item, str):
+        item = item.encode('utf-8')
+    h1, h2 = struct.unpack('<QQ', hashlib.blake2b(item, digest_size=16).digest())
+    return h1, h2 | 1
+
+
+def filter_size(capacity, error_rate):
+    """按容量和误判率计算 (位数, 哈希函数个数)"""
+    bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+    hashes = max(1, round(bits / capacity * math.log(2)))
+    return bits, hashes
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=BLOOM_ERROR_RATE, path=None):
+        self.path = path
+        self._file = None
+
+        if path is not None and os.path.exists(path):
+            self._open_file(path)
+            return
+
+        self.capacity = int(capacity)
+        self.error_rate = error_rate
+        self.count = 0
+        self.num_bits, self.num_hashes = filter_size(self.capacity, error_rate)
+        size = (self.num_bits + 7) // 8
+
+        if path is None:
+            self._bits = bytearray(size)
+        else:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, self.capacity, error_rate, 0, self.num_bits, self.num_hashes))
+                f.truncate(HEADER.size + size)
+            self._open_file(path)
+
+    def _open_file(self, path):
+        """映射已有的过滤器文件"""
+        self._file = open(path, 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, self.capacity, self.error_rate, self.count, self.num_bits, self.num_hashes = \
+            HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"不是布隆过滤器文件: {path}")
+        self._bits = memoryview(self._map)[HEADER.size:]
+
+    def _positions(self, hashes):
+        """双重哈希生成 num_hashes 个位位置"""
+        h1, h2 = hashes
+        num_bits = self.num_bits
+        return [(h1 + i * h2) % num_bits for i in range(self.num_hashes)]
+
+    def add(self, item):
+        """加入元素；之前不存在（所有位未全部置位）时返回 True"""
+        return self.add_hashes(item_hashes(item))
+
+    def add_hashes(self, hashes):
+        """按 item_hashes() 的结果加入元素"""
+        bits = self._bits
+        added = False
+        for position in self._positions(hashes):
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                added = True
+        if added:
+            self.count += 1
+            if self._file is not None:
+                # 位数组已经直接写入映射，数量也同步写回文件头，进程被中断时不会丢失
+                struct.pack_into('<Q', self._map, COUNT_OFFSET, self.count)
+        return added
+
+    def __contains__(self, item):
+        return self.contains_hashes(item_hashes(item))
+
+    def contains_hashes(self, hashes):
+        """按 item_hashes() 的结果判断元素是否（可能）存在"""
+        bits = self._bits
+        for position in self._positions(hashes):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def is_full(self):
+        """加入数量达到设计容量后误判率会超过设定值"""
+        return self.count >= self.capacity
+
+    @property
+    def nbytes(self):
+        """位数组占用的字节数"""
+        return len(self._bits)
+
+    def clear(self):
+        """清空所有位"""
+        self._bits[:] = bytes(len(self._bits))
+        self.count = 0
+        if self._file is not None:
+            struct.pack_into('<Q', self._map, COUNT_OFFSET, 0)
+
+    def flush(self):
+        """把映射的内容刷新到磁盘（仅文件模式）"""
+        if self._file is not None:
+            self._map.flush()
+
+    def close(self):
+        """关闭映射文件"""
+        if self._file is not None:
+            self.flush()
+            self._bits.release()
+            self._map.close()
+            self._file.close()
+            self._file = None
+
+
+class ScalableBloomFilter:
+    def __init__(self, initial_capacity=BLOOM_INITIAL_CAPACITY, error_rate=BLOOM_ERROR_RATE,
+                 growth=2, tightening=0.5, directory=None):
+        self.initial_capacity = int(initial_capacity)
+        self.error_rate = error_rate
+        self.growth = growth
+        self.tightening = tightening
+        self.directory = directory
+        self.filters = []
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            # 重新打开已有的各层
+            while os.path.exists(self._layer_path(len(self.filters))):
+                self.filters.append(BloomFilter(0, path=self._layer_path(len(self.filters))))
+
+    def _layer_path(self, index):
+        return os.path.join(self.directory, f"layer_{index:02d}.bloom") if self.directory else None
+
+    def _add_layer(self):
+        """追加新层：容量按 growth 增长，误判率按 tightening 收紧，使总误判率收敛于 error_rate"""
+        index = len(self.filters)
+        capacity = self.initial_capacity * (self.growth ** index)
+        error_rate = self.error_rate * (1 - self.tightening) * (self.tightening ** index)
+        layer = BloomFilter(capacity, error_rate, path=self._layer_path(index))
+        self.filters.append(layer)
+        return layer
+
+    def add(self, item):
+        """加入元素；之前不存在时返回 True"""
+        hashes = item_hashes(item)
+        if any(layer.contains_hashes(hashes) for layer in self.filters[:-1]):
+            return False
+        layer = self.filters[-1] if self.filters else None
+        if layer is not None and layer.is_full:
+            if layer.contains_hashes(hashes):
+                return False
+            layer = None
+        if layer is None:
+            layer = self._add_layer()
+        # 最后一层的检查和置位合并为一次：所有位都已置位说明已经存在
+        return layer.add_hashes(hashes)
+
+    def __contains__(self, item):
+        hashes = item_hashes(item)
+        return any(layer.contains_hashes(hashes) for layer in reversed(self.filters))
+
+    def __len__(self):
+        return sum(len(layer) for layer in self.filters)
+
+    @property
+    def nbytes(self):
+        """所有层位数组占用的字节数"""
+        return sum(layer.nbytes for layer in self.filters)
+
+    def clear(self):
+        """删除所有层"""
+        for index, layer in enumerate(self.filters):
+            layer.close()
+            if self.directory is not None:
+                os.remove(self._layer_path(index))
+        self.filters = []
+
+    def flush(self):
+        for layer in self.filters:
+            layer.flush()
+
+    def close(self):
+        for layer in self.filters:
+            layer.close()
+
+
+def create_visited_set(directory=None):
+    """按配置创建 visited 集合：'set' 为普通集合，'bloom' 为可扩展布隆过滤器（指定目录时保存到文件）"""
+    if VISITED_BACKEND == 'bloom':
+        return ScalableBloomFilter(directory=directory)
+    return set()
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+浏览器实例池 - Selenium 爬虫共用的无头 Chrome
+第二层页面放入工作队列，由池中的多个浏览器并行渲染；浏览器用完后重置并放回池中，
+同一进程内的多次爬取复用已启动的浏览器，不必每次都付出 Chrome 启动时间
+"""
+
+import os
+import time
+import queue
+import atexit
+import threading
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+from selenium_waits import install_wait_hooks
+from cdp_capture import enable_performance_log
+from resource_blocker import configure_options, block_resources
+from config import HEADLESS, WINDOW_SIZE, PAGE_LOAD_TIMEOUT, BROWSER_POOL_SIZE, BROWSER_MAX_USES, CDP_CAPTURE
+
+CHROMIUM_SNAP = '/snap/bin/chromium'
+
+
+def chrome_options(headless=HEADLESS):
+    """池中浏览器使用的 Chrome 选项"""
+    options = Options()
+    if headless:
+        options.add_argument('--headless=new')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--disable-gpu')
+    options.add_argument(f'--window-size={WINDOW_SIZE}')
+    options.add_argument('--disable-blink-features=AutomationControlled')
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+    if CDP_CAPTURE:
+        enable_performance_log(options)
+    configure_options(options)
+    return options
+
+
+def create_driver(headless=HEADLESS):
+    """启动一个 Chrome：依次尝试 webdriver_manager 安装的驱动、系统驱动和 snap 版 Chromium"""
+    options = chrome_options(headless)
+    try:
+        from webdriver_manager.chrome import ChromeDriverManager
+        from selenium.webdriver.chrome.service import Service
+        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+    except Exception:
+        try:
+            driver = webdriver.Chrome(options=options)
+        except Exception:
+            if not os.path.exists(CHROMIUM_SNAP):
+                raise
+            options.binary_location = CHROMIUM_SNAP
+            driver = webdriver.Chrome(options=options)
+
+    driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+    try:
+        # 每个新文档加载前隐藏 navigator.webdriver
+        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
+            'source': "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})",
+        })
+    except Exception:
+        pass
+    install_wait_hooks(driver)
+    # 渲染时不加载字体、图片、媒体和样式表（见 config.BLOCK_RESOURCES）
+    block_resources(driver)
+    return driver
+
+
+def quit_quietly(driver):
+    """关闭浏览器，忽略已经崩溃或断开的会话"""
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+class BrowserPool:
+    def __init__(self, size=BROWSER_POOL_SIZE, factory=create_driver, max_uses=BROWSER_MAX_USES):
+        self.size = max(1, int(size))
+        self.factory = factory
+        # 每个浏览器最多借出的次数，之后关闭并重新启动，避免长时间运行后内存持续增长
+        self.max_uses = max_uses
+        self._condition = threading.Condition()
+        self._idle = []             # 空闲浏览器（后进先出，优先使用最近用过的）
+        self._uses = {}             # 浏览器 -> 已借出次数
+        self._implicit_waits = {}   # 浏览器 -> 创建时的隐式等待（秒），归还时恢复
+        self._count = 0             # 已启动和正在启动的浏览器数
+        self._closed = False
+        self.created = 0
+        self.reused = 0
+        self.recycled = 0
+
+    def acquire(self, timeout=None):
+        """借出一个浏览器：优先复用空闲的，未达到 size 时启动新的，否则等待归还"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("浏览器池已关闭")
+                if self._idle:
+                    driver = self._idle.pop()
+                    break
+                if self._count < self.size:
+                    self._count += 1
+                    driver = None
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("等待空闲浏览器超时")
+                self._condition.wait(remaining)
+
+        if driver is not None:
+            if self.alive(driver):
+                with self._condition:
+                    self.reused += 1
+                return driver
+            # 空闲期间崩溃的浏览器：在原来的名额上重新启动
+            quit_quietly(driver)
+            with self._condition:
+                self._uses.pop(driver, None)
+                self._implicit_waits.pop(driver, None)
+
+        try:
+            driver = self.factory()
+        except Exception:
+            with self._condition:
+                self._count -= 1
+                self._condition.notify()
+            raise
+        implicit_wait = self._implicit_wait(driver)
+        with self._condition:
+            self._uses[driver] = 0
+            self._implicit_waits[driver] = implicit_wait
+            self.created += 1
+        return driver
+
+    def release(self, driver, broken=False):
+        """归还浏览器：重置到空白页后放回池中；损坏、达到使用次数上限或池已关闭时关闭它"""
+        with self._condition:
+            uses = self._uses.get(driver, 0) + 1
+            self._uses[driver] = uses
+            recycle = broken or self._closed or (self.max_uses and uses >= self.max_uses)
+
+        if not recycle and not self._reset(driver):
+            recycle = True
+
+        if recycle:
+            quit_quietly(driver)
+            with self._condition:
+                self._uses.pop(driver, None)
+                self._implicit_waits.pop(driver, None)
+                self._count -= 1
+                if not self._closed:
+                    self.recycled += 1
+                self._condition.notify()
+        else:
+            with self._condition:
+                self._idle.append(driver)
+                self._condition.notify()
+
+    def alive(self, driver):
+        """浏览器会话是否仍然可用"""
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def _implicit_wait(self, driver):
+        """浏览器当前的隐式等待（秒）；无法读取时按 0 处理"""
+        try:
+            return driver.timeouts.implicit_wait
+        except Exception:
+            return 0
+
+    def _reset(self, driver):
+        """关闭多余的标签页、恢复创建时的隐式等待并回到空白页；失败时返回 False"""
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            # 调用方可能修改过隐式等待，恢复为创建时的值
+            with self._condition:
+                implicit_wait = self._implicit_waits.get(driver, 0)
+            driver.implicitly_wait(implicit_wait)
+            driver.get('about:blank')
+            return True
+        except Exception:
+            return False
+
+    def map(self, func, items, return_exceptions=False, default=None):
+        """工作队列：最多 size 个浏览器并行执行 func(driver, item)，结果按 items 的顺序返回
+
+        每个工作线程借出一个浏览器并连续处理队列中的任务，浏览器崩溃时换一个新的继续；
+        return_exceptions 为 True 时，失败任务的位置返回异常对象而不是抛出。
+        某个工作线程无法启动浏览器时，它取出的任务放回队列由其他线程处理；
+        所有浏览器都无法启动时，未处理的任务在 default 不为 None 时取 default()（例如 list），
+        否则按 return_exceptions 返回或抛出启动失败的异常。
+        调用方自己借出的浏览器应先归还，否则 size 为 1 时工作线程会一直等待
+        """
+        items = list(items)
+        pending = object()
+        results = [pending] * len(items)
+        work = queue.Queue()
+        for i, item in enumerate(items):
+            work.put((i, item))
+        errors = []
+        start_errors = []
+
+        def worker():
+            driver = None
+            try:
+                while not errors:
+                    try:
+                        i, item = work.get_nowait()
+                    except queue.Empty:
+                        return
+                    if driver is None:
+                        try:
+                            driver = self.acquire()
+                        except Exception as e:
+                            # 无法启动浏览器：任务放回队列，交给已有浏览器的线程
+                            start_errors.append(e)
+                            work.put((i, item))
+                            return
+                    try:
+                        results[i] = func(driver, item)
+                    except Exception as e:
+                        if not return_exceptions:
+                            errors.append(e)
+                            return
+                        results[i] = e
+                        if not self.alive(driver):
+                            self.release(driver, broken=True)
+                            driver = None
+            finally:
+                if driver is not None:
+                    self.release(driver)
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(min(self.size, len(items)))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            raise errors[0]
+        for i, result in enumerate(results):
+            if result is pending:
+                if default is not None:
+                    results[i] = default()
+                elif return_exceptions:
+                    results[i] = start_errors[0]
+                else:
+                    raise start_errors[0]
+        if start_errors:
+            print(f"浏览器启动失败 {len(start_errors)} 次: {start_errors[0]}")
+        return results
+
+    def close(self):
+        """关闭所有空闲浏览器；仍在使用的浏览器归还时关闭"""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._count -= len(idle)
+            for driver in idle:
+                self._uses.pop(driver, None)
+                self._implicit_waits.pop(driver, None)
+            self._condition.notify_all()
+        for driver in idle:
+            quit_quietly(driver)
+
+    def summary(self):
+        """一行汇总，用于爬取结束时输出"""
+        with self._condition:
+            return (f"浏览器池: 共启动 {self.created} 个浏览器, 复用 {self.reused} 次, "
+                    f"重启 {self.recycled} 次, 当前 {self._count}/{self.size} 个")
+
+
+_shared_pool = None
+_shared_lock = threading.Lock()
+
+
+def get_browser_pool():
+    """进程内共享的浏览器池，进程退出时关闭所有浏览器"""
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = BrowserPool()
+            atexit.register(_shared_pool.close)
+        return _shared_pool
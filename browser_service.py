@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常驻浏览器渲染服务 - 代替每个URL启动一次 chromium --dump-dom
+渲染请求进入队列，由浏览器池中常驻的无头 Chrome 依次打开（chromedriver 通过 DevTools 协议驱动），
+页面就绪后返回渲染后的DOM；浏览器进程和渲染进程在请求之间复用，每个URL只付出页面本身的加载时间。
+无法启动 Selenium 浏览器时退回到逐个URL的 --dump-dom 子进程
+"""
+
+import time
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from browser_pool import get_browser_pool
+from selenium_waits import wait_until_ready
+from config import RENDER_WAIT_TIMEOUT, RENDER_FALLBACK_TIMEOUT
+
+# 退回 --dump-dom 时依次尝试的浏览器命令
+DUMP_DOM_BROWSERS = ('chromium-browser', 'google-chrome', 'chromium')
+
+
+def dump_dom(url, timeout=RENDER_FALLBACK_TIMEOUT):
+    """启动一次无头浏览器输出渲染后的DOM；所有浏览器命令都失败时返回 None"""
+    for browser in DUMP_DOM_BROWSERS:
+        try:
+            result = subprocess.run([
+                browser,
+                '--headless',
+                '--disable-gpu',
+                '--no-sandbox',
+                '--disable-dev-shm-usage',
+                '--window-size=1920,1080',
+                '--dump-dom',
+                url
+            ], capture_output=True, text=True, timeout=timeout)
+        except FileNotFoundError:
+            continue
+        except subprocess.TimeoutExpired:
+            print(f"浏览器渲染超时: {url}")
+            return None
+        if result.returncode == 0:
+            return result.stdout
+        print(f"浏览器命令失败: {result.stderr}")
+    return None
+
+
+class BrowserService:
+    def __init__(self, pool=None, wait_timeout=RENDER_WAIT_TIMEOUT):
+        self.pool = pool if pool is not None else get_browser_pool()
+        # 页面加载后等待网络空闲和DOM静止的最长时间
+        self.wait_timeout = wait_timeout
+        # 渲染请求队列：最多同时使用池中的 size 个浏览器
+        self._executor = ThreadPoolExecutor(max_workers=self.pool.size, thread_name_prefix='render')
+        self._lock = threading.Lock()
+        self.available = True   # 启动浏览器失败后改为 False，之后的请求直接使用 --dump-dom
+        self.rendered = 0
+        self.fallbacks = 0
+        self.failed = 0
+        self.render_time = 0.0
+
+    def render(self, url):
+        """渲染页面并返回DOM（在调用线程中执行）；失败时返回 None"""
+        start = time.monotonic()
+        html = self._render_with_pool(url) if self.available else None
+        if html is None and not self.available:
+            html = dump_dom(url)
+            with self._lock:
+                self.fallbacks += 1
+        with self._lock:
+            if html is None:
+                self.failed += 1
+            else:
+                self.rendered += 1
+                self.render_time += time.monotonic() - start
+        return html
+
+    def _render_with_pool(self, url):
+        """在池中的常驻浏览器上打开页面，等待就绪后读取DOM"""
+        try:
+            driver = self.pool.acquire()
+        except Exception as e:
+            print(f"无法启动常驻浏览器，改用 --dump-dom: {e}")
+            self.available = False
+            return None
+
+        broken = False
+        try:
+            driver.get(url)
+            wait_until_ready(driver, timeout=self.wait_timeout)
+            return driver.page_source
+        except Exception as e:
+            print(f"浏览器渲染失败 {url}: {e}")
+            broken = not self.pool.alive(driver)
+            return None
+        finally:
+            self.pool.release(driver, broken=broken)
+
+    def submit(self, url):
+        """把渲染请求放入队列，返回 Future"""
+        return self._executor.submit(self.render, url)
+
+    def map(self, urls, render=None):
+        """并行渲染多个URL，结果按 urls 的顺序返回；render 可替换为带缓存等包装的渲染函数"""
+        return list(self._executor.map(render or self.render, urls))
+
+    def summary(self):
+        """一行汇总，用于爬取结束时输出"""
+        with self._lock:
+            average = f"{self.render_time / self.rendered:.2f} 秒" if self.rendered else "无"
+            return (f"渲染服务: 渲染 {self.rendered} 个页面 (平均 {average}), "
+                    f"--dump-dom {self.fallbacks} 次, 失败 {self.failed} 次")
+
+
+_shared_service = None
+_shared_lock = threading.Lock()
+
+
+def get_browser_service():
+    """进程内共享的渲染服务（使用共享的浏览器池）"""
+    global _shared_service
+    with _shared_lock:
+        if _shared_service is None:
+            _shared_service = BrowserService()
+        return _shared_service
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+网络层API捕获 - 通过 Chrome DevTools Protocol 记录SPA渲染时发出的 XHR / fetch 请求
+开启 CDP_CAPTURE 后，池中的浏览器打开性能日志（包含 Network.* 事件），
+爬虫在页面就绪后读取日志，记录每个请求的方法、URL、请求头、请求体、状态码和响应体，
+合并保存到 CDP_CAPTURE_FILE；之后的运行不启动浏览器，直接用普通HTTP请求重放这些端点
+"""
+
+import os
+import json
+import time
+import threading
+
+from config import CDP_CAPTURE, CDP_CAPTURE_FILE, CDP_CAPTURE_MAX_BODY, CDP_CAPTURE_KEEP_AUTH
+
+# 只记录页面脚本发出的请求（文档、脚本、图片等资源不是API）
+CAPTURE_TYPES = ('XHR', 'Fetch')
+
+# 重放时不发送的请求头：由HTTP客户端生成、属于浏览器会话或HTTP/2伪头
+SKIP_REPLAY_HEADERS = {'host', 'content-length', 'connection', 'accept-encoding', 'cookie', 'user-agent'}
+
+# 携带登录凭据的请求头：除非开启 CDP_CAPTURE_KEEP_AUTH，否则不写入捕获文件
+CREDENTIAL_HEADERS = {'authorization', 'proxy-authorization', 'cookie'}
+
+
+def enable_performance_log(options):
+    """让 Chrome 记录性能日志（chromedriver 默认在其中包含 Network.* 事件）"""
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    return options
+
+
+def load_captured(path=CDP_CAPTURE_FILE):
+    """读取之前捕获的请求列表；文件不存在或损坏时返回空列表"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def replay_request(entry):
+    """把捕获的请求转换为请求参数字典（url、method、headers、data），可交给 ApiProber 或 session.request"""
+    headers = {name: value for name, value in (entry.get('headers') or {}).items()
+               if not name.startswith(':') and name.lower() not in SKIP_REPLAY_HEADERS}
+    request = {'url': entry['url'], 'method': entry.get('method', 'GET'), 'headers': headers}
+    if entry.get('post_data') is not None:
+        request['data'] = entry['post_data'].encode('utf-8')
+    return request
+
+
+def strip_credentials(headers):
+    """返回去掉凭据请求头（Authorization、Cookie 等）后的请求头副本"""
+    return {name: value for name, value in headers.items() if name.lower() not in CREDENTIAL_HEADERS}
+
+
+def entry_key(entry):
+    """同一方法、URL和请求体的请求只保留最新的一条"""
+    return (entry.get('method'), entry.get('url'), entry.get('post_data'))
+
+
+class NetworkCapture:
+    def __init__(self, path=CDP_CAPTURE_FILE, enabled=CDP_CAPTURE, max_body=CDP_CAPTURE_MAX_BODY,
+                 keep_auth=CDP_CAPTURE_KEEP_AUTH):
+        self.path = path
+        self.enabled = enabled
+        # 超过该字节数的响应体不保存（只记录请求本身）
+        self.max_body = max_body
+        # 令牌和会话 Cookie 默认不写入捕获文件，重放时由 API_AUTH_TOKEN 等配置注入
+        self.keep_auth = keep_auth
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.captured = 0
+
+    def collect(self, driver):
+        """读取浏览器的性能日志并记录其中已完成的 XHR / fetch 请求，返回本次新记录的条目
+
+        应在页面就绪（网络空闲）后、离开页面前调用，否则响应体可能已被浏览器丢弃；
+        未开启捕获时不做任何事
+        """
+        if not self.enabled:
+            return []
+        try:
+            logs = driver.get_log('performance')
+        except Exception:
+            return []
+
+        pending = {}
+        extra_headers = {}
+        finished = []
+        for log in logs:
+            try:
+                message = json.loads(log['message'])['message']
+            except (KeyError, ValueError):
+                continue
+            method = message.get('method')
+            params = message.get('params', {})
+            request_id = params.get('requestId')
+
+            if method == 'Network.requestWillBeSent':
+                if params.get('type') not in CAPTURE_TYPES:
+                    continue
+                request = params['request']
+                pending[request_id] = {
+                    'method': request.get('method', 'GET'),
+                    'url': request['url'],
+                    'headers': request.get('headers', {}),
+                    'post_data': request.get('postData'),
+                    'page': params.get('documentURL'),
+                    'status': None,
+                    'mime_type': None,
+                    'body': None,
+                }
+            elif method == 'Network.requestWillBeSentExtraInfo':
+                # 浏览器实际发送的完整请求头，可能先于 requestWillBeSent 到达
+                extra_headers[request_id] = params.get('headers', {})
+            elif method == 'Network.responseReceived' and request_id in pending:
+                response = params['response']
+                pending[request_id]['status'] = response.get('status')
+                pending[request_id]['mime_type'] = response.get('mimeType')
+            elif method == 'Network.loadingFinished' and request_id in pending:
+                entry = pending.pop(request_id)
+                entry['headers'].update(extra_headers.get(request_id, {}))
+                if not self.keep_auth:
+                    entry['headers'] = strip_credentials(entry['headers'])
+                entry['body'] = self._response_body(driver, request_id, params.get('encodedDataLength', 0))
+                entry['captured_at'] = time.time()
+                finished.append(entry)
+
+        with self._lock:
+            for entry in finished:
+                self._entries[entry_key(entry)] = entry
+            self.captured += len(finished)
+        return finished
+
+    def _response_body(self, driver, request_id, size):
+        """取回文本响应体；过大、二进制或已被丢弃时返回 None"""
+        if self.max_body and size > self.max_body:
+            return None
+        try:
+            result = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+        except Exception:
+            return None
+        if result.get('base64Encoded'):
+            return None
+        return result.get('body')
+
+    def entries(self):
+        """本次运行捕获的请求（每个方法、URL和请求体一条）"""
+        with self._lock:
+            return list(self._entries.values())
+
+    def save(self):
+        """与已保存的捕获结果合并后写入文件（先写临时文件再替换），返回保存的条目数"""
+        if not self.enabled:
+            return 0
+        merged = {entry_key(entry): entry for entry in load_captured(self.path)}
+        for entry in self.entries():
+            merged[entry_key(entry)] = entry
+        if not self.keep_auth:
+            # 早先保存的条目中也可能带有凭据
+            for entry in merged.values():
+                entry['headers'] = strip_credentials(entry.get('headers') or {})
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(list(merged.values()), f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+        return len(merged)
+
+    def summary(self):
+        """一行汇总，用于爬取结束时输出"""
+        with self._lock:
+            endpoints = len({entry['url'].split('?')[0] for entry in self._entries.values()})
+            return f"网络捕获: 记录 {self.captured} 个 XHR/fetch 请求 ({endpoints} 个端点), 保存到 {self.path}"
+
+
+_shared_capture = None
+_shared_lock = threading.Lock()
+
+
+def get_network_capture():
+    """进程内共享的网络捕获记录（是否开启由 config.CDP_CAPTURE 决定）"""
+    global _shared_capture
+    with _shared_lock:
+        if _shared_capture is None:
+            _shared_capture = NetworkCapture()
+        return _shared_capture
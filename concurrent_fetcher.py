@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+有界并发抓取器 - 全局线程数上限 + 每主机并发上限 + 每主机令牌桶限速
+结果按输入顺序返回，便于生成稳定的文件编号
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from config import MAX_WORKERS, PER_HOST_LIMIT
+from rate_limiter import get_scheduler
+
+
+class ConcurrentFetcher:
+    def __init__(self, max_workers=MAX_WORKERS, per_host_limit=PER_HOST_LIMIT, scheduler=None):
+        self.max_workers = max(1, int(max_workers))
+        self.per_host_limit = max(1, int(per_host_limit))
+        # 每个任务开始前按主机令牌桶限速，默认使用进程内共享的调度器
+        self.scheduler = scheduler if scheduler is not None else get_scheduler()
+        self._lock = threading.Lock()
+        self._host_semaphores = {}
+
+    def _get_host_semaphore(self, host):
+        """获取（必要时创建）主机对应的信号量"""
+        with self._lock:
+            semaphore = self._host_semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.per_host_limit)
+                self._host_semaphores[host] = semaphore
+            return semaphore
+
+    def _run(self, func, url, *args):
+        """在主机并发限制下执行单个任务"""
+        host = urlparse(url).netloc.lower()
+        with self._get_host_semaphore(host):
+            self.scheduler.wait(url)
+            return func(url, *args)
+
+    def map(self, func, urls, *iterables, return_exceptions=False):
+        """并发执行 func(url, *args)，结果按 urls 的顺序返回
+
+        return_exceptions 为 True 时，失败任务的位置返回异常对象而不是抛出
+        """
+        tasks = list(zip(urls, *iterables))
+        results = [None] * len(tasks)
+
+        if self.max_workers == 1 or len(tasks) <= 1:
+            # 顺序模式：不创建线程池
+            for i, task in enumerate(tasks):
+                try:
+                    results[i] = self._run(func, *task)
+                except Exception as e:
+                    if not return_exceptions:
+                        raise
+                    results[i] = e
+            return results
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(tasks))) as executor:
+            futures = [executor.submit(self._run, func, *task) for task in tasks]
+            for i, future in enumerate(futures):
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    if not return_exceptions:
+                        for pending in futures[i + 1:]:
+                            pending.cancel()
+                        raise
+                    results[i] = e
+
+        return results
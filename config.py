@@ -9,8 +9,79 @@ TARGET_URL = "https://ydydj.univsport.com/level/Levelnotice"
 
 # 下载配置
 DOWNLOAD_DIR = "downloads"
-MAX_RETRIES = 3
-RETRY_DELAY = 2
+MAX_RETRIES = 3           # 默认重试次数
+RETRY_DELAY = 2           # 第一次重试前的等待时间（秒），之后每次翻倍并加入随机抖动
+RETRY_MAX_DELAY = 30      # 单次等待时间上限（秒）
+RETRY_DEADLINE = 120      # 一次请求（含所有重试）的总时限（秒）
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# 按错误类别覆盖重试次数（max_retries）和等待时间倍数（delay_factor）：
+# connect 连接失败、read 读取超时/传输中断、status 可重试的状态码
+RETRY_POLICIES = {
+    'connect': {'max_retries': MAX_RETRIES, 'delay_factor': 1},
+    'read': {'max_retries': 2, 'delay_factor': 1},
+    'status': {'max_retries': MAX_RETRIES, 'delay_factor': 2},   # 服务器过载时等待更久
+}
+
+# 并发抓取配置
+MAX_WORKERS = 8        # 并发抓取的最大线程数（1 表示顺序抓取）
+PER_HOST_LIMIT = 4     # 同一主机同时进行的最大请求数
+
+# 进程内共享HTTP客户端（keep-alive 连接池，所有爬虫共用，请求头取自 HEADERS）
+HTTP_POOL_CONNECTIONS = 10   # 缓存连接池的主机数
+HTTP_POOL_MAXSIZE = 16       # 每个主机保持的连接数（超出时临时新建、用完即关，应不小于该主机的并发请求数；实际不小于 PROBE_CONCURRENCY）
+HTTP_POOL_SIZES = {}         # 按主机覆盖连接数，例如 {"cdn.example.com": 32}
+HTTP_TCP_KEEPALIVE = True    # 为池中的连接开启 TCP keepalive
+
+# 并发API探测（候选端点同时探测，按完成顺序返回）
+PROBE_CONCURRENCY = 16   # 同时进行的探测请求数上限
+PROBE_TIMEOUT = 5        # 每个探测请求的超时时间（秒）
+
+# 直接爬取JSON API（python spa_crawler.py --api，不请求HTML页面、不启动浏览器）
+API_ENDPOINTS = ["/api/levels", "/api/notices", "/api/documents"]   # 除捕获的请求外要爬取的端点
+API_AUTH_TOKEN = ""              # 访问令牌；为空时读取环境变量 API_AUTH_TOKEN，都为空则不发送
+API_AUTH_HEADER = "Authorization"
+API_AUTH_SCHEME = "Bearer"       # 令牌前缀（"" 表示只发送令牌本身）
+API_AUTH_PARAM = ""              # 非空时令牌改为以该名称作为查询参数发送，例如 "token"
+API_PAGE_PARAM = "pageNum"       # 页码参数名
+API_SIZE_PARAM = "pageSize"      # 每页条数参数名
+API_CURSOR_PARAM = "cursor"      # 游标分页时发送游标的参数名
+API_FIRST_PAGE = 1               # 第一页的页码
+API_PAGE_SIZE = 50               # 每页请求的条数
+API_MAX_PAGES = 200              # 每个端点最多请求的页数
+API_CONCURRENCY = 4              # 同时请求的页数（仍受 PER_HOST_LIMIT 和每主机限速约束）
+API_TIMEOUT = 10                 # 每页请求的超时时间（秒）
+
+# 每主机限速（令牌桶）配置
+HOST_RATE = 2.0        # 每个主机每秒放行的请求数（<= 0 表示不限速）
+HOST_BURST = 4         # 每个主机允许的突发请求数
+HOST_RATES = {}        # 按主机覆盖，例如 {"cdn.example.com": (10.0, 20)}
+
+# 自适应并发（AIMD）配置，并发窗口上限为 PER_HOST_LIMIT
+ADAPTIVE_INITIAL_CONCURRENCY = 1   # 每个主机的初始并发窗口
+ADAPTIVE_DECREASE = 0.5            # 收到 429 / 503 或延迟升高时窗口乘以该系数
+ADAPTIVE_LATENCY_TOLERANCE = 2.0   # 平均延迟超过最低延迟的该倍数时视为服务器过载
+ADAPTIVE_DEFAULT_BACKOFF = 5.0     # 429 / 503 没有 Retry-After 时暂停该主机的秒数
+
+# 分块下载配置
+DOWNLOAD_WORKERS = 4                       # 单个文件的并行分块数上限
+DOWNLOAD_PART_SIZE = 8 * 1024 * 1024       # 每个分块的大小（字节）
+DOWNLOAD_MIN_SPLIT_SIZE = 16 * 1024 * 1024 # 超过该大小且支持Range时才分块下载
+DOWNLOAD_CHUNK_SIZE = 64 * 1024            # 流式读取的块大小
+
+# 增量爬取配置（ETag / Last-Modified 条件请求）
+VALIDATOR_DB_NAME = ".validators.db"       # 保存在各爬虫下载目录中的校验值数据库
+
+# 持久化爬取队列（中断后可继续）
+FRONTIER_DB_NAME = ".frontier.db"          # 保存在下载目录中的队列数据库
+
+# 已访问URL集合（'set' 保存完整URL；'bloom' 使用可扩展布隆过滤器，内存占用小但有少量误判）
+VISITED_BACKEND = "set"
+BLOOM_ERROR_RATE = 0.001                   # 布隆过滤器的目标误判率
+BLOOM_INITIAL_CAPACITY = 100000            # 第一层的容量，用完后自动追加容量翻倍的新层
+VISITED_BLOOM_DIR = ".visited.bloom"       # 保存在下载目录中的布隆过滤器文件目录
+
+# 内容寻址附件存储（按SHA-256去重，下载目录中的文件是指向对象的硬链接）
+BLOB_STORE_DIR = "blob_store"
 
 # 浏览器配置
 HEADLESS = True  # 是否使用无头模式
@@ -18,6 +89,35 @@ WINDOW_SIZE = "1920,1080"
 PAGE_LOAD_TIMEOUT = 30
 IMPLICIT_WAIT = 10
 
+# 页面就绪等待（代替固定的 time.sleep，原来的等待时间作为超时上限）
+WAIT_NETWORK_IDLE = 0.5   # 没有进行中的 XHR / fetch 请求持续该秒数视为网络空闲
+WAIT_DOM_QUIET = 0.5      # DOM 没有变化持续该秒数视为渲染完成
+WAIT_POLL_INTERVAL = 0.1  # 检查页面状态的间隔（秒）
+
+# 渲染结果缓存（按 URL + 页面引用的 JS/CSS 资源指纹，打包文件不变时不重复渲染）
+DOM_CACHE_DB = "dom_cache.db"
+DOM_CACHE_TTL = 24 * 3600                 # 条目有效期（秒），0 表示不过期
+DOM_CACHE_MAX_BYTES = 200 * 1024 * 1024   # 缓存总大小上限（压缩后），超过时淘汰最久未使用的条目
+
+# 打包文件分析结果缓存（按JS打包文件URL保存提取的API端点，文件名带内容哈希时不重复下载和扫描）
+ENDPOINT_CACHE_FILE = "endpoint_cache.json"
+
+# 网络层API捕获（Chrome DevTools Protocol 性能日志，记录页面渲染时的 XHR / fetch 请求）
+CDP_CAPTURE = False                       # 是否在 Selenium 爬虫中捕获请求（开启后浏览器记录性能日志）
+CDP_CAPTURE_FILE = "captured_api.json"    # 捕获结果文件，之后的运行用普通HTTP直接重放其中的端点
+CDP_CAPTURE_MAX_BODY = 1024 * 1024        # 超过该字节数的响应体不保存
+CDP_CAPTURE_KEEP_AUTH = False             # 是否保存 Authorization / Cookie 等凭据请求头（默认保存前删除）
+
+# 渲染时拦截的资源（爬虫只读取链接；设为 [] 关闭拦截，可用于对比拦截前后的页面开销）
+BLOCK_RESOURCES = ['font', 'image', 'media', 'stylesheet']
+BLOCK_HOSTS = []          # 额外拦截的第三方主机，例如 ['*.google-analytics.com', 'hm.baidu.com']
+
+# 浏览器池（Selenium 爬虫共用，第二层页面并行渲染）
+BROWSER_POOL_SIZE = 3     # 同时运行的浏览器数上限
+BROWSER_MAX_USES = 50     # 每个浏览器借出该次数后重启，释放长时间运行积累的内存
+RENDER_WAIT_TIMEOUT = 10       # 渲染服务：页面加载后等待网络空闲和DOM静止的最长时间（秒）
+RENDER_FALLBACK_TIMEOUT = 60   # 渲染服务无法启动浏览器时，--dump-dom 子进程的超时时间（秒）
+
 # 文件类型配置
 DOWNLOADABLE_EXTENSIONS = [
     '.pdf', '.doc', '.docx', '.xls', '.xlsx',
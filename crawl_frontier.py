@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+持久化爬取队列 - SQLite（WAL模式）保存每个URL的状态、深度和来源页面
+规范化URL只作为去重键（url 列），出队时返回入队时的原始URL（original 列），用于请求页面和解析相对链接
+按深度优先级出队（广度优先），程序中断后可以从上次的位置继续
+可选的 seen（set 或布隆过滤器）放在数据库前面，已经入队过的URL不再访问数据库
+"""
+
+import os
+import time
+import sqlite3
+import threading
+
+from config import FRONTIER_DB_NAME
+from url_utils import canonicalize_url
+
+QUEUED = 'queued'
+IN_PROGRESS = 'in_progress'
+FETCHED = 'fetched'
+FAILED = 'failed'
+
+
+class CrawlFrontier:
+    def __init__(self, db_path, seen=None):
+        self.db_path = db_path
+        self.seen = seen
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS frontier (
+                url TEXT PRIMARY KEY,
+                original TEXT,
+                state TEXT NOT NULL,
+                depth INTEGER NOT NULL,
+                parent TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                updated_at REAL
+            )
+        """)
+        # 旧版本创建的数据库没有 original 列，出队时退回规范化URL
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(frontier)")}
+        if 'original' not in columns:
+            self._conn.execute("ALTER TABLE frontier ADD COLUMN original TEXT")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS frontier_queue ON frontier (state, depth)"
+        )
+        self._conn.commit()
+
+    @classmethod
+    def for_directory(cls, directory, seen=None):
+        """在下载目录中打开（或创建）队列数据库"""
+        return cls(os.path.join(directory, FRONTIER_DB_NAME), seen=seen)
+
+    def add(self, url, depth=0, parent=None):
+        """URL入队，已经出现过（任何状态）时返回 False"""
+        return self.add_many([(url, depth, parent)]) == 1
+
+    def add_many(self, entries):
+        """批量入队 (url, depth, parent)，按规范化URL去重，在一个事务中完成，返回新入队的数量"""
+        now = time.time()
+        rows = [(canonicalize_url(url), url, QUEUED, depth, parent, now) for url, depth, parent in entries]
+        with self._lock:
+            if self.seen is not None:
+                rows = [row for row in rows if self._first_seen(row[0])]
+                if not rows:
+                    return 0
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO frontier (url, original, state, depth, parent, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+            return self._conn.total_changes - before
+
+    def _first_seen(self, url):
+        """URL不在 seen 中时加入并返回 True（布隆过滤器误判时该URL会被跳过）"""
+        if url in self.seen:
+            return False
+        self.seen.add(url)
+        return True
+
+    def pop(self):
+        """取出深度最小、最早入队的URL并标记为处理中；队列为空时返回None
+
+        返回的 url 为入队时的原始URL，key 为去重用的规范化URL
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, depth, parent, attempts, COALESCE(original, url) FROM frontier WHERE state = ? "
+                "ORDER BY depth, rowid LIMIT 1",
+                (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            self._conn.execute(
+                "UPDATE frontier SET state = ?, attempts = attempts + 1, updated_at = ? WHERE url = ?",
+                (IN_PROGRESS, time.time(), row[0])
+            )
+            self._conn.commit()
+
+        return {'url': row[4], 'key': row[0], 'depth': row[1], 'parent': row[2], 'attempts': row[3] + 1}
+
+    def mark_fetched(self, url):
+        """标记为已抓取"""
+        self._set_state(url, FETCHED)
+
+    def mark_failed(self, url, error=None):
+        """标记为失败并记录错误信息"""
+        self._set_state(url, FAILED, str(error) if error is not None else None)
+
+    def _set_state(self, url, state, error=None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE frontier SET state = ?, error = ?, updated_at = ? WHERE url = ?",
+                (state, error, time.time(), canonicalize_url(url))
+            )
+            self._conn.commit()
+
+    def requeue_in_progress(self):
+        """上次运行中断时处理到一半的URL重新入队，返回数量"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE frontier SET state = ?, updated_at = ? WHERE state = ?",
+                (QUEUED, time.time(), IN_PROGRESS)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def has_pending(self):
+        """是否还有未完成的URL（排队中或处理中）"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM frontier WHERE state IN (?, ?) LIMIT 1", (QUEUED, IN_PROGRESS)
+            ).fetchone()
+        return row is not None
+
+    def counts(self):
+        """各状态的URL数量"""
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM frontier GROUP BY state").fetchall()
+        counts = {QUEUED: 0, IN_PROGRESS: 0, FETCHED: 0, FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def __contains__(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM frontier WHERE url = ?", (canonicalize_url(url),)
+            ).fetchone()
+        return row is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM frontier").fetchone()[0]
+
+    def reset(self):
+        """清空队列，开始新一轮爬取"""
+        with self._lock:
+            self._conn.execute("DELETE FROM frontier")
+            self._conn.commit()
+            if self.seen is not None:
+                self.seen.clear()
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+            if hasattr(self.seen, 'close'):
+                self.seen.close()
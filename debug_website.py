@@ -10,6 +10,8 @@ import re
 import os
 from urllib.parse import urljoin, urlparse
 
+from js_scanner import get_js_scanner, endpoint_urls
+
 def debug_website():
     """调试网站结构"""
     url = "https://ydydj.univsport.com/level/Levelnotice"
@@ -112,23 +114,8 @@ def debug_website():
             
             # 检查网络请求
             print("\n6. 可能的API端点:")
-            api_patterns = [
-                r'"(/api/[^"]+)"',
-                r'"(/level/[^"]+)"',
-                r'url:\s*["\']([^"\']+)["\']',
-                r'fetch\(["\']([^"\']+)["\']',
-                r'axios\.get\(["\']([^"\']+)["\']',
-            ]
-            
-            api_endpoints = []
-            for pattern in api_patterns:
-                matches = re.findall(pattern, content)
-                for match in matches:
-                    if match.startswith('/'):
-                        full_url = urljoin(url, match)
-                        api_endpoints.append(full_url)
-                    elif 'http' in match:
-                        api_endpoints.append(match)
+            # 所有端点模式合并为一个正则，只扫描一遍
+            api_endpoints = endpoint_urls(get_js_scanner().scan(content)['endpoints'], url)
             
             print(f"找到 {len(api_endpoints)} 个可能的API端点:")
             for endpoint in api_endpoints[:10]:  # 只显示前10个
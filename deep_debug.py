@@ -5,14 +5,16 @@
 """
 
 import os
-import time
-import requests
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 import json
 import logging
 
+from http_client import get_session
+from api_prober import ApiProber
+from selenium_waits import wait_until_ready
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -27,6 +29,7 @@ logger = logging.getLogger(__name__)
 class WebsiteDebugger:
     def __init__(self):
         self.base_url = "https://ydydj.univsport.com/level/Levelnotice"
+        self.session = get_session()
         self.driver = None
         self.setup_driver()
     
@@ -56,7 +59,7 @@ class WebsiteDebugger:
         
         try:
             # 检查网站可访问性
-            response = requests.get(self.base_url, timeout=10)
+            response = self.session.get(self.base_url, timeout=10)
             logger.info(f"网站状态码: {response.status_code}")
             logger.info(f"内容类型: {response.headers.get('content-type', '未知')}")
             
@@ -110,7 +113,7 @@ class WebsiteDebugger:
         try:
             # 访问网站
             self.driver.get(self.base_url)
-            time.sleep(5)
+            wait_until_ready(self.driver, timeout=5)
             
             # 获取页面信息
             page_title = self.driver.title
@@ -219,15 +222,12 @@ class WebsiteDebugger:
         
         base_domain = "https://ydydj.univsport.com"
         
-        for endpoint in api_endpoints:
-            url = base_domain + endpoint
-            try:
-                response = requests.get(url, timeout=5)
-                status = response.status_code
-                if status != 404:
-                    logger.info(f"{url} - 状态码: {status}")
-            except:
-                pass
+        # 同时探测所有候选端点，按完成顺序输出
+        prober = ApiProber(self.session)
+        for result in prober.probe(base_domain + endpoint for endpoint in api_endpoints):
+            status = result['status']
+            if status is not None and status != 404:
+                logger.info(f"{result['url']} - 状态码: {status}")
     
     def run_complete_analysis(self):
         """运行完整分析"""
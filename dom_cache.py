@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+渲染结果缓存 - 按 URL + 页面引用的 JS/CSS 资源指纹缓存浏览器渲染后的DOM
+SPA的页面内容由打包文件决定（例如 assets/index-I-BbFchG.js），打包文件不变时渲染结果也不变：
+先用一次普通HTTP请求取得页面外壳中的资源列表作为缓存键，命中时不再启动浏览器渲染。
+缓存保存在 SQLite 中（压缩的HTML），超过 DOM_CACHE_TTL 的条目失效，
+总大小超过 DOM_CACHE_MAX_BYTES 时淘汰最久未使用的条目
+"""
+
+import os
+import re
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from urllib.parse import urljoin, urlparse
+
+import requests
+
+from config import DOM_CACHE_DB, DOM_CACHE_TTL, DOM_CACHE_MAX_BYTES
+from http_client import get_session
+from url_utils import canonicalize_url
+from rate_limiter import get_scheduler
+
+ASSET_TAG_RE = re.compile(r'<(script|link)\b([^>]*)>', re.IGNORECASE)
+ATTR_RE = re.compile(r'([\w-]+)\s*=\s*["\']([^"\']*)["\']')
+
+# 构建工具生成的带内容哈希的文件名（如 index-I-BbFchG.js）：文件名本身就是指纹，不必下载内容
+FINGERPRINTED_RE = re.compile(r'[.-]([A-Za-z0-9_-]{8,})\.(?:js|css)$')
+
+
+def asset_urls(html, base_url):
+    """页面外壳引用的脚本和样式表（script src、link rel=stylesheet / modulepreload）"""
+    urls = []
+    for tag, attrs in ASSET_TAG_RE.findall(html):
+        attrs = {name.lower(): value for name, value in ATTR_RE.findall(attrs)}
+        if tag.lower() == 'script':
+            url = attrs.get('src')
+        elif attrs.get('rel', '').lower() in ('stylesheet', 'modulepreload'):
+            url = attrs.get('href')
+        else:
+            url = None
+        if url:
+            urls.append(urljoin(base_url, url))
+    return urls
+
+
+def is_fingerprinted(url):
+    """文件名是否带内容哈希（哈希段包含数字或大写字母，避免把 vendor-libraries.js 之类误认为哈希）"""
+    match = FINGERPRINTED_RE.search(os.path.basename(urlparse(url).path))
+    return bool(match) and any(c.isdigit() or c.isupper() for c in match.group(1))
+
+
+class DomCache:
+    def __init__(self, db_path=DOM_CACHE_DB, ttl=DOM_CACHE_TTL, max_bytes=DOM_CACHE_MAX_BYTES,
+                 session=None, scheduler=None):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.session = session if session is not None else get_session()
+        # 可选的 HostScheduler：获取页面外壳和资源前按主机限速
+        self.scheduler = scheduler
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # 多个线程共用同一个连接，由锁保护
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS rendered (
+                key TEXT PRIMARY KEY,
+                url TEXT,
+                html BLOB,
+                size INTEGER,
+                created_at REAL,
+                accessed_at REAL
+            )
+        """)
+        self._conn.commit()
+        # 本进程内已计算的缓存键（同一次运行中不重复请求页面外壳）
+        self._keys = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, url):
+        """普通HTTP请求（不执行JavaScript）"""
+        if self.scheduler is not None:
+            self.scheduler.wait(url)
+        response = self.session.get(url, timeout=30)
+        response.raise_for_status()
+        return response
+
+    def key_for(self, url):
+        """缓存键：规范化URL + 页面外壳引用的每个资源的指纹；无法获取页面外壳时返回 None"""
+        url = canonicalize_url(url)
+        with self._lock:
+            if url in self._keys:
+                return self._keys[url]
+
+        try:
+            shell = self._get(url).text
+            parts = [url]
+            for asset in sorted(set(asset_urls(shell, url))):
+                if is_fingerprinted(asset):
+                    parts.append(asset)
+                else:
+                    # 文件名不带哈希的资源按内容计算指纹
+                    parts.append(asset + '#' + hashlib.sha256(self._get(asset).content).hexdigest())
+        except requests.RequestException:
+            return None
+
+        key = hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+        with self._lock:
+            self._keys[url] = key
+        return key
+
+    def get(self, url):
+        """返回缓存的渲染结果；未命中、已过期或无法计算缓存键时返回 None"""
+        key = self.key_for(url)
+        if key is None:
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT html, created_at FROM rendered WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl and now - row[1] > self.ttl):
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE rendered SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    def put(self, url, html):
+        """保存渲染结果，并在总大小超过上限时淘汰最久未使用的条目"""
+        key = self.key_for(url)
+        if key is None or not html:
+            return False
+        data = zlib.compress(html.encode('utf-8'))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO rendered VALUES (?, ?, ?, ?, ?, ?)",
+                (key, canonicalize_url(url), data, len(data), now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+        return True
+
+    def _evict(self, now):
+        """删除过期条目，再按最久未使用的顺序删除到总大小不超过上限（调用方持有锁）"""
+        if self.ttl:
+            self._conn.execute("DELETE FROM rendered WHERE created_at < ?", (now - self.ttl,))
+        if not self.max_bytes:
+            return
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM rendered").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM rendered ORDER BY accessed_at").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM rendered WHERE key = ?", (key,))
+            total -= size
+
+    def fetch(self, url, render):
+        """返回 url 的渲染结果：缓存命中时直接返回，否则调用 render(url) 渲染并保存（render 失败时返回 None）"""
+        html = self.get(url)
+        if html is not None:
+            return html
+        html = render(url)
+        if html:
+            self.put(url, html)
+        return html
+
+    def summary(self):
+        """一行汇总，用于爬取结束时输出"""
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM rendered"
+            ).fetchone()
+            return (f"渲染缓存: 命中 {self.hits} 次, 未命中 {self.misses} 次, "
+                    f"共 {count} 条 / {size / 1024 / 1024:.1f} MB")
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_dom_cache():
+    """进程内共享的渲染结果缓存（获取页面外壳时使用共享的主机限速）"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = DomCache(scheduler=get_scheduler())
+        return _shared_cache
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享下载引擎 - 支持HTTP Range的并行分块下载和断点续传
+服务器不支持Range或文件较小时回退为单连接流式下载
+"""
+
+import os
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from config import (DOWNLOAD_WORKERS, DOWNLOAD_PART_SIZE,
+                    DOWNLOAD_MIN_SPLIT_SIZE, DOWNLOAD_CHUNK_SIZE)
+from blob_store import new_hasher, hash_file, update_hasher_from_file
+from retry_policy import RetryPolicy, IncompleteDownload
+from http_client import get_session
+
+
+PART_SUFFIX = '.part'
+STATE_SUFFIX = '.json'
+STATE_SAVE_INTERVAL = 1024 * 1024  # 每写入约1MB更新一次旁路文件
+
+# 正在进行的下载，按目标文件的绝对路径登记（进程内所有引擎共用）：
+# 同一目标的 .part 和旁路文件同时只能有一个下载在写
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+class RangeNotSupported(Exception):
+    """服务器忽略了Range请求头"""
+
+
+def positional_write(fd, data, offset, lock=None):
+    """在文件指定偏移处写入数据（多线程安全）"""
+    view = memoryview(data)
+    if hasattr(os, 'pwrite'):
+        while view:
+            written = os.pwrite(fd, view, offset)
+            view = view[written:]
+            offset += written
+    else:
+        # Windows 没有 pwrite，用锁保护 seek + write
+        with lock:
+            os.lseek(fd, offset, os.SEEK_SET)
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+
+
+class DownloadEngine:
+    def __init__(self, session=None, max_workers=DOWNLOAD_WORKERS, part_size=DOWNLOAD_PART_SIZE,
+                 min_split_size=DOWNLOAD_MIN_SPLIT_SIZE, chunk_size=DOWNLOAD_CHUNK_SIZE, timeout=60,
+                 validator_store=None, blob_store=None, scheduler=None, controller=None,
+                 retry_policy=None):
+        # 默认使用进程内共享的连接池会话；有 AdaptiveController 时由控制器负责请求级重试
+        self.session = session if session is not None else get_session()
+        self.max_workers = max(1, int(max_workers))
+        self.part_size = max(1, int(part_size))
+        self.min_split_size = int(min_split_size)
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        # 可选的 ValidatorStore：本地文件已存在时发送条件请求，304 视为未变化
+        self.validator_store = validator_store
+        # 可选的 BlobStore：下载时计算摘要，相同内容只保存一份，目标路径为指向对象的硬链接
+        self.blob_store = blob_store
+        # 可选的 HostScheduler：每次请求前按主机令牌桶限速（分块下载的每个分块各算一次请求）
+        self.scheduler = scheduler
+        # 可选的 AdaptiveController：按响应延迟和 429 / 503 调整每个主机的并发数
+        self.controller = controller
+        # 传输中断、读取超时等失败后按策略退避，再次调用时从 .part 文件续传
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+
+    def throttle(self, url):
+        """请求前按主机限速"""
+        if self.scheduler is not None:
+            self.scheduler.wait(url)
+
+    def send(self, method, url, **kwargs):
+        """发送请求：有 AdaptiveController 时在其并发窗口内发送，否则只按主机限速"""
+        if self.controller is not None:
+            return self.controller.request(self.session, method, url, throttle=self.throttle, **kwargs)
+        self.throttle(url)
+        return self.session.request(method, url, **kwargs)
+
+    def probe(self, url, headers=None):
+        """用HEAD请求探测文件大小和Range支持，失败时返回None（304 时返回 status 为 304 的信息）"""
+        request_headers = {'Accept-Encoding': 'identity'}
+        request_headers.update(headers or {})
+
+        try:
+            response = self.send('HEAD', url, headers=request_headers, allow_redirects=True,
+                                 timeout=self.timeout)
+        except requests.RequestException:
+            return None
+
+        if response.status_code not in (200, 304):
+            return None
+
+        return self.describe_response(response)
+
+    def describe_response(self, response):
+        """从响应头中提取下载相关的信息"""
+        headers = response.headers
+        length = headers.get('content-length')
+        encoding = headers.get('content-encoding', 'identity').lower()
+
+        return {
+            'url': response.url,
+            'status': response.status_code,
+            'size': int(length) if length and length.isdigit() and encoding == 'identity' else None,
+            'accept_ranges': headers.get('accept-ranges', '').lower() == 'bytes',
+            'content_type': headers.get('content-type', ''),
+            'etag': headers.get('etag'),
+            'last_modified': headers.get('last-modified'),
+        }
+
+    def should_split(self, info):
+        """判断是否使用并行分块下载"""
+        return (info is not None and info['accept_ranges'] and info['size'] is not None
+                and info['size'] >= self.min_split_size and self.max_workers > 1)
+
+    def download(self, url, filepath, accept=None, headers=None):
+        """下载文件到 filepath，可重试的失败按 retry_policy 退避后续传，参见 download_once
+
+        同一 filepath 已有下载在进行时等待其完成：URL 相同则直接使用它的结果（或异常），
+        URL 不同则等它结束后再下载
+        """
+        key = os.path.abspath(filepath)
+        while True:
+            with _in_flight_lock:
+                flight = _in_flight.get(key)
+                if flight is None:
+                    flight = _in_flight[key] = {'url': url, 'done': threading.Event(),
+                                                'result': None, 'error': None}
+                    break
+            flight['done'].wait()
+            if flight['url'] == url:
+                if flight['error'] is not None:
+                    raise flight['error']
+                return flight['result']
+
+        try:
+            flight['result'] = self.retry_policy.call(self.download_once, url, filepath, accept, headers)
+            return flight['result']
+        except Exception as e:
+            flight['error'] = e
+            raise
+        finally:
+            with _in_flight_lock:
+                del _in_flight[key]
+            flight['done'].set()
+
+    def download_once(self, url, filepath, accept=None, headers=None):
+        """下载文件到 filepath（不重试）
+
+        数据先写入 filepath + '.part'，旁路文件 '.part.json' 记录URL、ETag和已写字节数，
+        中断后再次调用会用 Range + If-Range 续传，完成后才原子重命名为 filepath。
+        accept(info) 返回 False 时放弃下载并返回 None；
+        成功时返回包含 filepath、size、url、parts、resumed_bytes、unchanged、digest、
+        deduplicated 的字典，unchanged 为 True 表示服务器返回 304，本地文件未被改动；
+        配置了 blob_store 时 deduplicated 为 True 表示内容已存在，本次下载没有新增存储
+        """
+        conditional = {}
+        if self.validator_store is not None:
+            conditional = self.validator_store.conditional_headers(url, filepath)
+
+        probe_headers = dict(headers or {})
+        probe_headers.update(conditional)
+        info = self.probe(url, probe_headers)
+
+        if info is not None and info['status'] == 304:
+            return self.unchanged(url, filepath)
+
+        if info is not None and accept is not None and not accept(info):
+            return None
+
+        part_path = filepath + PART_SUFFIX
+        state = self.load_state(part_path, url, info)
+
+        if self.should_split(info):
+            try:
+                result = self.download_ranges(info['url'], part_path, info, state, headers)
+                return self.finish(part_path, filepath, url, result)
+            except RangeNotSupported:
+                state = self.new_state(url, info)
+
+        # HEAD 不可用时由 GET 携带条件请求头
+        result = self.download_stream(url, part_path, state, accept if info is None else None,
+                                      headers, conditional if info is None else None)
+        if result is None:
+            return None
+        if result.get('unchanged'):
+            return self.unchanged(url, filepath)
+        return self.finish(part_path, filepath, url, result)
+
+    def unchanged(self, url, filepath):
+        """服务器返回 304：不写磁盘，直接返回本地文件信息"""
+        return {
+            'filepath': filepath,
+            'url': url,
+            'size': os.path.getsize(filepath),
+            'parts': 0,
+            'resumed_bytes': 0,
+            'unchanged': True,
+            'digest': self.blob_store.lookup(filepath) if self.blob_store is not None else None,
+            'deduplicated': False,
+        }
+
+    def finish(self, part_path, filepath, url, result):
+        """下载完成：原子重命名 .part 文件（或放入内容存储），删除旁路文件并记录校验值"""
+        size = os.path.getsize(part_path)
+        digest = result.pop('digest', None)
+        deduplicated = False
+
+        if self.blob_store is not None:
+            if digest is None:
+                # 分块下载或续传到末尾时没有流式摘要，完成后补算
+                digest = hash_file(part_path)
+            deduplicated = self.blob_store.ingest(part_path, digest, filepath, url)
+        else:
+            os.replace(part_path, filepath)
+        self.remove_state(part_path)
+        etag = result.pop('etag', None)
+        last_modified = result.pop('last_modified', None)
+
+        if self.validator_store is not None:
+            self.validator_store.update(url, etag=etag, last_modified=last_modified,
+                                        content_length=size)
+
+        result.update({'filepath': filepath, 'url': url, 'size': size, 'unchanged': False,
+                       'digest': digest, 'deduplicated': deduplicated})
+        return result
+
+    def new_state(self, url, info=None):
+        """创建新的续传状态"""
+        info = info or {}
+        return {
+            'url': url,
+            'etag': info.get('etag'),
+            'last_modified': info.get('last_modified'),
+            'size': info.get('size'),
+            'bytes_written': 0,
+            'parts_done': [],
+        }
+
+    def load_state(self, part_path, url, info):
+        """读取旁路文件；URL或校验值不一致、.part 文件缺失时从头开始"""
+        meta_path = part_path + STATE_SUFFIX
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return self.new_state(url, info)
+
+        if state.get('url') != url or not os.path.exists(part_path):
+            return self.new_state(url, info)
+
+        if info is not None:
+            # 服务器上的文件已经变化
+            if (info['etag'] and state.get('etag') and info['etag'] != state['etag']) or \
+                    (info['size'] is not None and state.get('size') not in (None, info['size'])):
+                return self.new_state(url, info)
+
+        # 旁路文件只在数据落盘后更新，以两者中较小的为准
+        state['bytes_written'] = min(state.get('bytes_written', 0), os.path.getsize(part_path))
+        state.setdefault('parts_done', [])
+        return state
+
+    def save_state(self, part_path, state):
+        """原子写入旁路文件"""
+        meta_path = part_path + STATE_SUFFIX
+        tmp_path = meta_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, meta_path)
+
+    def remove_state(self, part_path):
+        """删除旁路文件"""
+        try:
+            os.remove(part_path + STATE_SUFFIX)
+        except FileNotFoundError:
+            pass
+
+    def if_range_value(self, state):
+        """续传时 If-Range 使用的校验值（弱ETag不能用于If-Range）"""
+        etag = state.get('etag')
+        if etag and not etag.startswith('W/'):
+            return etag
+        return state.get('last_modified')
+
+    def download_stream(self, url, part_path, state, accept=None, headers=None, conditional=None):
+        """单连接流式下载，支持从 .part 文件断点续传"""
+        request_headers = {'Accept-Encoding': 'identity'}
+        request_headers.update(headers or {})
+
+        offset = state['bytes_written'] if not state['parts_done'] else 0
+        validator = self.if_range_value(state)
+        if offset and validator:
+            request_headers['Range'] = f"bytes={offset}-"
+            request_headers['If-Range'] = validator
+        else:
+            offset = 0
+            request_headers.update(conditional or {})
+
+        response = self.send('GET', url, headers=request_headers, stream=True, timeout=self.timeout)
+        try:
+            if response.status_code == 304:
+                return {'unchanged': True}
+            if response.status_code == 416 and offset and offset == state.get('size'):
+                # .part 文件已经完整，只差重命名
+                return {'parts': 1, 'resumed_bytes': offset,
+                        'etag': state.get('etag'), 'last_modified': state.get('last_modified')}
+            response.raise_for_status()
+
+            if accept is not None and not accept(self.describe_response(response)):
+                return None
+
+            if response.status_code != 206:
+                # 服务器返回了完整内容（文件已变化或不支持Range），从头写
+                offset = 0
+                info = self.describe_response(response)
+                state.update(self.new_state(url, info))
+
+            resumed_bytes = offset
+            state['bytes_written'] = offset
+            self.save_state(part_path, state)
+
+            # 边下载边计算摘要；续传时先补上已下载部分
+            hasher = new_hasher() if self.blob_store is not None else None
+            if hasher is not None and offset:
+                update_hasher_from_file(hasher, part_path, offset)
+
+            with open(part_path, 'r+b' if offset else 'wb') as f:
+                f.seek(offset)
+                f.truncate()
+                unsaved = 0
+                try:
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        if chunk:
+                            f.write(chunk)
+                            if hasher is not None:
+                                hasher.update(chunk)
+                            state['bytes_written'] += len(chunk)
+                            unsaved += len(chunk)
+                            if unsaved >= STATE_SAVE_INTERVAL:
+                                f.flush()
+                                self.save_state(part_path, state)
+                                unsaved = 0
+                finally:
+                    # 传输中断时也记录已写入的字节数，重试从这里续传
+                    f.flush()
+                    self.save_state(part_path, state)
+        finally:
+            response.close()
+
+        expected = state.get('size')
+        if expected is not None and state['bytes_written'] != expected:
+            raise IncompleteDownload(f"下载不完整: {url}, 已写 {state['bytes_written']}/{expected} 字节")
+
+        return {'parts': 1, 'resumed_bytes': resumed_bytes,
+                'digest': hasher.hexdigest() if hasher is not None else None,
+                'etag': state.get('etag'), 'last_modified': state.get('last_modified')}
+
+    def split_ranges(self, size):
+        """把文件按 part_size 切分为闭区间 (start, end) 列表"""
+        return [(start, min(start + self.part_size, size) - 1)
+                for start in range(0, size, self.part_size)]
+
+    def download_ranges(self, url, part_path, info, state, headers=None):
+        """并行分块下载，写入预分配的 .part 文件，已完成的分块记录在旁路文件中"""
+        size = info['size']
+        ranges = self.split_ranges(size)
+        lock = threading.Lock()
+
+        if state.get('size') != size or (state['bytes_written'] and not state['parts_done']):
+            # 之前是单连接下载或大小不同，不能按分块续传
+            state = self.new_state(url, info)
+        done = set(state['parts_done'])
+        pending = [(start, end) for start, end in ranges if start not in done]
+        resumed_bytes = sum(end - start + 1 for start, end in ranges if start in done)
+
+        # 预分配文件
+        if not done or not os.path.exists(part_path):
+            done.clear()
+            pending = ranges
+            resumed_bytes = 0
+            state['parts_done'] = []
+            with open(part_path, 'wb') as f:
+                f.truncate(size)
+        self.save_state(part_path, state)
+
+        def on_part_done(start, end):
+            with lock:
+                state['parts_done'].append(start)
+                state['bytes_written'] += end - start + 1
+                self.save_state(part_path, state)
+
+        error = None
+        fd = os.open(part_path, os.O_WRONLY | getattr(os, 'O_BINARY', 0))
+        try:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, max(1, len(pending)))) as executor:
+                futures = {executor.submit(self.fetch_range, url, fd, start, end, lock, state, headers):
+                           (start, end) for start, end in pending}
+                for future in as_completed(futures):
+                    if future.cancelled():
+                        continue
+                    if future.exception() is not None:
+                        # 任一分块失败时取消尚未开始的分块，已完成的分块保留以便续传
+                        if error is None:
+                            error = future.exception()
+                            for other in futures:
+                                other.cancel()
+                        continue
+                    on_part_done(*futures[future])
+        finally:
+            os.close(fd)
+
+        if error is not None:
+            raise error
+
+        return {'parts': len(ranges), 'resumed_bytes': resumed_bytes,
+                'etag': state.get('etag'), 'last_modified': state.get('last_modified')}
+
+    def fetch_range(self, url, fd, start, end, lock, state, headers=None):
+        """下载单个分块并按偏移写入"""
+        request_headers = {'Accept-Encoding': 'identity', 'Range': f"bytes={start}-{end}"}
+        validator = self.if_range_value(state)
+        if validator:
+            request_headers['If-Range'] = validator
+        request_headers.update(headers or {})
+
+        response = self.send('GET', url, headers=request_headers, stream=True, timeout=self.timeout)
+        try:
+            if response.status_code == 200:
+                raise RangeNotSupported(url)
+            response.raise_for_status()
+
+            offset = start
+            for chunk in response.iter_content(chunk_size=self.chunk_size):
+                if chunk:
+                    positional_write(fd, chunk, offset, lock)
+                    offset += len(chunk)
+        finally:
+            response.close()
+
+        if offset != end + 1:
+            raise IncompleteDownload(f"分块不完整: {url} bytes={start}-{end}, 实际写到 {offset}")
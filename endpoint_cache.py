@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+打包文件分析结果缓存 - 按JS打包文件URL保存从中提取的API端点和数据模式
+Vite 等构建工具生成的文件名带内容哈希（如 assets/index-I-BbFchG.js），文件名不变内容就不变：
+页面外壳仍引用同一个打包文件时直接使用上次的分析结果，不再下载和扫描打包文件，
+只有 index.html 引用了新的打包文件名时才重新扫描。文件名不带哈希的打包文件只在条件请求返回 304 时使用缓存
+"""
+
+import os
+import json
+import time
+import threading
+from urllib.parse import urlparse
+
+from config import ENDPOINT_CACHE_FILE
+from dom_cache import asset_urls, is_fingerprinted
+from url_utils import canonicalize_url
+
+
+def bundle_urls(html, base_url):
+    """页面外壳引用的JS打包文件（script src 和 modulepreload），按出现顺序去重"""
+    urls = [url for url in asset_urls(html, base_url) if urlparse(url).path.endswith('.js')]
+    return list(dict.fromkeys(urls))
+
+
+class EndpointCache:
+    def __init__(self, path=ENDPOINT_CACHE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        """读取缓存文件；不存在或损坏时返回空字典"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def _save(self):
+        """写入缓存文件（先写临时文件再替换，调用方持有锁）"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._entries, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+
+    def get(self, bundle_url, fields=('endpoints',), revalidated=False):
+        """返回打包文件的缓存分析结果；文件名不带内容哈希（且未经条件请求确认未变化）、
+        没有缓存或缓存中缺少 fields 中的某一项时返回 None"""
+        key = canonicalize_url(bundle_url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not (revalidated or is_fingerprinted(key)) or \
+                    any(field not in entry for field in fields):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return dict(entry)
+
+    def put(self, bundle_url, result, page=None):
+        """保存打包文件的分析结果（与已有的字段合并，同一文件名的内容相同）"""
+        key = canonicalize_url(bundle_url)
+        with self._lock:
+            entry = self._entries.get(key, {})
+            entry.update(result)
+            if page is not None:
+                entry['page'] = canonicalize_url(page)
+            entry['scanned_at'] = time.time()
+            self._entries[key] = entry
+            self._save()
+
+    def prune(self, page, current_bundles):
+        """删除 page 以前引用、现在已不再引用的打包文件的条目，返回删除的条目数"""
+        page = canonicalize_url(page)
+        current = {canonicalize_url(url) for url in current_bundles}
+        with self._lock:
+            stale = [key for key, entry in self._entries.items()
+                     if entry.get('page') == page and key not in current]
+            for key in stale:
+                del self._entries[key]
+            if stale:
+                self._save()
+        return len(stale)
+
+    def summary(self):
+        """一行汇总，用于爬取结束时输出"""
+        with self._lock:
+            return (f"端点缓存: 命中 {self.hits} 次, 重新扫描 {self.misses} 次, "
+                    f"共 {len(self._entries)} 个打包文件 ({self.path})")
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_endpoint_cache():
+    """进程内共享的打包文件分析结果缓存"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = EndpointCache()
+        return _shared_cache
@@ -8,18 +8,36 @@
 import os
 import re
 import time
-import subprocess
-import requests
 import json
 from pathlib import Path
 from urllib.parse import urljoin, urlparse
 from datetime import datetime
 
+from link_extractor import extract_links
+from rate_limiter import get_scheduler
+from http_client import get_session
+from download_engine import DownloadEngine
+from api_prober import ApiProber
+from dom_cache import get_dom_cache
+from browser_service import get_browser_service
+
 class FinalLevelCrawler:
     def __init__(self, base_url="https://ydydj.univsport.com/level/Levelnotice"):
         self.base_url = base_url
         self.download_dir = "downloads"
         self.log_file = "crawler.log"
+        # 每主机令牌桶限速，代替策略之间的固定暂停
+        self.scheduler = get_scheduler()
+        # 进程内共享连接池，API探测和附件下载复用连接
+        self.session = get_session()
+        # 附件在会话的连接池中下载（keep-alive、断点续传），不再为每个文件启动 curl
+        self.download_engine = DownloadEngine(self.session, scheduler=self.scheduler)
+        # 候选API端点并发探测（只受 PROBE_CONCURRENCY 限制，不经每主机令牌桶逐个放行）
+        self.prober = ApiProber(self.session, timeout=10)
+        # 渲染结果缓存：打包文件未变化的页面不再重复启动浏览器（多个策略之间也共用）
+        self.dom_cache = get_dom_cache()
+        # 常驻浏览器渲染服务，不再为每个URL启动一次 --dump-dom 浏览器进程
+        self.browser_service = get_browser_service()
         self.setup_directories()
         self.setup_logging()
         
@@ -43,29 +61,14 @@ class FinalLevelCrawler:
             f.write(log_message + "\n")
     
     def get_page_with_browser(self, url):
-        """使用浏览器获取页面内容"""
-        try:
-            result = subprocess.run([
-                'chromium-browser',
-                '--headless',
-                '--disable-gpu',
-                '--no-sandbox',
-                '--disable-dev-shm-usage',
-                '--window-size=1920,1080',
-                '--dump-dom',
-                url
-            ], capture_output=True, text=True, timeout=60)
-            
-            if result.returncode == 0:
-                return result.stdout
-            else:
-                self.log(f"浏览器命令失败: {result.stderr}")
-                return None
-                
-        except Exception as e:
-            self.log(f"浏览器操作失败: {e}")
-            return None
+        """使用浏览器获取页面内容（优先使用渲染结果缓存）"""
+        return self.dom_cache.fetch(url, self.render_page)
     
+    def render_page(self, url):
+        """用常驻浏览器服务渲染页面，返回渲染后的DOM；失败时返回 None"""
+        self.scheduler.wait(url)
+        return self.browser_service.render(url)
+
     def analyze_page_structure(self, html_content):
         """分析页面结构"""
         analysis = {
@@ -100,49 +103,24 @@ class FinalLevelCrawler:
         """提取可能的链接"""
         links = []
         
-        # 各种链接模式
-        patterns = [
-            (r'<a[^>]*href="([^"]*)"[^>]*>(.*?)</a>', "普通链接"),
-            (r'<button[^>]*onclick="[^\"]*["\']([^"\']+)["\'][^>]*>(.*?)</button>', "按钮链接"),
-            (r'<div[^>]*onclick="[^\"]*["\']([^"\']+)["\'][^>]*>(.*?)</div>', "DIV链接"),
-            (r'<span[^>]*onclick="[^\"]*["\']([^"\']+)["\'][^>]*>(.*?)</span>', "SPAN链接"),
-            (r'window\.location\.href\s*=\s*["\']([^"\']+)["\']', "JS重定向"),
-        ]
+        # 单遍提取：普通链接、按钮/div/span的onclick链接和脚本中的JS重定向
+        link_types = {'a': "普通链接", 'button': "按钮链接", 'div': "DIV链接", 'span': "SPAN链接"}
         
-        for pattern, link_type in patterns:
-            matches = re.findall(pattern, html_content, re.IGNORECASE | re.DOTALL)
-            for match in matches:
-                if isinstance(match, tuple):
-                    href = match[0]
-                    text = match[1] if len(match) > 1 else ""
-                else:
-                    href = match
-                    text = ""
-                
-                # 清理文本
-                text = re.sub(r'<[^>]*>', '', text).strip()
-                
-                if href and not href.startswith(('javascript:', 'mailto:', 'tel:')):
-                    # 转换为绝对URL
-                    full_url = urljoin(base_url, href)
-                    
-                    links.append({
-                        'url': full_url,
-                        'text': text or self.get_link_text_from_url(full_url),
-                        'type': link_type,
-                        'original_href': href
-                    })
+        def is_candidate(link):
+            if link['kind'] == 'redirect':
+                return True
+            return link['tag'] in link_types and (link['kind'] == 'href') == (link['tag'] == 'a')
         
-        # 去重
-        unique_links = []
-        seen_urls = set()
+        for link in extract_links(html_content, base_url, kinds=('href', 'onclick', 'redirect'),
+                                  accept=is_candidate):
+            links.append({
+                'url': link['url'],
+                'text': link['text'] or self.get_link_text_from_url(link['url']),
+                'type': "JS重定向" if link['kind'] == 'redirect' else link_types[link['tag']],
+                'original_href': link['original_href']
+            })
         
-        for link in links:
-            if link['url'] not in seen_urls:
-                unique_links.append(link)
-                seen_urls.add(link['url'])
-        
-        return unique_links
+        return links
     
     def get_link_text_from_url(self, url):
         """从URL中提取有意义的文本"""
@@ -182,24 +160,16 @@ class FinalLevelCrawler:
             
             self.log(f"正在下载: {filename}")
             
-            # 使用curl下载（更稳定）
-            result = subprocess.run([
-                'curl', '-s', '-L', '-o', filepath, url
-            ], capture_output=True, timeout=120)
+            result = self.download_engine.download(url, filepath)
+            file_size = result['size']
+            self.log(f"下载完成: {filename} ({file_size} 字节)")
             
-            if result.returncode == 0:
-                file_size = os.path.getsize(filepath)
-                self.log(f"下载完成: {filename} ({file_size} 字节)")
-                
-                return {
-                    'filename': filename,
-                    'filepath': filepath,
-                    'size': file_size,
-                    'url': url
-                }
-            else:
-                self.log(f"下载失败: {result.stderr}")
-                return None
+            return {
+                'filename': filename,
+                'filepath': filepath,
+                'size': file_size,
+                'url': url
+            }
                 
         except Exception as e:
             self.log(f"下载文件失败: {e}")
@@ -236,8 +206,6 @@ class FinalLevelCrawler:
                 self.log(f"策略 {strategy_name} 成功下载 {downloaded} 个文件")
             else:
                 self.log(f"策略 {strategy_name} 未找到可下载文件")
-            
-            time.sleep(2)  # 策略间暂停
         
         return total_downloaded
     
@@ -280,11 +248,13 @@ class FinalLevelCrawler:
         
         downloaded = 0
         
-        for pattern in deep_link_patterns:
-            test_url = urljoin(self.base_url, pattern)
+        # 所有深度链接同时交给渲染服务，结果按模式顺序处理
+        test_urls = [urljoin(self.base_url, pattern) for pattern in deep_link_patterns]
+        pages = self.browser_service.map(test_urls, self.get_page_with_browser)
+        
+        for test_url, html_content in zip(test_urls, pages):
             self.log(f"测试深度链接: {test_url}")
             
-            html_content = self.get_page_with_browser(test_url)
             if html_content:
                 links = self.extract_possible_links(html_content, test_url)
                 
@@ -309,14 +279,17 @@ class FinalLevelCrawler:
         
         downloaded = 0
         
-        for pattern in api_patterns:
-            test_url = urljoin(self.base_url, pattern)
-            self.log(f"测试API端点: {test_url}")
+        test_urls = [urljoin(self.base_url, pattern) for pattern in api_patterns]
+        self.log(f"同时测试 {len(test_urls)} 个API端点")
+        
+        # 同时探测所有候选端点，按完成顺序处理
+        for probe in self.prober.probe(test_urls):
+            test_url = probe['url']
+            response = probe['response']
+            self.log(f"测试API端点: {test_url} - {probe['status'] or probe['error']}")
             
             try:
-                # 尝试JSON请求
-                response = requests.get(test_url, timeout=10)
-                if response.status_code == 200:
+                if response is not None and response.status_code == 200:
                     content_type = response.headers.get('content-type', '')
                     
                     if 'application/json' in content_type:
@@ -362,6 +335,10 @@ class FinalLevelCrawler:
             self.log(f"爬虫运行完成!")
             self.log(f"运行时间: {duration:.2f} 秒")
             self.log(f"总共下载: {total_downloaded} 个文件")
+            self.log(self.scheduler.summary())
+            self.log(self.session.pool_stats.summary())
+            self.log(self.dom_cache.summary())
+            self.log(self.browser_service.summary())
             self.log(f"文件保存: {os.path.abspath(self.download_dir)}")
             self.log(f"日志文件: {self.log_file}")
             self.log("=" * 60)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享HTTP客户端 - 进程内的 keep-alive 连接池
+所有爬虫、下载引擎和探测请求共用 get_session() 返回的会话（请求头取自 config.HEADERS），
+同一主机的请求复用已建立的TCP/TLS连接；连接池大小可按主机配置，并统计每个主机的连接复用情况
+"""
+
+import socket
+import threading
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.poolmanager import PoolManager
+
+from config import (
+    HEADERS, HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE, HTTP_POOL_SIZES, HTTP_TCP_KEEPALIVE, PROBE_CONCURRENCY,
+)
+from retry_policy import RetrySession
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+# 每个主机的连接数不小于并发探测数，否则超出的探测连接用完即关（urllib3 警告 "Connection pool is full"）
+POOL_MAXSIZE = max(HTTP_POOL_MAXSIZE, PROBE_CONCURRENCY)
+
+
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def _host(self, host):
+        stats = self._hosts.get(host)
+        if stats is None:
+            stats = self._hosts[host] = {'requests': 0, 'connections': 0}
+        return stats
+
+    def record_request(self, host):
+        with self._lock:
+            self._host(host)['requests'] += 1
+
+    def record_connection(self, host):
+        with self._lock:
+            self._host(host)['connections'] += 1
+
+    def stats(self):
+        """各主机的统计：{主机: {'requests', 'connections', 'reused', 'reuse_rate'}}"""
+        with self._lock:
+            result = {}
+            for host, stats in self._hosts.items():
+                reused = max(0, stats['requests'] - stats['connections'])
+                result[host] = dict(stats, reused=reused,
+                                    reuse_rate=reused / stats['requests'] if stats['requests'] else 0.0)
+            return result
+
+    def summary(self):
+        """一行汇总，用于爬取结束时输出"""
+        stats = self.stats()
+        if not stats:
+            return "连接复用: 无请求"
+        hosts = ", ".join(
+            f"{host} {item['requests']} 次请求/新建 {item['connections']} 个连接 (复用率 {item['reuse_rate']:.0%})"
+            for host, item in sorted(stats.items())
+        )
+        return f"连接复用: {hosts}"
+
+
+def pool_host(pool):
+    """连接池对应的主机名（默认端口时不带端口，与URL中的写法一致）"""
+    if pool.port is None or pool.port == DEFAULT_PORTS.get(pool.scheme):
+        return pool.host
+    return f"{pool.host}:{pool.port}"
+
+
+class CountingHTTPConnectionPool(HTTPConnectionPool):
+    stats = None
+
+    def _new_conn(self):
+        if self.stats is not None:
+            self.stats.record_connection(pool_host(self))
+        return super()._new_conn()
+
+    def urlopen(self, method, url, *args, **kwargs):
+        if self.stats is not None:
+            self.stats.record_request(pool_host(self))
+        return super().urlopen(method, url, *args, **kwargs)
+
+
+class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    stats = None
+    _new_conn = CountingHTTPConnectionPool._new_conn
+    urlopen = CountingHTTPConnectionPool.urlopen
+
+
+class TunedPoolManager(PoolManager):
+    def __init__(self, *args, pool_sizes=None, stats=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # 按主机覆盖连接池大小：{主机: 连接数}，主机可写作 "host" 或 "host:port"
+        self.pool_sizes = dict(pool_sizes or {})
+        self.stats = stats
+        self.pool_classes_by_scheme = {'http': CountingHTTPConnectionPool, 'https': CountingHTTPSConnectionPool}
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        if request_context is None:
+            request_context = self.connection_pool_kw.copy()
+        size = self.pool_sizes.get(f"{host}:{port}", self.pool_sizes.get(host))
+        if size is not None:
+            request_context['maxsize'] = size
+        pool = super()._new_pool(scheme, host, port, request_context)
+        pool.stats = self.stats
+        return pool
+
+
+class PooledAdapter(HTTPAdapter):
+    def __init__(self, pool_sizes=None, stats=None, tcp_keepalive=HTTP_TCP_KEEPALIVE, **kwargs):
+        self.pool_sizes = HTTP_POOL_SIZES if pool_sizes is None else pool_sizes
+        self.stats = stats
+        self.tcp_keepalive = tcp_keepalive
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        """创建带按主机池大小和复用统计的 PoolManager"""
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+
+        if self.tcp_keepalive:
+            # 空闲连接开启 TCP keepalive，避免长时间等待（限速、退避）后被中间设备静默断开
+            pool_kwargs.setdefault('socket_options', HTTPConnection.default_socket_options + [
+                (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+            ])
+        self.poolmanager = TunedPoolManager(num_pools=connections, maxsize=maxsize, block=block,
+                                            pool_sizes=self.pool_sizes, stats=self.stats, **pool_kwargs)
+
+
+def create_session(headers=None, pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE,
+                   pool_sizes=None, stats=None):
+    """创建带连接池的会话；session.pool_stats 记录每个主机的请求数和新建连接数"""
+    session = RetrySession()
+    session.headers.update(HEADERS if headers is None else headers)
+    session.pool_stats = stats if stats is not None else PoolStats()
+    adapter = PooledAdapter(pool_sizes=pool_sizes, stats=session.pool_stats,
+                            pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+_shared_session = None
+_shared_lock = threading.Lock()
+
+
+def get_session():
+    """进程内共享的会话，所有爬虫和线程复用同一组连接
+
+    会话由多个爬虫共用，不要修改 session.headers；需要额外的请求头时按请求传入 headers=
+    """
+    global _shared_session
+    with _shared_lock:
+        if _shared_session is None:
+            _shared_session = create_session()
+        return _shared_session
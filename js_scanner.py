@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+单遍JS扫描器 - 对打包文件只遍历一次，同时找出所有API端点和关键词
+所有端点正则合并为一个编译好的正则（各分支一个捕获组，由 lastindex 取出命中的值）；
+关键词不区分大小写，按窗口逐块转成小写后查找，只为当前窗口分配小写副本，不再为每个关键词复制整个文件。
+支持字符串、bytes / mmap（已保存的文件不必读入内存）以及按块到达的响应流
+"""
+
+import re
+import mmap
+from urllib.parse import urljoin
+
+# 各爬虫原来分别扫描的API端点模式合并后的结果（每个模式恰好一个捕获组）
+API_PATTERNS = [
+    r'["\'](/(?:api|data|json|ajax|v[12]|rest|notice|level|download|file)/[^"\']+)["\']',
+    r'url:\s*["\']([^"\']+)["\']',
+    r'fetch\(["\']([^"\']+)["\']',
+    r'axios\.get\(["\']([^"\']+)["\']',
+]
+
+JS_KEYWORDS = [
+    'pdf', 'download', 'level', 'notice', 'api', 'data',
+    'list', 'query', 'search', 'file', 'document'
+]
+
+# 关键词查找的窗口大小
+WINDOW_SIZE = 256 * 1024
+# 按块扫描时保留的上一块末尾长度：跨块的端点只要短于该长度就不会被截断
+CHUNK_OVERLAP = 4096
+
+
+def endpoint_urls(endpoints, base_url):
+    """把扫描出的端点转换为URL：以 / 开头的路径相对 base_url 解析，含 http 的保留，其余（如格式字符串）丢弃"""
+    urls = []
+    for endpoint in endpoints:
+        if endpoint.startswith('/'):
+            urls.append(urljoin(base_url, endpoint))
+        elif 'http' in endpoint:
+            urls.append(endpoint)
+    return urls
+
+
+class JsScanner:
+    def __init__(self, patterns=API_PATTERNS, keywords=JS_KEYWORDS):
+        for pattern in patterns:
+            if re.compile(pattern).groups != 1:
+                raise ValueError(f"端点模式必须恰好有一个捕获组: {pattern}")
+        self.patterns = list(patterns)
+        self.keywords = [keyword.lower() for keyword in keywords]
+
+        source = '|'.join(f'(?:{pattern})' for pattern in self.patterns) or r'(?!)'
+        self._endpoint_re = {str: re.compile(source), bytes: re.compile(source.encode('utf-8'))}
+        self._keyword_bytes = {keyword: keyword.encode('utf-8') for keyword in self.keywords}
+        # 窗口之间重叠的长度，跨窗口的关键词不会漏掉
+        self._keyword_overlap = max((len(keyword) for keyword in self._keyword_bytes.values()), default=1) - 1
+
+    def _endpoints(self, content, kind, endpoints, start=0, stop=None):
+        """把 content[start:] 中的端点追加到 endpoints；stop 不为 None 时遇到结束位置超过 stop
+        的匹配就停下，返回下一次应开始扫描的位置"""
+        position = start
+        for match in self._endpoint_re[kind].finditer(content, start):
+            if stop is not None and match.end() > stop:
+                return match.start()
+            position = match.end()
+            value = match.group(match.lastindex)
+            endpoints.append(value if kind is str else value.decode('utf-8', 'replace'))
+        return position if stop is None else max(position, stop)
+
+    def _keywords(self, content, kind, found, start=0, end=None):
+        """在 content[start:end] 中查找尚未出现的关键词（逐窗口转小写，全部出现后提前结束）"""
+        end = len(content) if end is None else end
+        pending = [keyword for keyword in self.keywords if keyword not in found]
+        position = start
+        while pending and position < end:
+            window = content[position:min(end, position + WINDOW_SIZE + self._keyword_overlap)].lower()
+            for keyword in pending:
+                if (keyword if kind is str else self._keyword_bytes[keyword]) in window:
+                    found.add(keyword)
+            pending = [keyword for keyword in pending if keyword not in found]
+            position += WINDOW_SIZE
+
+    def _result(self, endpoints, found):
+        """端点按发现顺序去重，关键词按配置顺序列出"""
+        return {
+            'endpoints': list(dict.fromkeys(endpoints)),
+            'keywords': [keyword for keyword in self.keywords if keyword in found],
+        }
+
+    def scan(self, content):
+        """扫描字符串、bytes 或 mmap，返回 {'endpoints': [...], 'keywords': [...]}"""
+        kind = str if isinstance(content, str) else bytes
+        endpoints, found = [], set()
+        self._endpoints(content, kind, endpoints)
+        self._keywords(content, kind, found)
+        return self._result(endpoints, found)
+
+    def scan_file(self, path):
+        """通过 mmap 扫描已保存的文件（不把整个文件读入内存）"""
+        with open(path, 'rb') as f:
+            try:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # 空文件无法映射
+                return self._result([], set())
+            with mapped:
+                return self.scan(mapped)
+
+    def scan_chunks(self, chunks, overlap=CHUNK_OVERLAP):
+        """扫描按块到达的 bytes（例如 response.iter_content()）：每块到达时即扫描，
+        只保留末尾 overlap 字节与下一块拼接，跨块的端点和关键词不会丢失"""
+        endpoints, found = [], set()
+        buffer = b''
+        keyword_start = 0   # buffer 中尚未查找关键词的起始位置
+        for chunk in chunks:
+            if not chunk:
+                continue
+            buffer += chunk
+            if len(buffer) <= overlap:
+                continue
+            stop = len(buffer) - overlap
+            resume = self._endpoints(buffer, bytes, endpoints, stop=stop)
+            self._keywords(buffer, bytes, found, start=keyword_start)
+            # 末尾不完整的关键词留到下一块：下一次从最后 (最长关键词长度 - 1) 个字节开始查找
+            keep = min(resume, len(buffer) - self._keyword_overlap)
+            keyword_start = len(buffer) - self._keyword_overlap - keep
+            buffer = buffer[keep:]
+        if buffer:
+            self._endpoints(buffer, bytes, endpoints)
+            self._keywords(buffer, bytes, found, start=max(keyword_start, 0))
+        return self._result(endpoints, found)
+
+
+_default_scanner = None
+
+
+def get_js_scanner():
+    """使用默认端点模式和关键词的扫描器（编译一次，各爬虫共用）"""
+    global _default_scanner
+    if _default_scanner is None:
+        _default_scanner = JsScanner()
+    return _default_scanner
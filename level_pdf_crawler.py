@@ -7,20 +7,42 @@
 import os
 import re
 import time
-import subprocess
 import tempfile
 import json
 from pathlib import Path
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urlparse
 import requests
 
+from download_engine import DownloadEngine
+from blob_store import BlobStore
+from link_extractor import extract_links
+from crawl_frontier import CrawlFrontier
+from bloom_filter import create_visited_set
+from config import VISITED_BLOOM_DIR
+from rate_limiter import get_scheduler
+from http_client import get_session
+from dom_cache import get_dom_cache
+from browser_service import get_browser_service
+
 class LevelPDFCrawler:
     def __init__(self, base_url="https://ydydj.univsport.com/level/Levelnotice"):
         self.base_url = base_url
         self.download_dir = "level_pdf_downloads"
-        self.visited_urls = set()
         self.downloaded_files = []
+        # 每主机令牌桶限速：页面和PDF按各自主机的预算放行，代替每页之后的固定暂停
+        self.scheduler = get_scheduler()
+        # 页面和PDF都通过进程内共享连接池请求，复用 keep-alive 连接
+        self.session = get_session()
+        self.download_engine = DownloadEngine(self.session, blob_store=BlobStore(), scheduler=self.scheduler)
+        # 渲染结果缓存：打包文件未变化的页面不再重复启动浏览器
+        self.dom_cache = get_dom_cache()
+        # 常驻浏览器渲染服务，不再为每个URL启动一次 --dump-dom 浏览器进程
+        self.browser_service = get_browser_service()
         self.setup_directories()
+        # 待抓取/已抓取的页面保存在磁盘上，替代内存中的 visited_urls 和递归
+        # 已入队URL集合按 VISITED_BACKEND 配置（布隆过滤器文件与队列数据库放在一起）
+        self.visited = create_visited_set(os.path.join(self.download_dir, VISITED_BLOOM_DIR))
+        self.frontier = CrawlFrontier.for_directory(self.download_dir, seen=self.visited)
         
     def setup_directories(self):
         """创建下载目录"""
@@ -31,48 +53,26 @@ class LevelPDFCrawler:
         return self.get_page_with_browser(url)
     
     def get_page_with_browser(self, url):
-        """使用浏览器获取页面内容"""
-        try:
-            # 尝试使用google-chrome
-            result = subprocess.run([
-                'google-chrome',
-                '--headless',
-                '--disable-gpu',
-                '--no-sandbox',
-                '--disable-dev-shm-usage',
-                '--window-size=1920,1080',
-                '--dump-dom',
-                url
-            ], capture_output=True, text=True, timeout=120)
-            
-            if result.returncode == 0:
-                return result.stdout
-            else:
-                print(f"Chrome命令失败: {result.stderr}")
-                # 尝试使用curl获取基础页面
-                return self.get_page_with_curl(url)
-                
-        except subprocess.TimeoutExpired:
-            print("浏览器操作超时")
-            return ""
-        except Exception as e:
-            print(f"浏览器操作失败: {e}")
-            return ""
+        """使用浏览器获取页面内容（优先使用渲染结果缓存），浏览器失败时直接请求基础页面"""
+        html = self.dom_cache.fetch(url, self.render_page)
+        if html is None:
+            return self.get_page_with_session(url)
+        return html
     
-    def get_page_with_curl(self, url):
-        """使用curl获取页面内容"""
+    def render_page(self, url):
+        """用常驻浏览器服务渲染页面，返回渲染后的DOM；失败时返回 None"""
+        self.scheduler.wait(url)
+        return self.browser_service.render(url)
+
+    def get_page_with_session(self, url):
+        """使用共享连接池获取页面内容（不执行JavaScript）"""
         try:
-            result = subprocess.run([
-                'curl', '-s', '-L', url
-            ], capture_output=True, text=True, timeout=30)
-            
-            if result.returncode == 0:
-                return result.stdout
-            else:
-                print(f"Curl命令失败: {result.stderr}")
-                return ""
-        except Exception as e:
-            print(f"Curl操作失败: {e}")
+            self.scheduler.wait(url)
+            response = self.session.get(url, timeout=30)
+            response.raise_for_status()
+            return response.text
+        except requests.RequestException as e:
+            print(f"页面请求失败: {e}")
             return ""
     
     def extract_links(self, content, base_url):
@@ -80,31 +80,15 @@ class LevelPDFCrawler:
         links = []
         
         # 提取a标签链接
-        a_pattern = r'<a[^>]*href="([^"]*)"[^>]*>(.*?)</a>'
-        a_matches = re.findall(a_pattern, content, re.IGNORECASE | re.DOTALL)
+        for link in extract_links(content, base_url, kinds=('href',), accept=lambda link: link['tag'] == 'a'):
+            links.append({
+                'url': link['url'],
+                'text': link['text'] or self.get_link_text_from_url(link['url']),
+                'type': 'link',
+                'original_href': link['original_href']
+            })
         
-        for href, text in a_matches:
-            if href and not href.startswith(('javascript:', 'mailto:', 'tel:')):
-                full_url = urljoin(base_url, href)
-                text = re.sub(r'<[^>]*>', '', text).strip()
-                
-                links.append({
-                    'url': full_url,
-                    'text': text or self.get_link_text_from_url(full_url),
-                    'type': 'link',
-                    'original_href': href
-                })
-        
-        # 去重
-        unique_links = []
-        seen_urls = set()
-        
-        for link in links:
-            if link['url'] not in seen_urls:
-                unique_links.append(link)
-                seen_urls.add(link['url'])
-        
-        return unique_links
+        return links
     
     def get_link_text_from_url(self, url):
         """从URL中提取有意义的文本"""
@@ -126,86 +110,88 @@ class LevelPDFCrawler:
         return url.lower().endswith('.pdf')
     
     def download_pdf(self, url, filename):
-        """下载PDF文件"""
+        """下载PDF文件（写入 .part 文件，完成后才重命名，中断后可续传）"""
         try:
-            # 使用curl下载
-            result = subprocess.run([
-                'curl', '-s', '-L', '-o', filename, url
-            ], capture_output=True, timeout=60)
-            
-            if result.returncode == 0:
-                # 检查文件是否有效
-                if os.path.getsize(filename) > 0:
-                    return True
-            
-            return False
+            result = self.download_engine.download(url, filename)
+            return result['size'] > 0
             
         except Exception as e:
             print(f"下载失败: {e}")
             return False
     
-    def crawl_level_page(self, url, depth=0, max_depth=3):
-        """递归爬取页面"""
-        if depth > max_depth or url in self.visited_urls:
-            return
-        
-        self.visited_urls.add(url)
+    def crawl_level_page(self, page, max_depth=3):
+        """抓取队列中的一个页面：下载PDF，非PDF链接按下一层深度入队"""
+        url = page['url']
+        depth = page['depth']
+        indent = '  ' * min(depth, 10)
         
-        print(f"{'  ' * depth}[深度 {depth}] 访问: {url}")
+        print(f"{indent}[深度 {depth}] 访问: {url}")
         
         # 获取页面内容
         content = self.get_page_content(url)
         if not content:
-            print(f"{'  ' * depth}✗ 无法获取页面内容")
+            print(f"{indent}✗ 无法获取页面内容")
+            self.frontier.mark_failed(url, "无法获取页面内容")
             return
         
         # 提取链接
         links = self.extract_links(content, url)
         
         if not links:
-            print(f"{'  ' * depth}未找到链接")
+            print(f"{indent}未找到链接")
+            self.frontier.mark_fetched(url)
             return
         
         # 处理当前页面的PDF链接
         pdf_links = [link for link in links if self.is_pdf_link(link['url'])]
         
         if pdf_links:
-            print(f"{'  ' * depth}发现 {len(pdf_links)} 个PDF文件")
+            print(f"{indent}发现 {len(pdf_links)} 个PDF文件")
             
             for pdf_link in pdf_links:
                 filename = self.sanitize_filename(pdf_link['text'] + ".pdf")
                 filepath = os.path.join(self.download_dir, filename)
                 
                 if not os.path.exists(filepath):
-                    print(f"{'  ' * depth}下载: {filename}")
+                    print(f"{indent}下载: {filename}")
                     
                     if self.download_pdf(pdf_link['url'], filepath):
                         file_size = os.path.getsize(filepath)
-                        print(f"{'  ' * depth}✓ 下载完成: {file_size} 字节")
+                        print(f"{indent}✓ 下载完成: {file_size} 字节")
                         self.downloaded_files.append({
                             'filename': filename,
                             'url': pdf_link['url'],
                             'size': file_size
                         })
                     else:
-                        print(f"{'  ' * depth}✗ 下载失败")
+                        print(f"{indent}✗ 下载失败")
                 else:
-                    print(f"{'  ' * depth}✓ 文件已存在: {filename}")
+                    print(f"{indent}✓ 文件已存在: {filename}")
         
-        # 递归处理非PDF链接
+        # 非PDF链接入队，已经出现过的URL（任何状态）不会重复入队
         non_pdf_links = [link for link in links if not self.is_pdf_link(link['url'])]
         
-        if non_pdf_links:
-            print(f"{'  ' * depth}继续处理 {len(non_pdf_links)} 个非PDF链接")
+        if non_pdf_links and depth < max_depth:
+            added = self.frontier.add_many((link['url'], depth + 1, url) for link in non_pdf_links)
+            print(f"{indent}{len(non_pdf_links)} 个非PDF链接, 新入队 {added} 个")
+        
+        self.frontier.mark_fetched(url)
+    
+    def crawl_frontier(self, max_depth=3):
+        """按广度优先依次处理队列中的页面，直到队列为空"""
+        while True:
+            page = self.frontier.pop()
+            if page is None:
+                break
             
-            for link in non_pdf_links:
-                # 避免无限循环
-                if link['url'] not in self.visited_urls:
-                    self.crawl_level_page(link['url'], depth + 1, max_depth)
-                    time.sleep(1)  # 短暂暂停
+            try:
+                self.crawl_level_page(page, max_depth)
+            except Exception as e:
+                print(f"处理页面失败 {page['url']}: {e}")
+                self.frontier.mark_failed(page['url'], e)
     
-    def crawl(self):
-        """执行爬虫"""
+    def crawl(self, max_depth=3, resume=True):
+        """执行爬虫；上次运行中断且 resume 为 True 时从队列中继续"""
         print("=" * 60)
         print("PDF爬虫开始运行")
         print("目标网站:", self.base_url)
@@ -215,15 +201,29 @@ class LevelPDFCrawler:
         start_time = time.time()
         
         try:
-            # 开始递归爬取
-            self.crawl_level_page(self.base_url)
+            if resume and self.frontier.has_pending():
+                requeued = self.frontier.requeue_in_progress()
+                counts = self.frontier.counts()
+                print(f"继续上次未完成的爬取: 已抓取 {counts['fetched']} 个页面, "
+                      f"待抓取 {counts['queued']} 个 (其中 {requeued} 个中断时正在处理)")
+            else:
+                self.frontier.reset()
+                self.frontier.add(self.base_url, depth=0)
+            
+            # 广度优先处理队列
+            self.crawl_frontier(max_depth)
             
             # 输出结果
             print("\n" + "=" * 60)
             print("爬虫运行完成!")
             print(f"运行时间: {time.time() - start_time:.2f} 秒")
-            print(f"访问页面数: {len(self.visited_urls)}")
+            counts = self.frontier.counts()
+            print(f"访问页面数: {counts['fetched']} (失败 {counts['failed']})")
             print(f"下载文件数: {len(self.downloaded_files)}")
+            print(self.scheduler.summary())
+            print(self.session.pool_stats.summary())
+            print(self.dom_cache.summary())
+            print(self.browser_service.summary())
             
             if self.downloaded_files:
                 print("\n下载的文件列表:")
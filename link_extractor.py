@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+单遍链接提取器 - 用一个编译好的词法正则按顺序扫描HTML一次
+同时收集 href、onclick 目标、src、download 属性以及脚本中的 window.location 跳转
+"""
+
+import re
+from html import unescape
+from urllib.parse import urljoin, urlsplit
+
+from link_set import LinkSet
+
+IGNORED_SCHEMES = ('javascript:', 'mailto:', 'tel:')
+
+# 词法单元：注释 / 整个 script 元素 / 整个 style 元素 / 带链接属性的开始标签
+# 其余标签和文本由正则引擎直接跳过；属性值中的 '>' 不会截断标签
+ATTRIBUTES = r'((?:[^>"\']|"[^"]*"|\'[^\']*\')*)'
+TOKEN = re.compile(
+    r'<!--.*?(?:-->|\Z)'
+    r'|<(?i:script)\b' + ATTRIBUTES + r'>(.*?)(?:</(?i:script)\s*>|\Z)'
+    r'|<(?i:style)\b[^>]*>.*?(?:</(?i:style)\s*>|\Z)'
+    r'|<([a-zA-Z][^\s/>]*)(?=[^>]*?(?i:href|src|onclick|download))' + ATTRIBUTES + r'>',
+    re.DOTALL
+)
+TAG = re.compile(r'<[^>]*>')
+ATTRIBUTE = re.compile(r'([^\s=/>]+)(?:\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+)))?')
+
+# onclick 中第一个带引号的字符串视为跳转目标
+QUOTED_TARGET = re.compile(r'["\']([^"\']+)["\']')
+# 脚本中的 window.location(.href) = '...'
+LOCATION_TARGET = re.compile(r'window\.location(?:\.href)?\s*=\s*["\']([^"\']+)["\']')
+
+VOID_ELEMENTS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'param', 'source', 'track', 'wbr',
+])
+
+_same_tag_patterns = {}
+
+
+def parse_attributes(source):
+    """解析标签属性，返回 {小写属性名: 值}，没有值的属性为空字符串"""
+    attrs = {}
+    for match in ATTRIBUTE.finditer(source):
+        name = match.group(1).lower()
+        if name in attrs:
+            continue
+        value = match.group(2)
+        if value is None:
+            value = match.group(3)
+        if value is None:
+            value = match.group(4) or ''
+        attrs[name] = unescape(value)
+    return attrs
+
+
+def element_text(html_content, tag, start):
+    """从开始标签之后取元素内的纯文本（按同名标签计数找到对应的结束标签）"""
+    pattern = _same_tag_patterns.get(tag)
+    if pattern is None:
+        pattern = _same_tag_patterns[tag] = re.compile(
+            r'<(/?)' + re.escape(tag) + r'(?=[\s/>])' + ATTRIBUTES + '>', re.IGNORECASE)
+
+    end = len(html_content)
+    depth = 1
+    for match in pattern.finditer(html_content, start):
+        if match.group(1):
+            depth -= 1
+            if depth == 0:
+                end = match.start()
+                break
+        elif not match.group(2).endswith('/'):
+            depth += 1
+
+    text = TAG.sub('', html_content[start:end])
+    return ' '.join(unescape(text).split())
+
+
+def links_from_tag(attr_source):
+    """从一个开始标签的属性中提取链接，返回 [(kind, value, download)]"""
+    attrs = parse_attributes(attr_source)
+    download = attrs.get('download')
+
+    found = []
+    if attrs.get('href'):
+        found.append(('href', attrs['href'], download))
+    if attrs.get('src'):
+        found.append(('src', attrs['src'], download))
+    if attrs.get('onclick'):
+        match = QUOTED_TARGET.search(attrs['onclick'])
+        if match:
+            found.append(('onclick', match.group(1), None))
+    return found
+
+
+def new_link(value, kind, tag, download=None):
+    """创建链接字典；url 在 extract_links 过滤之后才解析为绝对地址"""
+    return {
+        'url': None,
+        'original_href': value,
+        'kind': kind,
+        'tag': tag,
+        'text': '',
+        'download': download,
+    }
+
+
+def scan_links(html_content):
+    """扫描一次文档，按出现顺序返回链接字典
+
+    每条链接包含 original_href、kind（href / onclick / src / redirect）、tag、
+    text（元素内的纯文本）、download（download 属性值，没有该属性时为 None）
+    """
+    links = []
+    for match in TOKEN.finditer(html_content):
+        tag = match.group(3)
+        if tag is None:
+            script = match.group(2)
+            if script is not None:
+                for location in LOCATION_TARGET.finditer(script):
+                    links.append(new_link(unescape(location.group(1)), 'redirect', 'script'))
+            continue
+
+        tag = tag.lower()
+        attr_source = match.group(4)
+        text = None
+        for kind, value, download in links_from_tag(attr_source):
+            value = value.strip()
+            if not value or value.lower().startswith(IGNORED_SCHEMES):
+                continue
+
+            link = new_link(value, kind, tag, download)
+            if kind != 'src' and tag not in VOID_ELEMENTS and not attr_source.endswith('/'):
+                if text is None:
+                    text = element_text(html_content, tag, match.end())
+                link['text'] = text
+            links.append(link)
+
+    return links
+
+
+def url_resolver(base_url):
+    """返回把相对地址解析为绝对地址的函数
+
+    以 '/' 开头且不含 '.' 路径段的地址直接拼接到 scheme://host 后面，其余情况交给 urljoin；
+    结果保持原样（不规范化），用于请求页面和作为解析相对链接的基准，规范化URL只作为去重键
+    """
+    base = urlsplit(base_url)
+    origin = f"{base.scheme}://{base.netloc}" if base.scheme and base.netloc else None
+    cache = {}
+
+    def resolve(href):
+        url = cache.get(href)
+        if url is None:
+            if origin and href.startswith('/') and not href.startswith('//') and '/.' not in href:
+                url = origin + href
+            else:
+                url = urljoin(base_url, href)
+            cache[href] = url
+        return url
+
+    return resolve
+
+
+def extract_links(html_content, base_url, kinds=None, accept=None, seen=None):
+    """单遍提取链接，按文档顺序返回按规范化URL去重后的链接列表（link['url'] 为原始绝对地址）
+
+    kinds 可限定链接类型，例如 ('href', 'onclick')；accept(link) 返回 False 的链接在去重前被丢弃；
+    seen 为跨页面共享的已访问集合（set 或布隆过滤器），其中已有的链接不再返回
+    """
+    resolve = url_resolver(base_url)
+    unique_links = LinkSet(seen=seen)
+    for link in scan_links(html_content):
+        if kinds is not None and link['kind'] not in kinds:
+            continue
+
+        link['url'] = resolve(link['original_href'])
+        if accept is not None and not accept(link):
+            continue
+
+        if not unique_links.add(link):
+            # 同一URL出现多次时补全文本和 download 属性
+            existing = unique_links.get(link)
+            if existing is None:
+                continue
+            if not existing['text']:
+                existing['text'] = link['text']
+            if existing['download'] is None:
+                existing['download'] = link['download']
+
+    return unique_links.to_list()
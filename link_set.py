@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+有序链接集合 - 按规范化URL去重，成员判断为 O(1)，保持首次加入的顺序
+元素可以是URL字符串，也可以是带 'url' 键的链接字典
+可选的 seen（set 或布隆过滤器）在多个集合之间共享，已在其中出现过的链接不再加入
+"""
+
+from url_utils import canonicalize_url
+
+
+class LinkSet:
+    def __init__(self, items=(), key=canonicalize_url, seen=None):
+        self.key = key
+        self.seen = seen
+        self._items = {}
+        self.extend(items)
+
+    def item_key(self, item):
+        """元素对应的去重键"""
+        return self.key(item if isinstance(item, str) else item['url'])
+
+    def add(self, item):
+        """加入链接，已存在（规范化后相同）或已在 seen 中时不加入并返回 False"""
+        key = self.item_key(item)
+        if key in self._items:
+            return False
+        if self.seen is not None:
+            if key in self.seen:
+                return False
+            self.seen.add(key)
+        self._items[key] = item
+        return True
+
+    def extend(self, items):
+        """批量加入链接，返回新加入的数量"""
+        added = 0
+        for item in items:
+            if self.add(item):
+                added += 1
+        return added
+
+    def get(self, item, default=None):
+        """取出与URL（或链接字典）对应的已有元素"""
+        return self._items.get(self.item_key(item), default)
+
+    def discard(self, item):
+        """移除链接（不存在时忽略）"""
+        self._items.pop(self.item_key(item), None)
+
+    def urls(self):
+        """按加入顺序返回URL列表"""
+        return [item if isinstance(item, str) else item['url'] for item in self._items.values()]
+
+    def to_list(self):
+        """按加入顺序返回元素列表"""
+        return list(self._items.values())
+
+    def __contains__(self, item):
+        return self.item_key(item) in self._items
+
+    def __iter__(self):
+        return iter(self._items.values())
+
+    def __len__(self):
+        return len(self._items)
+
+    def __repr__(self):
+        return f"LinkSet({len(self._items)} 个链接)"
@@ -6,12 +6,23 @@ PDF文件爬虫程序 - 专门针对第二层网页的PDF下载
 """
 
 import os
-import time
-import requests
 import re
+import threading
 from urllib.parse import urljoin, urlparse
 import logging
 
+from config import MAX_WORKERS, PER_HOST_LIMIT
+from concurrent_fetcher import ConcurrentFetcher
+from rate_limiter import get_scheduler
+from adaptive_controller import AdaptiveController
+from download_engine import DownloadEngine
+from validator_store import ValidatorStore
+from blob_store import BlobStore
+from link_extractor import extract_links
+from link_set import LinkSet
+from url_utils import canonicalize_url
+from http_client import get_session
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -24,23 +35,35 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class PDFCrawler:
-    def __init__(self):
+    def __init__(self, max_workers=MAX_WORKERS, per_host_limit=PER_HOST_LIMIT,
+                 scheduler=None, controller=None, download_dir="pdf_downloads"):
         self.base_url = "https://ydydj.univsport.com"
         self.target_url = "https://ydydj.univsport.com/level/Levelnotice"
-        self.download_dir = "pdf_downloads"
+        self.download_dir = download_dir
         self.setup_download_dir()
         
-        # 设置请求头
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-        }
+        # 进程内共享连接池（请求头取自 config.HEADERS），页面和PDF复用同一组连接
+        self.session = get_session()
+        
+        # 每主机令牌桶限速，页面抓取和PDF下载共用同一预算
+        self.scheduler = scheduler if scheduler is not None else get_scheduler()
+        # 自适应并发：每主机并发窗口在 1 到 per_host_limit 之间按延迟和 429 / 503 调整
+        self.controller = controller if controller is not None else AdaptiveController(per_host_limit)
         
-        self.session = requests.Session()
-        self.session.headers.update(self.headers)
+        # 第二层页面的并发抓取器
+        self.fetcher = ConcurrentFetcher(max_workers, per_host_limit, self.scheduler)
+        
+        # 增量爬取：保存校验值，未变化的页面和PDF只传输响应头
+        self.validators = ValidatorStore.for_directory(self.download_dir)
+        # 内容寻址存储：同一PDF以不同文件名出现时只保存一份
+        self.blob_store = BlobStore()
+        self.download_engine = DownloadEngine(self.session, timeout=30, validator_store=self.validators,
+                                              blob_store=self.blob_store, scheduler=self.scheduler,
+                                              controller=self.controller)
+        self.stats = {'unchanged_pages': 0, 'unchanged_pdfs': 0, 'shared_pdfs': 0}
+        self.stats_lock = threading.Lock()
+        # 多个第二层页面链接同一PDF时只由第一个页面下载（页面并发处理，按规范化URL去重）
+        self.claimed_pdfs = LinkSet()
     
     def setup_download_dir(self):
         """创建下载目录"""
@@ -48,22 +71,41 @@ class PDFCrawler:
             os.makedirs(self.download_dir)
             logger.info(f"创建PDF下载目录: {self.download_dir}")
     
+    def claim_pdf(self, pdf_url):
+        """登记要下载的PDF，已由其他页面登记过时返回 False"""
+        with self.stats_lock:
+            return self.claimed_pdfs.add(pdf_url)
+    
+    def count(self, key):
+        """线程安全地累加统计项"""
+        with self.stats_lock:
+            self.stats[key] += 1
+    
     def get_first_level_links(self):
         """获取第一层页面的所有链接"""
         logger.info("正在获取第一层页面链接...")
         
         try:
-            response = self.session.get(self.target_url, timeout=10)
+            first_level_path = os.path.join(self.download_dir, 'first_level.html')
+            headers = self.validators.conditional_headers(self.target_url, first_level_path)
+            response = self.controller.get(self.session, self.target_url, throttle=self.scheduler.wait,
+                                           timeout=10, headers=headers)
             
-            if response.status_code != 200:
+            if response.status_code == 304:
+                # 页面未变化，使用上次保存的内容
+                logger.info("第一层页面未变化，使用已保存的内容")
+                with open(first_level_path, 'r', encoding='utf-8') as f:
+                    html_content = f.read()
+            elif response.status_code != 200:
                 logger.error(f"第一层页面访问失败，状态码: {response.status_code}")
                 return []
-            
-            html_content = response.text
-            
-            # 保存第一层页面内容
-            with open(os.path.join(self.download_dir, 'first_level.html'), 'w', encoding='utf-8') as f:
-                f.write(html_content)
+            else:
+                html_content = response.text
+                
+                # 保存第一层页面内容
+                with open(first_level_path, 'w', encoding='utf-8') as f:
+                    f.write(html_content)
+                self.validators.update_from_response(self.target_url, response)
             
             # 提取所有链接
             links = re.findall(r'href="([^"]+)"', html_content)
@@ -86,11 +128,11 @@ class PDFCrawler:
                         full_url = link
                     
                     # 排除当前页面
-                    if full_url != self.target_url:
+                    if canonicalize_url(full_url) != canonicalize_url(self.target_url):
                         second_level_links.append(full_url)
             
             # 去重
-            second_level_links = list(set(second_level_links))
+            second_level_links = LinkSet(second_level_links).to_list()
             logger.info(f"过滤后得到 {len(second_level_links)} 个第二层页面链接")
             
             # 显示前几个链接
@@ -105,141 +147,133 @@ class PDFCrawler:
     
     def crawl_second_level_pages(self, second_level_links):
         """爬取第二层页面并下载PDF文件"""
-        logger.info("开始爬取第二层页面...")
+        logger.info(f"开始爬取第二层页面 (并发数: {self.fetcher.max_workers}, "
+                    f"每主机并发: {self.fetcher.per_host_limit})...")
         
-        total_pdfs_downloaded = 0
+        total = len(second_level_links)
+        page_nums = range(1, total + 1)
         
-        for i, page_url in enumerate(second_level_links):
-            logger.info(f"处理第 {i+1}/{len(second_level_links)} 个第二层页面: {page_url}")
-            
-            try:
-                # 访问第二层页面
-                response = self.session.get(page_url, timeout=10)
-                
-                if response.status_code != 200:
-                    logger.warning(f"页面访问失败: {page_url}, 状态码: {response.status_code}")
-                    continue
-                
-                html_content = response.text
-                
-                # 保存第二层页面内容
-                page_filename = f"second_level_{i+1}.html"
-                with open(os.path.join(self.download_dir, page_filename), 'w', encoding='utf-8') as f:
-                    f.write(html_content)
-                
-                # 查找PDF文件链接
-                pdf_links = self.find_pdf_links(html_content, page_url)
-                
-                if pdf_links:
-                    logger.info(f"在页面 {page_url} 中找到 {len(pdf_links)} 个PDF文件")
-                    
-                    # 下载PDF文件
-                    downloaded_count = self.download_pdfs(pdf_links, page_url, i+1)
-                    total_pdfs_downloaded += downloaded_count
-                else:
-                    logger.info(f"页面 {page_url} 中没有找到PDF文件")
-                
-                # 添加延迟，避免请求过快
-                time.sleep(1)
-                
-            except Exception as e:
-                logger.error(f"处理第二层页面失败 {page_url}: {e}")
-                continue
+        # 按输入顺序返回每个页面下载的PDF数量
+        results = self.fetcher.map(self.process_second_level_page, second_level_links,
+                                   page_nums, [total] * total)
         
-        return total_pdfs_downloaded
+        return sum(results)
     
-    def find_pdf_links(self, html_content, page_url):
-        """在HTML内容中查找PDF文件链接"""
-        pdf_links = []
+    def process_second_level_page(self, page_url, page_num, total):
+        """处理单个第二层页面，返回下载成功的PDF数量"""
+        logger.info(f"处理第 {page_num}/{total} 个第二层页面: {page_url}")
         
-        # 方法1: 直接查找PDF链接
-        pdf_patterns = [
-            r'href="([^"]+\.pdf)"',
-            r'src="([^"]+\.pdf)"',
-            r'download="([^"]+\.pdf)"',
-        ]
-        
-        for pattern in pdf_patterns:
-            matches = re.findall(pattern, html_content, re.IGNORECASE)
-            for match in matches:
-                # 构建完整URL
-                if match.startswith('http'):
-                    full_url = match
-                else:
-                    full_url = urljoin(page_url, match)
-                
-                if full_url not in pdf_links:
-                    pdf_links.append(full_url)
-        
-        # 方法2: 查找包含"pdf"关键词的链接
-        all_links = re.findall(r'href="([^"]+)"', html_content)
-        for link in all_links:
-            if '.pdf' in link.lower() or 'pdf' in link.lower():
-                # 构建完整URL
-                if link.startswith('http'):
-                    full_url = link
-                else:
-                    full_url = urljoin(page_url, link)
+        try:
+            # 访问第二层页面（页面及其PDF上次已全部处理完时发送条件请求）
+            # 抓取器在任务开始前已按主机限速，这里只经过自适应并发窗口
+            headers = self.validators.conditional_headers(page_url)
+            response = self.controller.get(self.session, page_url, timeout=10, headers=headers)
+            
+            if response.status_code == 304:
+                logger.info(f"页面未变化，跳过: {page_url}")
+                self.count('unchanged_pages')
+                return 0
+            
+            if response.status_code != 200:
+                logger.warning(f"页面访问失败: {page_url}, 状态码: {response.status_code}")
+                return 0
+            
+            html_content = response.text
+            
+            # 保存第二层页面内容
+            page_filename = f"second_level_{page_num}.html"
+            with open(os.path.join(self.download_dir, page_filename), 'w', encoding='utf-8') as f:
+                f.write(html_content)
+            
+            # 查找PDF文件链接
+            pdf_links = self.find_pdf_links(html_content, page_url)
+            
+            if pdf_links:
+                logger.info(f"在页面 {page_url} 中找到 {len(pdf_links)} 个PDF文件")
                 
-                if full_url not in pdf_links:
-                    pdf_links.append(full_url)
-        
-        # 方法3: 查找下载链接
-        download_links = re.findall(r'href="([^"]+)"[^>]*download', html_content)
-        for link in download_links:
-            # 构建完整URL
-            if link.startswith('http'):
-                full_url = link
+                # 下载PDF文件
+                downloaded_count, all_done = self.download_pdfs(pdf_links, page_url, page_num)
             else:
-                full_url = urljoin(page_url, link)
+                logger.info(f"页面 {page_url} 中没有找到PDF文件")
+                downloaded_count, all_done = 0, True
+            
+            # 只有页面上的PDF都处理成功后才记录校验值，失败的PDF下次会重试
+            if all_done:
+                self.validators.update_from_response(page_url, response)
+            return downloaded_count
             
-            if full_url not in pdf_links:
-                pdf_links.append(full_url)
+        except Exception as e:
+            logger.error(f"处理第二层页面失败 {page_url}: {e}")
+            return 0
+    
+    def find_pdf_links(self, html_content, page_url):
+        """在HTML内容中查找PDF文件链接"""
+        # 单遍提取：路径中包含pdf的 href / src，以及带 download 属性的链接
+        def is_pdf_link(link):
+            if link['kind'] == 'href' and link['download'] is not None:
+                return True
+            return 'pdf' in link['original_href'].lower()
+        
+        pdf_links = [link['url'] for link in
+                     extract_links(html_content, page_url, kinds=('href', 'src'), accept=is_pdf_link)]
         
         return pdf_links
     
     def download_pdfs(self, pdf_links, page_url, page_num):
-        """下载PDF文件"""
+        """下载PDF文件，返回 (下载数量, 是否全部处理成功)"""
         downloaded_count = 0
+        all_done = True
         
         for j, pdf_url in enumerate(pdf_links):
             try:
+                if not self.claim_pdf(pdf_url):
+                    logger.info(f"PDF已由其他页面下载，跳过: {pdf_url}")
+                    self.count('shared_pdfs')
+                    continue
+                
                 logger.info(f"正在下载PDF: {pdf_url}")
                 
-                response = self.session.get(pdf_url, timeout=30, stream=True)
+                # 生成文件名
+                filename = self.generate_pdf_filename(pdf_url, page_num, j+1)
+                file_path = os.path.join(self.download_dir, filename)
                 
-                if response.status_code == 200:
-                    # 检查内容类型
-                    content_type = response.headers.get('content-type', '')
-                    
-                    if 'pdf' in content_type.lower() or pdf_url.lower().endswith('.pdf'):
-                        # 生成文件名
-                        filename = self.generate_pdf_filename(pdf_url, page_num, j+1)
-                        file_path = os.path.join(self.download_dir, filename)
-                        
-                        # 下载文件
-                        with open(file_path, 'wb') as f:
-                            for chunk in response.iter_content(chunk_size=8192):
-                                if chunk:
-                                    f.write(chunk)
-                        
-                        # 检查文件大小
-                        file_size = os.path.getsize(file_path)
-                        if file_size > 100:  # 确保不是空文件
-                            logger.info(f"✓ PDF下载成功: {filename} ({file_size} 字节)")
-                            downloaded_count += 1
-                        else:
-                            logger.warning(f"PDF文件太小，可能无效: {filename}")
-                            os.remove(file_path)
+                # 下载文件（先检查内容类型）
+                result = self.download_engine.download(
+                    pdf_url, file_path, accept=lambda info: self.is_pdf_response(pdf_url, info))
+                if result is None:
+                    continue
+                
+                if result['unchanged']:
+                    logger.info(f"PDF未变化: {filename}")
+                    self.count('unchanged_pdfs')
+                    continue
+                
+                # 检查文件大小
+                file_size = result['size']
+                if file_size > 100:  # 确保不是空文件
+                    if result['deduplicated']:
+                        logger.info(f"✓ PDF下载成功: {filename} ({file_size} 字节, 内容重复，已链接到已有文件)")
                     else:
-                        logger.warning(f"链接不是PDF文件: {pdf_url}, 内容类型: {content_type}")
+                        logger.info(f"✓ PDF下载成功: {filename} ({file_size} 字节)")
+                    downloaded_count += 1
                 else:
-                    logger.warning(f"PDF下载失败: {pdf_url}, 状态码: {response.status_code}")
+                    logger.warning(f"PDF文件太小，可能无效: {filename}")
+                    os.remove(file_path)
+                    self.validators.forget(pdf_url)
                 
             except Exception as e:
                 logger.error(f"PDF下载失败 {pdf_url}: {e}")
+                all_done = False
         
-        return downloaded_count
+        return downloaded_count, all_done
+    
+    def is_pdf_response(self, pdf_url, info):
+        """根据内容类型或URL后缀判断是否为PDF"""
+        content_type = info['content_type']
+        if 'pdf' in content_type.lower() or pdf_url.lower().endswith('.pdf'):
+            return True
+        logger.warning(f"链接不是PDF文件: {pdf_url}, 内容类型: {content_type}")
+        return False
     
     def generate_pdf_filename(self, pdf_url, page_num, pdf_num):
         """生成PDF文件名"""
@@ -277,6 +311,13 @@ class PDFCrawler:
         logger.info(f"爬虫任务完成!")
         logger.info(f"处理了 {len(second_level_links)} 个第二层页面")
         logger.info(f"成功下载 {total_pdfs} 个PDF文件")
+        logger.info(f"未变化: {self.stats['unchanged_pages']} 个页面, {self.stats['unchanged_pdfs']} 个PDF文件; "
+                    f"多个页面共用的PDF: {self.stats['shared_pdfs']} 个")
+        logger.info(f"内容去重: {self.blob_store.stats['deduplicated']} 个重复文件, "
+                    f"节省 {self.blob_store.stats['bytes_saved']} 字节")
+        logger.info(self.scheduler.summary())
+        logger.info(self.controller.summary())
+        logger.info(self.session.pool_stats.summary())
         logger.info(f"文件保存在: {self.download_dir}")
         
         # 显示下载的文件列表
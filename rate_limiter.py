@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+每主机令牌桶调度器 - 代替各爬虫中写死的 time.sleep()
+每个主机按自己的速率和突发量放行请求，不同主机（例如主站和附件CDN）互不等待；
+记录每个主机的请求数和等待时间
+"""
+
+import time
+import threading
+from urllib.parse import urlsplit
+
+from config import HOST_RATE, HOST_BURST, HOST_RATES
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """预留令牌，返回需要等待的秒数
+
+        令牌不足时允许透支，后来的请求排在透支部分之后，多个线程按到达顺序依次放行
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self, tokens=1):
+        """取得令牌（必要时等待），返回实际等待的秒数"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class HostScheduler:
+    def __init__(self, rate=HOST_RATE, burst=HOST_BURST, host_rates=None):
+        self.rate = rate
+        self.burst = burst
+        # 按主机覆盖速率：{主机: 速率} 或 {主机: (速率, 突发量)}
+        self.host_rates = dict(HOST_RATES if host_rates is None else host_rates)
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._stats = {}
+
+    def bucket(self, host):
+        """获取（必要时创建）主机对应的令牌桶"""
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                rate, burst = self.rate, self.burst
+                override = self.host_rates.get(host)
+                if isinstance(override, (tuple, list)):
+                    rate, burst = override
+                elif override is not None:
+                    rate = override
+                bucket = self._buckets[host] = TokenBucket(rate, burst)
+                self._stats[host] = {'requests': 0, 'waited': 0, 'wait_time': 0.0}
+            return bucket
+
+    def wait(self, url):
+        """请求 url 之前调用：按主机的令牌桶等待，返回等待的秒数"""
+        host = urlsplit(url).netloc.lower()
+        waited = self.bucket(host).acquire()
+
+        with self._lock:
+            stats = self._stats[host]
+            stats['requests'] += 1
+            if waited > 0:
+                stats['waited'] += 1
+                stats['wait_time'] += waited
+        return waited
+
+    def stats(self):
+        """各主机的统计：{主机: {'requests', 'waited', 'wait_time'}}"""
+        with self._lock:
+            return {host: dict(stats) for host, stats in self._stats.items()}
+
+    @property
+    def total_wait(self):
+        """所有主机累计等待的秒数"""
+        with self._lock:
+            return sum(stats['wait_time'] for stats in self._stats.values())
+
+    def summary(self):
+        """一行汇总，用于爬取结束时输出"""
+        stats = self.stats()
+        if not stats:
+            return "限速等待: 无请求"
+        hosts = ", ".join(
+            f"{host} {item['requests']} 次请求/等待 {item['wait_time']:.1f} 秒"
+            for host, item in sorted(stats.items())
+        )
+        return f"限速等待: 共 {self.total_wait:.1f} 秒 ({hosts})"
+
+
+_shared_scheduler = None
+_shared_lock = threading.Lock()
+
+
+def get_scheduler():
+    """进程内共享的调度器，同一主机的预算由所有爬虫和线程共同使用"""
+    global _shared_scheduler
+    with _shared_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = HostScheduler()
+        return _shared_scheduler
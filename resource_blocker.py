@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+渲染时的资源拦截 - 爬虫只需要读取页面中的链接，不需要字体、图片、媒体和样式表
+浏览器启动时通过 CDP 的 Network.setBlockedURLs 按扩展名（以及可选的第三方主机）拦截这些请求，
+并用浏览器性能接口统计每个页面实际传输的字节数和加载时间，便于对比开启拦截前后的开销
+"""
+
+import threading
+
+from config import BLOCK_RESOURCES, BLOCK_HOSTS
+
+# 各类资源对应的扩展名（Network.setBlockedURLs 只支持按URL通配符匹配）
+RESOURCE_EXTENSIONS = {
+    'font': ['woff', 'woff2', 'ttf', 'otf', 'eot'],
+    'image': ['png', 'jpg', 'jpeg', 'gif', 'webp', 'svg', 'ico', 'bmp', 'avif'],
+    'media': ['mp4', 'webm', 'ogg', 'mp3', 'wav', 'm4a', 'flv', 'm3u8'],
+    'stylesheet': ['css'],
+}
+
+# 返回 [传输字节数, 请求数, 加载时间(毫秒)]；跨域且没有 Timing-Allow-Origin 的资源传输字节数记为 0
+PAGE_COST_SCRIPT = """
+var entries = performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'));
+var bytes = 0;
+for (var i = 0; i < entries.length; i++) { bytes += entries[i].transferSize || 0; }
+var navigation = performance.getEntriesByType('navigation')[0];
+return [bytes, entries.length, navigation ? navigation.loadEventEnd || navigation.duration : null];
+"""
+
+
+def blocked_url_patterns(resources=BLOCK_RESOURCES, hosts=BLOCK_HOSTS):
+    """要拦截的URL通配符：每个扩展名匹配带和不带查询参数的写法，每个主机匹配其下所有URL"""
+    patterns = []
+    for resource in resources:
+        for extension in RESOURCE_EXTENSIONS.get(resource, []):
+            patterns.extend([f'*.{extension}', f'*.{extension}?*'])
+    for host in hosts:
+        patterns.append(f'*://{host}/*')
+    return patterns
+
+
+def configure_options(options, resources=BLOCK_RESOURCES):
+    """启动参数层面的拦截：不加载图片（也覆盖没有扩展名的图片URL）"""
+    if 'image' in resources:
+        options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+    return options
+
+
+def block_resources(driver, resources=BLOCK_RESOURCES, hosts=BLOCK_HOSTS):
+    """在浏览器中开启URL拦截（仅 Chrome 的 CDP 可用）；没有要拦截的内容或不支持时返回 False"""
+    patterns = blocked_url_patterns(resources, hosts)
+    if not patterns:
+        return False
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+        return True
+    except Exception:
+        return False
+
+
+class PageCosts:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pages = 0
+        self.bytes = 0
+        self.requests = 0
+        self.load_ms = 0
+        self.timed_pages = 0
+
+    def record(self, driver):
+        """记录当前页面的传输字节数、请求数和加载时间（在页面就绪后调用），返回本页的统计"""
+        try:
+            page_bytes, requests, load_ms = driver.execute_script(PAGE_COST_SCRIPT)
+        except Exception:
+            return None
+        with self._lock:
+            self.pages += 1
+            self.bytes += page_bytes
+            self.requests += requests
+            if load_ms:
+                self.load_ms += load_ms
+                self.timed_pages += 1
+        return {'bytes': page_bytes, 'requests': requests, 'load_ms': load_ms}
+
+    def summary(self):
+        """一行汇总，用于爬取结束时输出（BLOCK_RESOURCES 设为 [] 再运行一次即为拦截前的数据）"""
+        with self._lock:
+            if not self.pages:
+                return "页面开销: 没有记录的页面"
+            blocked = ', '.join(list(BLOCK_RESOURCES) + list(BLOCK_HOSTS)) or '无'
+            average_load = f"{self.load_ms / self.timed_pages:.0f} ms" if self.timed_pages else "未知"
+            return (f"页面开销: {self.pages} 个页面, 平均每页 {self.bytes / self.pages / 1024:.1f} KB / "
+                    f"{self.requests / self.pages:.1f} 个请求, 平均加载 {average_load} (拦截: {blocked})")
+
+
+_shared_costs = None
+_shared_lock = threading.Lock()
+
+
+def get_page_costs():
+    """进程内共享的页面开销统计"""
+    global _shared_costs
+    with _shared_lock:
+        if _shared_costs is None:
+            _shared_costs = PageCosts()
+        return _shared_costs
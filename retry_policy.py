@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重试策略 - 指数退避 + 随机抖动 + 总时限
+按错误类别（连接失败 / 读取超时 / 5xx 状态码）分别配置重试次数和初始等待时间，
+用于 requests 会话、下载引擎和自适应并发控制器，临时故障不再需要重新运行整个爬虫
+"""
+
+import time
+import random
+from email.utils import parsedate_to_datetime
+
+import requests
+
+from config import (
+    MAX_RETRIES, RETRY_DELAY, RETRY_MAX_DELAY, RETRY_DEADLINE, RETRY_POLICIES, RETRY_STATUSES,
+)
+
+CONNECT = 'connect'
+READ = 'read'
+STATUS = 'status'
+
+
+class IncompleteDownload(IOError):
+    """连接正常结束但收到的字节数少于预期（服务器提前关闭连接），按读取中断重试"""
+
+
+def parse_retry_after(value):
+    """解析 Retry-After（秒数或HTTP日期），返回秒数；无法解析时返回None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_exception(exc):
+    """异常对应的错误类别；不可重试（或已在内层重试过）时返回None"""
+    if getattr(exc, 'retry_exhausted', False):
+        return None
+    if isinstance(exc, requests.ConnectTimeout):
+        return CONNECT
+    if isinstance(exc, (requests.ReadTimeout, requests.exceptions.ChunkedEncodingError, IncompleteDownload)):
+        return READ
+    if isinstance(exc, requests.ConnectionError):
+        return CONNECT
+    return None
+
+
+class RetryPolicy:
+    def __init__(self, max_retries=MAX_RETRIES, base_delay=RETRY_DELAY, max_delay=RETRY_MAX_DELAY,
+                 deadline=RETRY_DEADLINE, policies=None, statuses=RETRY_STATUSES):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.statuses = frozenset(statuses)
+        # 每个类别: {'max_retries': n, 'delay_factor': 倍数}，未配置的项使用 max_retries 和 1 倍等待时间
+        self.policies = {}
+        for error_class in (CONNECT, READ, STATUS):
+            policy = {'max_retries': max_retries, 'delay_factor': 1}
+            policy.update((RETRY_POLICIES if policies is None else policies).get(error_class, {}))
+            self.policies[error_class] = policy
+
+    def classify_status(self, status_code):
+        """需要重试的状态码返回 STATUS，否则返回None"""
+        return STATUS if status_code in self.statuses else None
+
+    def backoff(self, error_class, attempt, retry_after=None):
+        """第 attempt 次重试前的等待时间：指数增长并加入抖动（等待时间在 [d/2, d] 之间）
+
+        服务器给出 Retry-After 时不短于该值
+        """
+        delay = self.base_delay * self.policies[error_class]['delay_factor'] * (2 ** (attempt - 1))
+        delay = min(self.max_delay, delay)
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def next_delay(self, error_class, attempts, started, retry_after=None):
+        """记录一次 error_class 类别的失败，返回下一次重试前的等待秒数；次数或总时限用完时返回None
+
+        attempts 为调用方保存的 {类别: 已失败次数}，每个类别分别计数
+        """
+        if error_class is None:
+            return None
+        attempt = attempts[error_class] = attempts.get(error_class, 0) + 1
+        if attempt > self.policies[error_class]['max_retries']:
+            return None
+        delay = self.backoff(error_class, attempt, retry_after)
+        if self.deadline is not None and time.monotonic() - started + delay > self.deadline:
+            return None
+        return delay
+
+    def call(self, func, *args, **kwargs):
+        """执行 func，遇到可重试的异常时退避后重试；放弃时异常标记为 retry_exhausted 并抛出"""
+        started = time.monotonic()
+        attempts = {}
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                delay = self.next_delay(classify_exception(e), attempts, started)
+                if delay is None:
+                    e.retry_exhausted = True
+                    raise
+                time.sleep(delay)
+
+
+class RetrySession(requests.Session):
+    def __init__(self, policy=None):
+        super().__init__()
+        self.retry_policy = policy if policy is not None else RetryPolicy()
+
+    def request_once(self, method, url, *args, **kwargs):
+        """只发送一次、不重试（由调用方自行重试，例如 AdaptiveController）"""
+        return super().request(method, url, *args, **kwargs)
+
+    def request(self, method, url, *args, **kwargs):
+        """发送请求；连接失败、读取超时和可重试的状态码按策略退避后重新发送"""
+        policy = self.retry_policy
+        started = time.monotonic()
+        attempts = {}
+        while True:
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except requests.RequestException as e:
+                delay = policy.next_delay(classify_exception(e), attempts, started)
+                if delay is None:
+                    e.retry_exhausted = True
+                    raise
+            else:
+                error_class = policy.classify_status(response.status_code)
+                if error_class is None:
+                    return response
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                delay = policy.next_delay(error_class, attempts, started, retry_after)
+                if delay is None:
+                    return response
+                response.close()
+            time.sleep(delay)
+
@@ -6,19 +6,22 @@
 """
 
 import os
-import time
-import requests
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 import urllib.parse
 from urllib.parse import urljoin
 import logging
 
+from link_set import LinkSet
+from http_client import get_session
+from rate_limiter import get_scheduler
+from browser_pool import get_browser_pool
+from selenium_waits import wait_until_ready
+from cdp_capture import get_network_capture
+from resource_blocker import get_page_costs
+from dom_cache import get_dom_cache
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -35,6 +38,18 @@ class SeleniumWebCrawler:
         self.base_url = "https://ydydj.univsport.com/level/Levelnotice"
         self.download_dir = "downloads"
         self.setup_download_dir()
+        # 文件下载使用进程内共享连接池（带重试，连接失败、超时、5xx 按策略退避重试）
+        self.session = get_session()
+        # 每主机令牌桶限速，代替页面之间的固定暂停
+        self.scheduler = get_scheduler()
+        # 浏览器池：第一层页面借用一个浏览器，第二层页面由池中的浏览器并行渲染
+        self.pool = get_browser_pool()
+        # CDP_CAPTURE 开启时记录页面渲染中的 XHR / fetch 请求，供之后的运行直接重放
+        self.capture = get_network_capture()
+        # 每个页面的传输字节数和加载时间
+        self.page_costs = get_page_costs()
+        # 渲染后的页面写入渲染结果缓存，其他爬虫不必再用浏览器渲染同一页面
+        self.dom_cache = get_dom_cache()
         self.driver = None
         self.setup_driver()
     
@@ -45,38 +60,21 @@ class SeleniumWebCrawler:
             logger.info(f"创建下载目录: {self.download_dir}")
     
     def setup_driver(self):
-        """设置Chrome浏览器驱动"""
+        """从浏览器池借出浏览器（池中没有空闲浏览器时启动新的Chrome）"""
         try:
-            # 配置Chrome选项
-            chrome_options = Options()
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--disable-dev-shm-usage')
-            chrome_options.add_argument('--disable-gpu')
-            chrome_options.add_argument('--window-size=1920,1080')
-            chrome_options.add_argument('--headless')  # 无头模式
-            
-            # 设置下载目录
-            prefs = {
-                "download.default_directory": os.path.abspath(self.download_dir),
-                "download.prompt_for_download": False,
-                "download.directory_upgrade": True,
-                "safebrowsing.enabled": True
-            }
-            chrome_options.add_experimental_option("prefs", prefs)
-            
-            # 使用webdriver-manager自动管理驱动
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            
-            # 设置页面加载超时
-            self.driver.set_page_load_timeout(30)
-            
+            self.driver = self.pool.acquire()
             logger.info("Chrome浏览器驱动初始化成功")
             
         except Exception as e:
             logger.error(f"浏览器驱动初始化失败: {e}")
             raise
     
+    def release_driver(self):
+        """把第一层页面使用的浏览器归还浏览器池"""
+        if self.driver:
+            self.pool.release(self.driver)
+            self.driver = None
+    
     def wait_for_element(self, by, value, timeout=10):
         """等待元素出现"""
         try:
@@ -93,7 +91,7 @@ class SeleniumWebCrawler:
         logger.info("正在获取第一层链接...")
         
         # 等待页面加载完成
-        time.sleep(5)
+        wait_until_ready(self.driver, timeout=5)
         
         # 尝试多种选择器来查找链接
         link_selectors = [
@@ -108,7 +106,7 @@ class SeleniumWebCrawler:
             "[class*='list']",  # 包含list的类
         ]
         
-        first_level_links = []
+        first_level_links = LinkSet()
         
         for selector in link_selectors:
             try:
@@ -129,8 +127,7 @@ class SeleniumWebCrawler:
                                 "text": text,
                                 "element": link
                             }
-                            if link_info not in first_level_links:
-                                first_level_links.append(link_info)
+                            if first_level_links.add(link_info):
                                 logger.info(f"找到链接: {text} -> {href}")
                 
                 if first_level_links:
@@ -149,7 +146,7 @@ class SeleniumWebCrawler:
             return self.get_first_level_links()
         
         logger.info(f"共找到 {len(first_level_links)} 个第一层链接")
-        return first_level_links
+        return first_level_links.to_list()
     
     def explore_navigation_elements(self):
         """探索可能的导航元素"""
@@ -171,48 +168,37 @@ class SeleniumWebCrawler:
                         # 尝试点击元素
                         self.driver.execute_script("arguments[0].click();", element)
                         logger.info(f"点击导航元素: {selector}")
-                        time.sleep(2)
+                        wait_until_ready(self.driver, timeout=2)
+                        self.capture.collect(self.driver)
                         break
                     except:
                         continue
             except:
                 continue
     
-    def process_second_level_page(self, link_info):
-        """处理第二层页面"""
+    def process_second_level_page(self, driver, link_info):
+        """在池中的浏览器上处理第二层页面"""
         url = link_info["url"]
         text = link_info["text"]
         
         logger.info(f"正在处理第二层页面: {text}")
         
         try:
-            # 打开新标签页
-            self.driver.execute_script("window.open('');")
-            self.driver.switch_to.window(self.driver.window_handles[-1])
-            
             # 访问第二层页面
-            self.driver.get(url)
-            time.sleep(3)
+            self.scheduler.wait(url)
+            driver.get(url)
+            wait_until_ready(driver, timeout=3)
+            self.capture.collect(driver)
+            self.page_costs.record(driver)
             
             # 查找可下载的文件
-            downloaded_files = self.find_and_download_files(text)
-            
-            # 关闭当前标签页，返回主页面
-            self.driver.close()
-            self.driver.switch_to.window(self.driver.window_handles[0])
-            
-            return downloaded_files
+            return self.find_and_download_files(text, driver)
             
         except Exception as e:
             logger.error(f"处理第二层页面失败 {url}: {e}")
-            # 确保返回主页面
-            try:
-                self.driver.switch_to.window(self.driver.window_handles[0])
-            except:
-                pass
             return []
     
-    def find_and_download_files(self, page_title):
+    def find_and_download_files(self, page_title, driver=None):
         """在页面中查找并下载文件"""
         downloaded_files = []
         
@@ -233,7 +219,7 @@ class SeleniumWebCrawler:
         
         for selector in file_selectors:
             try:
-                file_links = self.driver.find_elements(By.CSS_SELECTOR, selector)
+                file_links = (driver or self.driver).find_elements(By.CSS_SELECTOR, selector)
                 for file_link in file_links:
                     file_url = file_link.get_attribute("href")
                     file_text = file_link.text.strip() or "未命名文件"
@@ -260,7 +246,7 @@ class SeleniumWebCrawler:
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
             }
             
-            response = requests.get(file_url, headers=headers, stream=True, timeout=30)
+            response = self.session.get(file_url, headers=headers, stream=True, timeout=30)
             
             if response.status_code == 200:
                 # 清理文件名
@@ -313,11 +299,14 @@ class SeleniumWebCrawler:
         
         try:
             # 访问目标网站
+            self.scheduler.wait(self.base_url)
             self.driver.get(self.base_url)
             logger.info(f"成功访问目标网站: {self.base_url}")
             
             # 等待页面加载
-            time.sleep(5)
+            wait_until_ready(self.driver, timeout=5)
+            self.capture.collect(self.driver)
+            self.page_costs.record(self.driver)
             
             # 获取页面标题和基本信息
             page_title = self.driver.title
@@ -336,18 +325,19 @@ class SeleniumWebCrawler:
                 self.analyze_page_structure()
                 return
             
-            # 处理每个第一层链接
-            total_downloaded = 0
-            for i, link_info in enumerate(first_level_links, 1):
-                logger.info(f"处理第 {i}/{len(first_level_links)} 个链接: {link_info['text']}")
-                
-                downloaded_files = self.process_second_level_page(link_info)
-                total_downloaded += len(downloaded_files)
-                
-                # 添加延迟，避免请求过快
-                time.sleep(2)
+            # 第一层页面已处理完，归还浏览器，第二层页面放入工作队列由浏览器池并行渲染
+            logger.info(f"并行处理 {len(first_level_links)} 个第一层链接")
+            self.release_driver()
+            results = self.pool.map(self.process_second_level_page, first_level_links, default=list)
+            total_downloaded = sum(len(downloaded_files) for downloaded_files in results)
             
             logger.info(f"爬虫任务完成！共处理 {len(first_level_links)} 个链接，下载 {total_downloaded} 个文件")
+            logger.info(self.scheduler.summary())
+            logger.info(self.pool.summary())
+            logger.info(self.page_costs.summary())
+            if self.capture.enabled:
+                self.capture.save()
+                logger.info(self.capture.summary())
             
         except Exception as e:
             logger.error(f"爬虫任务失败: {e}")
@@ -366,6 +356,7 @@ class SeleniumWebCrawler:
         with open(source_path, 'w', encoding='utf-8') as f:
             f.write(page_source)
         logger.info(f"页面源码已保存: {source_path}")
+        self.dom_cache.put(self.driver.current_url, page_source)
         
         # 分析页面中的关键元素
         elements_to_check = [
@@ -401,10 +392,10 @@ class SeleniumWebCrawler:
                 logger.warning(f"分析{element_type}失败: {e}")
     
     def cleanup(self):
-        """清理资源"""
+        """清理资源：归还浏览器（浏览器池在进程退出时关闭所有浏览器）"""
         if self.driver:
-            self.driver.quit()
-            logger.info("浏览器已关闭")
+            self.release_driver()
+            logger.info("浏览器已归还浏览器池")
 
 def main():
     """主函数"""
@@ -6,18 +6,21 @@
 """
 
 import os
-import time
-import requests
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 from urllib.parse import urljoin, urlparse
 import logging
 
+from http_client import get_session
+from link_set import LinkSet
+from rate_limiter import get_scheduler
+from browser_pool import get_browser_pool
+from selenium_waits import wait_until_ready
+from cdp_capture import get_network_capture
+from resource_blocker import get_page_costs
+from dom_cache import get_dom_cache
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -35,6 +38,17 @@ class SeleniumPDFCrawler:
         self.target_url = "https://ydydj.univsport.com/level/Levelnotice"
         self.download_dir = "selenium_pdf_downloads"
         self.setup_download_dir()
+        # PDF下载使用进程内共享连接池（带重试，连接失败、超时、5xx 按策略退避重试）
+        self.session = get_session()
+        self.scheduler = get_scheduler()
+        # 浏览器池：主页面借用一个浏览器，链接指向的页面由池中的浏览器并行渲染
+        self.pool = get_browser_pool()
+        # CDP_CAPTURE 开启时记录页面渲染中的 XHR / fetch 请求，供之后的运行直接重放
+        self.capture = get_network_capture()
+        # 每个页面的传输字节数和加载时间
+        self.page_costs = get_page_costs()
+        # 渲染后的页面写入渲染结果缓存，其他爬虫不必再用浏览器渲染同一页面
+        self.dom_cache = get_dom_cache()
         self.driver = None
         self.setup_driver()
     
@@ -45,39 +59,21 @@ class SeleniumPDFCrawler:
             logger.info(f"创建下载目录: {self.download_dir}")
     
     def setup_driver(self):
-        """设置Chrome浏览器驱动"""
+        """从浏览器池借出浏览器（池中没有空闲浏览器时启动新的Chrome）"""
         try:
-            # 配置Chrome选项
-            chrome_options = Options()
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--disable-dev-shm-usage')
-            chrome_options.add_argument('--disable-gpu')
-            chrome_options.add_argument('--window-size=1920,1080')
-            # 先不使用无头模式，以便观察浏览器行为
-            # chrome_options.add_argument('--headless')
-            
-            # 设置下载行为
-            prefs = {
-                "download.default_directory": os.path.abspath(self.download_dir),
-                "download.prompt_for_download": False,
-                "download.directory_upgrade": True,
-                "safebrowsing.enabled": True
-            }
-            chrome_options.add_experimental_option("prefs", prefs)
-            
-            # 使用webdriver-manager自动管理驱动
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            
-            # 设置页面加载超时
-            self.driver.set_page_load_timeout(30)
-            
+            self.driver = self.pool.acquire()
             logger.info("Chrome浏览器驱动初始化成功")
             
         except Exception as e:
             logger.error(f"浏览器驱动初始化失败: {e}")
             raise
     
+    def release_driver(self):
+        """把主页面使用的浏览器归还浏览器池"""
+        if self.driver:
+            self.pool.release(self.driver)
+            self.driver = None
+    
     def wait_for_element(self, by, value, timeout=10):
         """等待元素出现"""
         try:
@@ -110,6 +106,7 @@ class SeleniumPDFCrawler:
         with open(os.path.join(self.download_dir, 'dynamic_page_source.html'), 'w', encoding='utf-8') as f:
             f.write(page_source)
         logger.info("动态页面源码已保存")
+        self.dom_cache.put(current_url, page_source)
         
         # 分析页面中的各种元素
         self.analyze_page_elements()
@@ -157,21 +154,23 @@ class SeleniumPDFCrawler:
         """查找并点击可能的链接"""
         logger.info("=== 查找并点击链接 ===")
         
-        # 尝试多种选择器来查找链接
+        # 尝试多种选择器来查找链接（可见性由 is_displayed() 判断，CSS 不支持 :visible）
         link_selectors = [
-            "a[href]:visible",
-            "button:visible",
-            "[class*='link']:visible",
-            "[class*='btn']:visible", 
-            "[class*='tab']:visible",
-            "[class*='nav']:visible",
-            "[class*='menu']:visible",
-            "[class*='item']:visible",
-            "[class*='list']:visible",
-            "[onclick]:visible",
+            "a[href]",
+            "button",
+            "[class*='link']",
+            "[class*='btn']", 
+            "[class*='tab']",
+            "[class*='nav']",
+            "[class*='menu']",
+            "[class*='item']",
+            "[class*='list']",
+            "[onclick]",
         ]
         
         clicked_links = []
+        # 带URL的链接不在主页面上点击，之后由浏览器池并行打开
+        page_links = LinkSet()
         
         for selector in link_selectors:
             try:
@@ -189,11 +188,17 @@ class SeleniumPDFCrawler:
                         if element_id in clicked_links:
                             continue
                         
+                        href = element.get_attribute('href') if element_type == 'a' else None
+                        if href and href.startswith(('http://', 'https://')):
+                            page_links.add({'url': href, 'text': text})
+                            continue
+                        
                         logger.info(f"尝试点击: {element_type} - 文本: '{text}'")
                         
                         # 点击元素
                         element.click()
-                        time.sleep(3)  # 等待页面响应
+                        wait_until_ready(self.driver, timeout=3)  # 等待页面响应
+                        self.capture.collect(self.driver)
                         
                         # 检查页面是否发生了变化
                         new_url = self.driver.current_url
@@ -205,7 +210,7 @@ class SeleniumPDFCrawler:
                             
                             # 返回原页面
                             self.driver.back()
-                            time.sleep(2)
+                            wait_until_ready(self.driver, timeout=2)
                         
                         clicked_links.append(element_id)
                         
@@ -216,11 +221,36 @@ class SeleniumPDFCrawler:
             except Exception as e:
                 logger.warning(f"使用选择器 {selector} 失败: {e}")
                 continue
+        
+        if page_links:
+            # 主页面的点击已完成，归还浏览器，链接页面放入工作队列并行处理
+            logger.info(f"并行打开 {len(page_links)} 个链接页面")
+            self.release_driver()
+            self.pool.map(self.search_pdfs_at_url, page_links.to_list())
+            logger.info(self.pool.summary())
+        
+        if self.capture.enabled:
+            self.capture.save()
+            logger.info(self.capture.summary())
     
-    def search_pdfs_in_current_page(self, page_name):
+    def search_pdfs_at_url(self, driver, link):
+        """在池中的浏览器上打开链接页面并搜索PDF文件"""
+        try:
+            self.scheduler.wait(link['url'])
+            driver.get(link['url'])
+            wait_until_ready(driver, timeout=3)  # 等待页面响应
+            self.capture.collect(driver)
+            self.page_costs.record(driver)
+            return self.search_pdfs_in_current_page(link['text'], driver)
+        except Exception as e:
+            logger.warning(f"打开链接页面失败 {link['url']}: {e}")
+            return 0
+    
+    def search_pdfs_in_current_page(self, page_name, driver=None):
         """在当前页面中搜索PDF文件"""
         logger.info(f"在页面 '{page_name}' 中搜索PDF文件...")
         
+        driver = driver or self.driver
         pdf_count = 0
         
         # 查找PDF链接
@@ -233,7 +263,7 @@ class SeleniumPDFCrawler:
         
         for selector in pdf_selectors:
             try:
-                elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
+                elements = driver.find_elements(By.CSS_SELECTOR, selector)
                 for element in elements:
                     try:
                         href = element.get_attribute('href')
@@ -243,7 +273,7 @@ class SeleniumPDFCrawler:
                             logger.info(f"找到PDF链接: {text} -> {href}")
                             
                             # 下载PDF
-                            if self.download_pdf(href, page_name, text):
+                            if self.download_pdf(href, page_name, text, referer=driver.current_url):
                                 pdf_count += 1
                                 
                     except Exception as e:
@@ -256,7 +286,7 @@ class SeleniumPDFCrawler:
         
         return pdf_count
     
-    def download_pdf(self, pdf_url, page_name, link_text):
+    def download_pdf(self, pdf_url, page_name, link_text, referer=None):
         """下载PDF文件"""
         try:
             logger.info(f"正在下载PDF: {link_text}")
@@ -264,10 +294,10 @@ class SeleniumPDFCrawler:
             # 使用requests下载（避免浏览器下载对话框）
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                'Referer': self.driver.current_url
+                'Referer': referer or self.driver.current_url
             }
             
-            response = requests.get(pdf_url, headers=headers, timeout=30, stream=True)
+            response = self.session.get(pdf_url, headers=headers, timeout=30, stream=True)
             
             if response.status_code == 200:
                 # 生成文件名
@@ -310,11 +340,14 @@ class SeleniumPDFCrawler:
         
         try:
             # 1. 访问目标网站
+            self.scheduler.wait(self.target_url)
             self.driver.get(self.target_url)
             logger.info(f"成功访问目标网站: {self.target_url}")
             
             # 2. 等待页面加载
-            time.sleep(5)
+            wait_until_ready(self.driver, timeout=5)
+            self.capture.collect(self.driver)
+            self.page_costs.record(self.driver)
             
             # 3. 探索页面结构
             self.explore_page_structure()
@@ -324,6 +357,7 @@ class SeleniumPDFCrawler:
             
             # 5. 统计结果
             self.show_results()
+            logger.info(self.page_costs.summary())
             
         except Exception as e:
             logger.error(f"爬虫任务失败: {e}")
@@ -352,10 +386,10 @@ class SeleniumPDFCrawler:
         logger.info(f"文件保存在: {self.download_dir}")
     
     def cleanup(self):
-        """清理资源"""
+        """清理资源：归还浏览器（浏览器池在进程退出时关闭所有浏览器）"""
         if self.driver:
-            self.driver.quit()
-            logger.info("浏览器已关闭")
+            self.release_driver()
+            logger.info("浏览器已归还浏览器池")
 
 def main():
     """主函数"""
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+事件驱动的页面等待 - 代替 Selenium 流程中写死的 time.sleep()
+页面中注入的脚本统计进行中的 XHR / fetch 请求并用 MutationObserver 记录最后一次DOM变化，
+等待在 readyState 完成、网络空闲且DOM静止（可选：目标元素出现）后立即返回，
+原来的固定等待时间只作为超时上限
+"""
+
+import time
+
+from config import WAIT_NETWORK_IDLE, WAIT_DOM_QUIET, WAIT_POLL_INTERVAL
+
+# 在每个新文档中尽早执行：包装 XMLHttpRequest / fetch 并观察整个文档的变化
+HOOK_SCRIPT = """
+(function () {
+    if (window.__crawlerWait) { return; }
+    var state = window.__crawlerWait = {inflight: 0, lastNetwork: Date.now(), lastMutation: Date.now()};
+    function started() { state.inflight += 1; state.lastNetwork = Date.now(); }
+    function finished() { state.inflight = Math.max(0, state.inflight - 1); state.lastNetwork = Date.now(); }
+
+    var send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        started();
+        this.addEventListener('loadend', finished);
+        return send.apply(this, arguments);
+    };
+
+    if (window.fetch) {
+        var fetch = window.fetch;
+        window.fetch = function () {
+            started();
+            try {
+                return fetch.apply(this, arguments).finally(finished);
+            } catch (e) {
+                finished();
+                throw e;
+            }
+        };
+    }
+
+    new MutationObserver(function () { state.lastMutation = Date.now(); })
+        .observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+})();
+"""
+
+# 返回 [readyState, 进行中的请求数, 距最后一次网络活动的毫秒数, 距最后一次DOM变化的毫秒数, 目标元素是否存在]
+STATE_SCRIPT = """
+var state = window.__crawlerWait;
+if (!state) { return null; }
+var now = Date.now();
+return [document.readyState, state.inflight, now - state.lastNetwork, now - state.lastMutation,
+        arguments[0] ? document.querySelector(arguments[0]) !== null : true];
+"""
+
+
+def install_wait_hooks(driver):
+    """让浏览器在每个新文档加载前注入等待脚本（仅 Chrome 的 CDP 可用；失败时返回 False，等待时再补注入）"""
+    try:
+        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': HOOK_SCRIPT})
+        return True
+    except Exception:
+        return False
+
+
+def page_state(driver, selector=None):
+    """读取页面当前的等待状态；页面中还没有等待脚本时立即注入（之前发出的请求不会被统计）"""
+    state = driver.execute_script(STATE_SCRIPT, selector)
+    if state is None:
+        driver.execute_script(HOOK_SCRIPT)
+        state = driver.execute_script(STATE_SCRIPT, selector)
+    return state
+
+
+def wait_until_ready(driver, timeout, selector=None, network_idle=WAIT_NETWORK_IDLE, dom_quiet=WAIT_DOM_QUIET):
+    """等待页面就绪：文档加载完成、没有进行中的请求且已空闲 network_idle 秒、
+    DOM 已静止 dom_quiet 秒，并且 selector（CSS选择器，可选）对应的元素已出现
+
+    空闲时间从调用时刻起算，点击后立即调用也会等到点击触发的请求和渲染结束。
+    就绪时返回 True；超过 timeout 秒仍未就绪时返回 False（相当于原来的固定等待）
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    while True:
+        waited = time.monotonic() - start
+        try:
+            state = page_state(driver, selector)
+        except Exception:
+            # 导航过程中脚本可能执行失败，下一轮重试
+            state = None
+        if state:
+            ready_state, inflight, since_network, since_mutation, found = state
+            if (ready_state == 'complete' and found and not inflight
+                    and min(since_network / 1000, waited) >= network_idle
+                    and min(since_mutation / 1000, waited) >= dom_quiet):
+                return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(WAIT_POLL_INTERVAL)
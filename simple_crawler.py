@@ -8,27 +8,28 @@
 import os
 import re
 import requests
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urlparse
 from pathlib import Path
-import time
+
+from download_engine import DownloadEngine
+from link_extractor import extract_links
+from blob_store import BlobStore
+from rate_limiter import get_scheduler
+from adaptive_controller import AdaptiveController
+from http_client import get_session
 
 class SimpleLevelCrawler:
     def __init__(self, base_url="https://ydydj.univsport.com/level/Levelnotice"):
         self.base_url = base_url
         self.download_dir = "downloads"
-        self.session = requests.Session()
-        self.setup_session()
+        # 进程内共享连接池（请求头取自 config.HEADERS），与其他爬虫复用连接
+        self.session = get_session()
         self.setup_directories()
-        
-    def setup_session(self):
-        """设置请求会话"""
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-        })
+        self.scheduler = get_scheduler()
+        # 自适应并发：按延迟和 429 / 503（Retry-After）调整每个主机的请求窗口
+        self.controller = AdaptiveController()
+        self.download_engine = DownloadEngine(self.session, blob_store=BlobStore(), scheduler=self.scheduler,
+                                              controller=self.controller)
         
     def setup_directories(self):
         """创建下载目录"""
@@ -37,7 +38,7 @@ class SimpleLevelCrawler:
     def get_page_content(self, url):
         """获取页面内容"""
         try:
-            response = self.session.get(url, timeout=30)
+            response = self.controller.get(self.session, url, throttle=self.scheduler.wait, timeout=30)
             response.raise_for_status()
             return response.text
         except requests.RequestException as e:
@@ -48,46 +49,19 @@ class SimpleLevelCrawler:
         """从HTML内容中提取链接"""
         links = []
         
-        # 正则表达式匹配各种链接
-        link_patterns = [
-            r'<a[^>]*href="([^"]*)"[^>]*>(.*?)</a>',  # a标签链接
-            r'href="([^"]*\.html?)"[^>]*>',           # html页面链接
-            r'href="([^"]*\.php)"[^>]*>',             # php页面链接
-            r'onclick="[^"]*["\']([^"\']+)["\']',    # onclick事件中的链接
-        ]
-        
-        for pattern in link_patterns:
-            matches = re.findall(pattern, html_content, re.IGNORECASE | re.DOTALL)
-            for match in matches:
-                if isinstance(match, tuple):
-                    href = match[0]
-                    text = match[1] if len(match) > 1 else ""
-                else:
-                    href = match
-                    text = ""
-                
-                # 清理文本
-                text = re.sub(r'<[^>]*>', '', text).strip()
-                
-                if href and not href.startswith(('javascript:', 'mailto:', 'tel:')):
-                    # 转换为绝对URL
-                    full_url = urljoin(base_url, href)
-                    links.append({
-                        'url': full_url,
-                        'text': text or self.get_link_text_from_url(full_url),
-                        'original_href': href
-                    })
+        # 单遍提取：a标签链接、其他标签中的 html/php 页面链接、onclick事件中的链接
+        def is_page_link(link):
+            return link['kind'] == 'onclick' or link['tag'] == 'a' or \
+                link['original_href'].lower().endswith(('.html', '.htm', '.php'))
         
-        # 去重
-        unique_links = []
-        seen_urls = set()
+        for link in extract_links(html_content, base_url, kinds=('href', 'onclick'), accept=is_page_link):
+            links.append({
+                'url': link['url'],
+                'text': link['text'] or self.get_link_text_from_url(link['url']),
+                'original_href': link['original_href']
+            })
         
-        for link in links:
-            if link['url'] not in seen_urls:
-                unique_links.append(link)
-                seen_urls.add(link['url'])
-        
-        return unique_links
+        return links
     
     def get_link_text_from_url(self, url):
         """从URL中提取有意义的文本"""
@@ -128,16 +102,10 @@ class SimpleLevelCrawler:
             
             print(f"正在下载: {filename}")
             
-            response = self.session.get(url, stream=True, timeout=60)
-            response.raise_for_status()
-            
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
+            result = self.download_engine.download(url, filepath)
             
-            file_size = os.path.getsize(filepath)
-            print(f"✓ 下载完成: {filepath} ({file_size} 字节)")
+            file_size = result['size']
+            print(f"✓ 下载完成: {filepath} ({file_size} 字节, {result['parts']} 个分块)")
             
             return {
                 'filename': filename,
@@ -258,14 +226,14 @@ class SimpleLevelCrawler:
                     print(f"    ✓ {file_info['filename']}")
             else:
                 print("  未找到可下载文件")
-            
-            # 短暂暂停，避免请求过快
-            time.sleep(1)
         
         print(f"\n" + "=" * 60)
         print(f"爬虫运行完成!")
         print(f"总共处理了 {len(first_level_links)} 个第一层链接")
         print(f"总共下载了 {total_downloaded} 个文件")
+        print(self.scheduler.summary())
+        print(self.controller.summary())
+        print(self.session.pool_stats.summary())
         print(f"文件保存在: {os.path.abspath(self.download_dir)}")
         print("=" * 60)
 
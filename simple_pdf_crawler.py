@@ -9,28 +9,33 @@ import os
 import re
 import time
 import json
+import hashlib
 import requests
 from pathlib import Path
 from urllib.parse import urljoin, urlparse
 
+from download_engine import DownloadEngine
+from validator_store import ValidatorStore
+from blob_store import BlobStore
+from rate_limiter import get_scheduler
+from http_client import get_session
+
 class SimplePDFCrawler:
     def __init__(self, base_url="https://ydydj.univsport.com/level/Levelnotice"):
         self.base_url = base_url
         self.download_dir = "simple_pdf_downloads"
-        self.session = requests.Session()
-        self.setup_session()
+        # 进程内共享连接池（请求头取自 config.HEADERS），与其他爬虫复用连接
+        self.session = get_session()
         self.setup_directories()
         
-    def setup_session(self):
-        """设置会话头信息"""
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-        })
-    
+        # 增量爬取：已下载的PDF发送条件请求，未变化时只传输响应头
+        self.validators = ValidatorStore.for_directory(self.download_dir)
+        self.blob_store = BlobStore()
+        self.scheduler = get_scheduler()
+        self.download_engine = DownloadEngine(self.session, timeout=30, validator_store=self.validators,
+                                              blob_store=self.blob_store, scheduler=self.scheduler)
+        self.unchanged_count = 0
+        
     def setup_directories(self):
         """创建下载目录"""
         Path(self.download_dir).mkdir(exist_ok=True)
@@ -38,6 +43,7 @@ class SimplePDFCrawler:
     def get_page_content(self, url):
         """获取页面内容"""
         try:
+            self.scheduler.wait(url)
             response = self.session.get(url, timeout=30)
             response.raise_for_status()
             return response.text
@@ -116,6 +122,7 @@ class SimplePDFCrawler:
             
             # 尝试GET请求
             try:
+                self.scheduler.wait(api_url)
                 response = self.session.get(api_url, timeout=10)
                 if response.status_code == 200:
                     content_type = response.headers.get('content-type', '')
@@ -175,37 +182,40 @@ class SimplePDFCrawler:
             filename = os.path.basename(parsed_url.path)
             
             if not filename or not filename.endswith('.pdf'):
-                filename = f"pdf_{int(time.time())}.pdf"
+                # 按URL生成稳定的文件名，重复运行时能匹配到已下载的文件
+                filename = f"pdf_{hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]}.pdf"
             
             # 清理文件名
             filename = self.sanitize_filename(filename)
             filepath = os.path.join(self.download_dir, filename)
             
-            # 检查文件是否已存在
-            if os.path.exists(filepath):
+            # 没有校验值的旧文件无法做条件请求，保持原来的跳过逻辑
+            if os.path.exists(filepath) and self.validators.get(url) is None:
                 print(f"文件已存在: {filename}")
                 return True
             
-            # 下载文件
-            response = self.session.get(url, stream=True, timeout=30)
-            response.raise_for_status()
-            
             # 检查内容类型
-            content_type = response.headers.get('content-type', '')
-            if 'pdf' not in content_type.lower() and 'application' not in content_type.lower():
-                print(f"警告: {url} 可能不是PDF文件 (Content-Type: {content_type})")
+            def check_content_type(info):
+                content_type = info['content_type']
+                if 'pdf' not in content_type.lower() and 'application' not in content_type.lower():
+                    print(f"警告: {url} 可能不是PDF文件 (Content-Type: {content_type})")
+                return True
+            
+            # 下载文件（文件已存在时发送条件请求，服务器返回304则不重新下载）
+            result = self.download_engine.download(url, filepath, accept=check_content_type)
             
-            # 保存文件
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
+            if result['unchanged']:
+                print(f"文件未变化: {filename}")
+                self.unchanged_count += 1
+                return True
             
-            file_size = os.path.getsize(filepath)
-            print(f"✓ 下载成功: {filename} ({file_size} 字节) - 来源: {source}")
+            if result['deduplicated']:
+                print(f"✓ 下载成功: {filename} ({result['size']} 字节, 内容重复，已链接到已有文件) - 来源: {source}")
+            else:
+                print(f"✓ 下载成功: {filename} ({result['size']} 字节) - 来源: {source}")
             return True
             
-        except requests.RequestException as e:
+        except (requests.RequestException, IOError) as e:
             print(f"✗ 下载失败 {url}: {e}")
             return False
     
@@ -278,16 +288,17 @@ class SimplePDFCrawler:
                 
                 if self.download_pdf(pdf_info):
                     successful_downloads += 1
-                
-                # 短暂暂停
-                time.sleep(1)
             
             # 输出结果
             print("\n" + "=" * 60)
             print("爬虫运行完成!")
             print(f"运行时间: {time.time() - start_time:.2f} 秒")
             print(f"尝试下载: {len(all_pdfs)} 个文件")
-            print(f"成功下载: {successful_downloads} 个文件")
+            print(f"成功下载: {successful_downloads} 个文件 (其中未变化: {self.unchanged_count} 个)")
+            print(f"内容去重: {self.blob_store.stats['deduplicated']} 个重复文件, "
+                  f"节省 {self.blob_store.stats['bytes_saved']} 字节")
+            print(self.scheduler.summary())
+            print(self.session.pool_stats.summary())
             print(f"文件保存在: {os.path.abspath(self.download_dir)}")
             
             if successful_downloads == 0:
@@ -6,7 +6,6 @@
 
 import os
 import sys
-import time
 
 # 添加当前目录到Python路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -18,6 +17,7 @@ def test_basic_functionality():
     try:
         # 导入爬虫类
         from web_crawler import LevelNoticeCrawler
+        from selenium_waits import wait_until_ready
         
         # 创建爬虫实例
         print("正在初始化爬虫...")
@@ -27,7 +27,7 @@ def test_basic_functionality():
         # 测试访问网站
         print("正在访问目标网站...")
         crawler.driver.get(crawler.base_url)
-        time.sleep(5)  # 等待页面加载
+        wait_until_ready(crawler.driver, timeout=5)  # 等待页面加载
         
         # 检查页面状态
         title = crawler.driver.title
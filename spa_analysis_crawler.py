@@ -8,15 +8,21 @@ SPA网站分析爬虫 - 专门处理需要JavaScript渲染的单页面应用
 import os
 import re
 import time
-import subprocess
 import json
 from pathlib import Path
 from urllib.parse import urljoin, urlparse
 
+import requests
+
+from http_client import get_session
+from js_scanner import get_js_scanner
+
 class SPAAnalysisCrawler:
     def __init__(self, base_url="https://ydydj.univsport.com/level/Levelnotice"):
         self.base_url = base_url
         self.download_dir = "spa_analysis"
+        # 页面、脚本和探测请求复用进程内共享连接池
+        self.session = get_session()
         self.setup_directories()
         
     def setup_directories(self):
@@ -28,7 +34,7 @@ class SPAAnalysisCrawler:
         print("分析SPA网站结构...")
         
         # 1. 获取基础HTML
-        html_content = self.get_page_with_curl(self.base_url)
+        html_content = self.get_page_content(self.base_url)
         if html_content:
             self.save_file('index.html', html_content)
             print("✓ 基础HTML获取成功")
@@ -45,19 +51,13 @@ class SPAAnalysisCrawler:
         # 4. 生成分析报告
         self.generate_analysis_report()
     
-    def get_page_with_curl(self, url):
-        """使用curl获取页面内容"""
+    def get_page_content(self, url):
+        """获取页面内容"""
         try:
-            result = subprocess.run([
-                'curl', '-s', '-L',
-                '-H', 'User-Agent: Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                url
-            ], capture_output=True, text=True, timeout=30)
-            
-            if result.returncode == 0:
-                return result.stdout
-            return ""
-        except:
+            response = self.session.get(url, timeout=30)
+            response.raise_for_status()
+            return response.text
+        except requests.RequestException:
             return ""
     
     def analyze_html_structure(self, html_content):
@@ -96,9 +96,10 @@ class SPAAnalysisCrawler:
             'jQuery': ['jquery', '$('],
         }
         
+        lowered = html_content.lower()
         for framework, indicators in framework_indicators.items():
             for indicator in indicators:
-                if indicator.lower() in html_content.lower():
+                if indicator.lower() in lowered:
                     print(f"可能使用: {framework}")
                     break
     
@@ -115,7 +116,7 @@ class SPAAnalysisCrawler:
             if not js_url.startswith('http'):
                 js_url = urljoin(self.base_url, js_url)
             
-            js_content = self.get_page_with_curl(js_url)
+            js_content = self.get_page_content(js_url)
             if js_content:
                 filename = f"js_{downloaded_js}.js"
                 self.save_file(filename, js_content)
@@ -128,15 +129,8 @@ class SPAAnalysisCrawler:
     
     def analyze_js_keywords(self, js_content, filename):
         """分析JavaScript中的关键词"""
-        keywords = [
-            'pdf', 'download', 'level', 'notice', 'api', 'data',
-            'list', 'query', 'search', 'file', 'document'
-        ]
-        
-        found_keywords = []
-        for keyword in keywords:
-            if keyword.lower() in js_content.lower():
-                found_keywords.append(keyword)
+        # 单遍扫描：关键词逐窗口查找，不再为每个关键词复制一份小写的全文
+        found_keywords = get_js_scanner().scan(js_content)['keywords']
         
         if found_keywords:
             print(f"  {filename}: 发现关键词 - {', '.join(found_keywords)}")
@@ -156,22 +150,17 @@ class SPAAnalysisCrawler:
             
             # 尝试HEAD请求
             try:
-                result = subprocess.run([
-                    'curl', '-s', '-I', '-L',
-                    '-H', 'User-Agent: Mozilla/5.0',
-                    api_url
-                ], capture_output=True, text=True, timeout=10)
+                response = self.session.head(api_url, allow_redirects=True, timeout=10)
                 
-                if result.returncode == 0:
-                    # 检查响应状态
-                    if '200 OK' in result.stdout or '301' in result.stdout or '302' in result.stdout:
-                        print(f"  {pattern}: 可访问")
-                    elif '404' in result.stdout:
-                        print(f"  {pattern}: 不存在")
-                    else:
-                        print(f"  {pattern}: 其他状态")
+                # 检查响应状态
+                if response.status_code == 200 or response.history:
+                    print(f"  {pattern}: 可访问")
+                elif response.status_code == 404:
+                    print(f"  {pattern}: 不存在")
+                else:
+                    print(f"  {pattern}: 其他状态")
                         
-            except:
+            except requests.RequestException:
                 pass
     
     def generate_analysis_report(self):
@@ -6,13 +6,24 @@
 """
 
 import os
+import sys
 import time
-import requests
 import json
 import re
 from urllib.parse import urljoin, urlparse
 import logging
 
+from validator_store import ValidatorStore
+from blob_store import BlobStore, new_hasher
+from download_engine import DownloadEngine
+from http_client import get_session
+from api_prober import ApiProber
+from cdp_capture import load_captured, replay_request
+from js_scanner import get_js_scanner, endpoint_urls
+from endpoint_cache import get_endpoint_cache, bundle_urls
+from api_crawler import ApiCrawler
+from config import API_ENDPOINTS
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -31,17 +42,24 @@ class SPACrawler:
         self.download_dir = "downloads"
         self.setup_download_dir()
         
-        # 设置请求头
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-        }
+        # 进程内共享连接池（请求头取自 config.HEADERS），与其他爬虫复用连接
+        self.session = get_session()
+        # 候选API端点并发探测
+        self.prober = ApiProber(self.session)
+        # JSON API分页爬取（注入访问令牌，并发请求各页）
+        self.api_crawler = ApiCrawler(self.session)
+        # 打包文件分析结果缓存：打包文件名不变时不重新下载和扫描
+        self.endpoint_cache = get_endpoint_cache()
+        # 从打包文件中提取的API端点（完整URL），作为探测的候选
+        self.bundle_endpoints = []
         
-        self.session = requests.Session()
-        self.session.headers.update(self.headers)
+        # 增量爬取：保存校验值，未变化的资源只传输响应头
+        self.validators = ValidatorStore.for_directory(self.download_dir)
+        self.unchanged_count = 0
+        # 文件下载：先写 .part 再原子重命名，可续传，相同内容只保存一份
+        self.blob_store = BlobStore()
+        self.download_engine = DownloadEngine(self.session, timeout=30, validator_store=self.validators,
+                                              blob_store=self.blob_store)
     
     def setup_download_dir(self):
         """创建下载目录"""
@@ -55,31 +73,39 @@ class SPACrawler:
         
         try:
             # 获取主页面
-            response = self.session.get(self.target_url, timeout=10)
+            headers = self.validators.conditional_headers(self.target_url, 'spa_index.html')
+            response = self.session.get(self.target_url, timeout=10, headers=headers)
             
-            if response.status_code != 200:
+            if response.status_code == 304:
+                # 页面未变化，使用上次保存的内容
+                logger.info("主页面未变化，使用已保存的 spa_index.html")
+                self.unchanged_count += 1
+                with open('spa_index.html', 'r', encoding='utf-8') as f:
+                    html_content = f.read()
+            elif response.status_code != 200:
                 logger.error(f"网站访问失败，状态码: {response.status_code}")
                 return False
-            
-            # 保存页面内容
-            with open('spa_index.html', 'w', encoding='utf-8') as f:
-                f.write(response.text)
-            logger.info("主页面已保存: spa_index.html")
-            
-            # 分析HTML结构
-            html_content = response.text
+            else:
+                # 保存页面内容
+                with open('spa_index.html', 'w', encoding='utf-8') as f:
+                    f.write(response.text)
+                logger.info("主页面已保存: spa_index.html")
+                self.validators.update_from_response(self.target_url, response)
+                
+                # 分析HTML结构
+                html_content = response.text
             
             # 提取JavaScript和CSS文件
-            js_files = re.findall(r'<script[^>]*src="([^"]+)"[^>]*>', html_content)
+            js_files = bundle_urls(html_content, self.target_url)
             css_files = re.findall(r'<link[^>]*href="([^"]+)"[^>]*rel="stylesheet"[^>]*>', html_content)
             
             logger.info(f"找到 {len(js_files)} 个JavaScript文件")
             logger.info(f"找到 {len(css_files)} 个CSS文件")
             
-            # 下载并分析JavaScript文件
+            # 下载并分析JavaScript文件（页面不再引用的旧打包文件从缓存中删除）
+            self.endpoint_cache.prune(self.target_url, js_files)
             for js_file in js_files:
-                full_url = urljoin(self.base_url, js_file)
-                self.analyze_js_file(full_url)
+                self.analyze_js_file(js_file)
             
             return True
             
@@ -90,51 +116,67 @@ class SPACrawler:
     def analyze_js_file(self, js_url):
         """分析JavaScript文件"""
         try:
-            response = self.session.get(js_url, timeout=10)
-            if response.status_code == 200:
+            filename = os.path.basename(urlparse(js_url).path)
+            if not filename:
+                filename = "unknown.js"
+            
+            # 文件名带内容哈希且分析过：直接使用缓存的结果，不下载打包文件
+            cached = self.endpoint_cache.get(js_url, fields=('endpoints', 'data_patterns'))
+            if cached is not None:
+                logger.info(f"打包文件未变化，使用缓存的分析结果: {filename}")
+                self.use_bundle_analysis(cached, filename)
+                return
+            
+            js_path = os.path.join(self.download_dir, "js_analysis", filename)
+            headers = self.validators.conditional_headers(js_url, js_path)
+            response = self.session.get(js_url, timeout=10, headers=headers)
+            
+            if response.status_code == 304:
+                self.unchanged_count += 1
+                cached = self.endpoint_cache.get(js_url, fields=('endpoints', 'data_patterns'), revalidated=True)
+                if cached is not None:
+                    logger.info(f"JavaScript文件未变化，使用缓存的分析结果: {filename}")
+                    self.use_bundle_analysis(cached, filename)
+                else:
+                    logger.info(f"JavaScript文件未变化，跳过分析: {filename}")
+            elif response.status_code == 200:
                 js_content = response.text
                 
                 # 保存JavaScript文件
-                filename = os.path.basename(urlparse(js_url).path)
-                if not filename:
-                    filename = "unknown.js"
-                
-                js_path = os.path.join(self.download_dir, "js_analysis", filename)
                 os.makedirs(os.path.dirname(js_path), exist_ok=True)
                 
                 with open(js_path, 'w', encoding='utf-8') as f:
                     f.write(js_content)
+                self.validators.update_from_response(js_url, response)
                 
-                # 分析JavaScript内容
-                self.extract_api_endpoints(js_content, filename)
-                self.extract_data_patterns(js_content, filename)
+                # 分析JavaScript内容，结果按打包文件URL缓存
+                self.endpoint_cache.put(js_url, {
+                    'endpoints': self.extract_api_endpoints(js_content, filename),
+                    'data_patterns': self.extract_data_patterns(js_content, filename),
+                }, page=self.target_url)
                 
         except Exception as e:
             logger.warning(f"分析JavaScript文件失败 {js_url}: {e}")
     
+    def use_bundle_analysis(self, cached, filename):
+        """使用缓存的打包文件分析结果"""
+        self.record_api_endpoints(cached['endpoints'], filename)
+        for pattern in cached['data_patterns']:
+            logger.info(f"在 {filename} 中找到数据模式")
+    
     def extract_api_endpoints(self, js_content, filename):
-        """从JavaScript中提取API端点"""
-        # 查找API URL模式
-        api_patterns = [
-            r'["\'](/api/[^"\']+)["\']',
-            r'["\'](/data/[^"\']+)["\']',
-            r'["\'](/json/[^"\']+)["\']',
-            r'["\'](/ajax/[^"\']+)["\']',
-            r'["\'](/v[12]/[^"\']+)["\']',
-            r'["\'](/rest/[^"\']+)["\']',
-            r'["\'](/notice/[^"\']+)["\']',
-            r'["\'](/level/[^"\']+)["\']',
-            r'["\'](/download/[^"\']+)["\']',
-            r'["\'](/file/[^"\']+)["\']',
-        ]
-        
-        endpoints_found = []
-        for pattern in api_patterns:
-            matches = re.findall(pattern, js_content)
-            for match in matches:
-                full_url = urljoin(self.base_url, match)
-                if full_url not in endpoints_found:
-                    endpoints_found.append(full_url)
+        """从JavaScript中提取API端点，返回脚本中的原始端点字符串"""
+        # 所有端点模式合并为一个正则，只扫描一遍
+        endpoints = get_js_scanner().scan(js_content)['endpoints']
+        self.record_api_endpoints(endpoints, filename)
+        return endpoints
+    
+    def record_api_endpoints(self, endpoints, filename):
+        """把端点转换为完整URL，加入探测候选"""
+        endpoints_found = list(dict.fromkeys(endpoint_urls(endpoints, self.base_url)))
+        for endpoint in endpoints_found:
+            if endpoint not in self.bundle_endpoints:
+                self.bundle_endpoints.append(endpoint)
         
         if endpoints_found:
             logger.info(f"在 {filename} 中找到 {len(endpoints_found)} 个API端点")
@@ -142,7 +184,7 @@ class SPACrawler:
                 logger.info(f"  API端点: {endpoint}")
     
     def extract_data_patterns(self, js_content, filename):
-        """从JavaScript中提取数据模式"""
+        """从JavaScript中提取数据模式，返回找到的模式"""
         # 查找可能的数据结构
         data_patterns = [
             r'level[^=]*=[^\{]*\{([^\}]+)\}',
@@ -151,10 +193,14 @@ class SPACrawler:
             r'list[^=]*=[^\[]*\[([^\]]+)\]',
         ]
         
+        found_patterns = []
         for pattern in data_patterns:
             matches = re.findall(pattern, js_content)
             if matches:
                 logger.info(f"在 {filename} 中找到数据模式")
+                found_patterns.append(pattern)
+        
+        return found_patterns
     
     def discover_api_endpoints(self):
         """发现API端点"""
@@ -179,11 +225,40 @@ class SPACrawler:
         
         discovered_endpoints = []
         
+        # 浏览器中捕获的请求（cdp_capture）按原方法、请求头和请求体直接重放，猜测的端点作为补充
+        # 捕获文件中不保存凭据，重放前注入配置的访问令牌
+        captured = [self.api_crawler.authorize(replay_request(entry)) for entry in load_captured()]
+        if captured:
+            logger.info(f"重放 {len(captured)} 个捕获的API请求")
+        captured_urls = {request['url'] for request in captured}
+        candidate_paths = {request['url']: urlparse(request['url']).path for request in captured}
         for endpoint in common_endpoints:
-            full_url = urljoin(self.base_url, endpoint)
+            candidate_paths.setdefault(urljoin(self.base_url, endpoint), endpoint)
+        # 打包文件中提取的端点（可能来自端点缓存）
+        for url in self.bundle_endpoints:
+            candidate_paths.setdefault(url, urlparse(url).path)
+        
+        # 同时探测所有候选端点，按完成顺序处理
+        candidates = captured + [url for url in candidate_paths if url not in captured_urls]
+        for result in self.prober.probe(candidates):
+            full_url = result['url']
+            endpoint = candidate_paths[full_url]
+            response = result['response']
+            if response is None:
+                # 忽略连接错误
+                continue
             try:
-                response = self.session.get(full_url, timeout=5)
-                if response.status_code == 200:
+                if response.status_code in (401, 403) and result.get('request') is not None:
+                    # 捕获文件中不保存凭据，重放的请求未登录；仍交给后续处理，由配置的访问令牌重新请求
+                    discovered_endpoints.append({
+                        'url': full_url,
+                        'type': '需要认证',
+                        'status': response.status_code,
+                        'request': result.get('request')
+                    })
+                    logger.info(f"✓ 发现需要认证的API: {full_url} ({response.status_code})")
+                
+                elif response.status_code == 200:
                     content_type = response.headers.get('content-type', '')
                     
                     # 检查是否是JSON数据
@@ -191,7 +266,8 @@ class SPACrawler:
                         discovered_endpoints.append({
                             'url': full_url,
                             'type': 'JSON API',
-                            'size': len(response.text)
+                            'size': len(response.text),
+                            'request': result.get('request')
                         })
                         logger.info(f"✓ 发现JSON API: {full_url}")
                         
@@ -224,7 +300,7 @@ class SPACrawler:
                         logger.info(f"✓ 发现端点: {full_url} ({content_type})")
                         
             except Exception as e:
-                # 忽略连接错误
+                # 忽略无法解析的响应
                 pass
         
         return discovered_endpoints
@@ -277,7 +353,29 @@ class SPACrawler:
             # 3. 从API端点获取数据
             self.process_api_endpoints(endpoints)
         
-        logger.info("SPA网站爬取完成")
+        logger.info(f"SPA网站爬取完成 (未变化的资源: {self.unchanged_count} 个)")
+        logger.info(self.endpoint_cache.summary())
+        logger.info(self.api_crawler.summary())
+    
+    def crawl_api(self):
+        """直接爬取JSON API：不请求HTML页面、不启动浏览器"""
+        logger.info("开始直接爬取JSON API...")
+        
+        # 浏览器中捕获的请求按原方法、请求头和请求体发送，再加上配置的端点
+        endpoints = []
+        for request in (replay_request(entry) for entry in load_captured()):
+            endpoints.append({'url': request['url'], 'type': 'JSON API', 'request': request})
+        captured_urls = {endpoint['url'] for endpoint in endpoints}
+        for path in API_ENDPOINTS:
+            url = urljoin(self.base_url, path)
+            if url not in captured_urls:
+                endpoints.append({'url': url, 'type': 'JSON API'})
+        
+        logger.info(f"共 {len(endpoints)} 个API端点")
+        self.process_api_endpoints(endpoints)
+        
+        logger.info(f"JSON API爬取完成 (未变化的资源: {self.unchanged_count} 个)")
+        logger.info(self.api_crawler.summary())
     
     def process_api_endpoints(self, endpoints):
         """处理API端点数据"""
@@ -288,13 +386,22 @@ class SPACrawler:
             logger.info(f"处理端点: {url}")
             
             try:
-                response = self.session.get(url, timeout=10)
-                if response.status_code == 200:
+                # 捕获的请求按原方法和请求体重发，其他端点用 GET；注入访问令牌后逐页请求（其余页并发）
+                request = endpoint.get('request') or {'url': url, 'method': 'GET'}
+                for page in self.api_crawler.crawl(request):
+                    response = page['response']
+                    if response is None:
+                        logger.error(f"处理端点失败 {page['request']['url']}: {page['error']}")
+                        continue
+                    if page['auth_error']:
+                        logger.warning(f"认证失败 ({page['status']})，请设置 config.API_AUTH_TOKEN "
+                                       f"或环境变量 API_AUTH_TOKEN: {url}")
+                        break
+                    if response.status_code != 200:
+                        continue
                     
-                    # 尝试解析为JSON
-                    try:
-                        data = response.json()
-                        
+                    data = page['data']
+                    if data is not None:
                         # 查找可下载的文件链接
                         download_links = self.extract_download_links_from_data(data)
                         
@@ -303,12 +410,12 @@ class SPACrawler:
                             self.download_files(download_links)
                         else:
                             logger.info("未找到下载链接")
-                            
-                    except:
+                    else:
                         # 如果不是JSON，检查是否是文件
                         content_type = response.headers.get('content-type', '')
                         if any(ext in content_type for ext in ['pdf', 'word', 'excel', 'zip']):
-                            self.download_file(url, "api_file")
+                            # 响应体已经取回，直接保存，不再请求一次
+                            self.save_response(url, response, "api_file")
                         
             except Exception as e:
                 logger.error(f"处理端点失败 {url}: {e}")
@@ -347,47 +454,70 @@ class SPACrawler:
     def download_file(self, url, filename):
         """下载单个文件"""
         try:
-            response = self.session.get(url, timeout=30, stream=True)
+            # 清理文件名
+            safe_name = "".join(c for c in filename if c.isalnum() or c in (' ', '-', '_', '.')).rstrip()
+            if not safe_name:
+                safe_name = "downloaded_file"
             
-            if response.status_code == 200:
-                # 清理文件名
-                safe_name = "".join(c for c in filename if c.isalnum() or c in (' ', '-', '_', '.')).rstrip()
-                if not safe_name:
-                    safe_name = "downloaded_file"
-                
-                # 从URL获取文件扩展名
-                file_ext = os.path.splitext(urlparse(url).path)[1]
-                if not file_ext:
-                    # 从Content-Type推断文件类型
-                    content_type = response.headers.get('content-type', '')
-                    if 'pdf' in content_type:
-                        file_ext = '.pdf'
-                    elif 'word' in content_type:
-                        file_ext = '.docx'
-                    elif 'excel' in content_type:
-                        file_ext = '.xlsx'
-                    elif 'zip' in content_type:
-                        file_ext = '.zip'
-                    else:
-                        file_ext = '.bin'
-                
-                file_path = os.path.join(self.download_dir, f"{safe_name}{file_ext}")
-                
-                with open(file_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-                
-                logger.info(f"✓ 文件下载成功: {file_path}")
+            # 从URL获取文件扩展名，没有时按HEAD响应的Content-Type推断
+            file_ext = os.path.splitext(urlparse(url).path)[1]
+            if not file_ext:
+                info = self.download_engine.probe(url)
+                file_ext = self.guess_extension(info['content_type'] if info else '')
+            
+            file_path = os.path.join(self.download_dir, f"{safe_name}{file_ext}")
+            result = self.download_engine.download(url, file_path)
+            
+            if result['unchanged']:
+                logger.info(f"文件未变化: {url}")
+                self.unchanged_count += 1
                 return True
+            
+            if result['deduplicated']:
+                logger.info(f"✓ 文件下载成功: {file_path} (内容重复，已链接到已有文件)")
             else:
-                logger.warning(f"文件下载失败，状态码: {response.status_code}")
-                return False
+                logger.info(f"✓ 文件下载成功: {file_path}")
+            return True
                 
         except Exception as e:
             logger.error(f"文件下载失败 {url}: {e}")
             return False
     
+    def save_response(self, url, response, filename):
+        """把已取回的响应体保存为文件（写入临时文件后放入 blob_store，与 download_file 的结果一致）"""
+        file_ext = os.path.splitext(urlparse(url).path)[1] or \
+            self.guess_extension(response.headers.get('content-type', ''))
+        file_path = os.path.join(self.download_dir, f"{filename}{file_ext}")
+        temp_path = f"{file_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(response.content)
+            hasher = new_hasher()
+            hasher.update(response.content)
+            deduplicated = self.blob_store.ingest(temp_path, hasher.hexdigest(), file_path, url)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self.validators.update_from_response(url, response)
+        
+        if deduplicated:
+            logger.info(f"✓ 文件保存成功: {file_path} (内容重复，已链接到已有文件)")
+        else:
+            logger.info(f"✓ 文件保存成功: {file_path}")
+    
+    def guess_extension(self, content_type):
+        """从Content-Type推断文件扩展名"""
+        content_type = (content_type or '').lower()
+        if 'pdf' in content_type:
+            return '.pdf'
+        elif 'word' in content_type:
+            return '.docx'
+        elif 'excel' in content_type:
+            return '.xlsx'
+        elif 'zip' in content_type:
+            return '.zip'
+        return '.bin'
+    
     def try_alternative_approaches(self):
         """尝试替代方法"""
         logger.info("=== 尝试替代方法 ===")
@@ -421,7 +551,11 @@ class SPACrawler:
 def main():
     """主函数"""
     crawler = SPACrawler()
-    crawler.crawl_spa_website()
+    if '--api' in sys.argv[1:]:
+        # 直接爬取JSON API（python spa_crawler.py --api）
+        crawler.crawl_api()
+    else:
+        crawler.crawl_spa_website()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
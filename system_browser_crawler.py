@@ -8,11 +8,22 @@
 import os
 import re
 import time
+import hashlib
 import subprocess
 import tempfile
 from pathlib import Path
 from urllib.parse import urljoin, urlparse
 
+import requests
+
+from blob_store import BlobStore
+from link_set import LinkSet
+from rate_limiter import get_scheduler
+from download_engine import DownloadEngine
+from http_client import get_session
+from api_prober import ApiProber
+from cdp_capture import load_captured, replay_request
+
 class SystemBrowserCrawler:
     def __init__(self, base_url="https://ydydj.univsport.com/level/Levelnotice"):
         self.base_url = base_url
@@ -20,6 +31,15 @@ class SystemBrowserCrawler:
         self.visited_urls = set()
         self.downloaded_files = []
         self.setup_directories()
+        # 内容寻址存储：相同内容的PDF只保存一份
+        self.blob_store = BlobStore()
+        # 每主机令牌桶限速，页面请求和 wget 前按主机预算等待
+        self.scheduler = get_scheduler()
+        # 页面和PDF通过进程内共享连接池请求，复用 keep-alive 连接
+        self.session = get_session()
+        self.download_engine = DownloadEngine(self.session, blob_store=self.blob_store, scheduler=self.scheduler)
+        # 候选API端点并发探测（只受 PROBE_CONCURRENCY 限制，不经每主机令牌桶逐个放行）
+        self.prober = ApiProber(self.session)
         
     def setup_directories(self):
         """创建下载目录"""
@@ -29,6 +49,7 @@ class SystemBrowserCrawler:
         """使用系统浏览器保存页面"""
         try:
             # 尝试使用wget保存完整页面
+            self.scheduler.wait(url)
             result = subprocess.run([
                 'wget',
                 '--page-requisites',  # 下载所有必要文件
@@ -59,24 +80,15 @@ class SystemBrowserCrawler:
             print(f"页面保存失败: {e}")
             return False
     
-    def get_page_content_with_curl(self, url):
-        """使用curl获取页面内容"""
+    def get_page_content(self, url):
+        """获取页面内容"""
         try:
-            result = subprocess.run([
-                'curl', '-s', '-L',
-                '-H', 'User-Agent: Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                '-H', 'Accept: text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                '-H', 'Accept-Language: zh-CN,zh;q=0.9,en;q=0.8',
-                url
-            ], capture_output=True, text=True, timeout=30)
-            
-            if result.returncode == 0:
-                return result.stdout
-            else:
-                print(f"curl失败: {result.stderr}")
-                return ""
-        except Exception as e:
-            print(f"curl错误: {e}")
+            self.scheduler.wait(url)
+            response = self.session.get(url, timeout=30)
+            response.raise_for_status()
+            return response.text
+        except requests.RequestException as e:
+            print(f"请求失败: {e}")
             return ""
     
     def analyze_website_structure(self):
@@ -85,7 +97,7 @@ class SystemBrowserCrawler:
         
         # 1. 获取robots.txt
         robots_url = urljoin(self.base_url, '/robots.txt')
-        robots_content = self.get_page_content_with_curl(robots_url)
+        robots_content = self.get_page_content(robots_url)
         if robots_content:
             print("✓ 获取robots.txt成功")
             # 保存robots.txt
@@ -94,7 +106,7 @@ class SystemBrowserCrawler:
         
         # 2. 获取sitemap.xml
         sitemap_url = urljoin(self.base_url, '/sitemap.xml')
-        sitemap_content = self.get_page_content_with_curl(sitemap_url)
+        sitemap_content = self.get_page_content(sitemap_url)
         if sitemap_content and 'xml' in sitemap_content:
             print("✓ 获取sitemap.xml成功")
             # 保存sitemap.xml
@@ -112,17 +124,33 @@ class SystemBrowserCrawler:
             '/notice/api'
         ]
         
-        api_results = []
+        # 浏览器中捕获的请求（cdp_capture）按原方法、请求头和请求体直接重放，猜测的端点作为补充
+        captured = [replay_request(entry) for entry in load_captured()]
+        captured_urls = {request['url'] for request in captured}
+        api_urls = {request['url']: urlparse(request['url']).path for request in captured}
         for endpoint in common_endpoints:
-            api_url = urljoin(self.base_url, endpoint)
-            content = self.get_page_content_with_curl(api_url)
-            if content and len(content) > 100:  # 有实际内容
-                api_results.append((endpoint, len(content)))
+            api_urls.setdefault(urljoin(self.base_url, endpoint), endpoint)
+        
+        # 同时探测所有候选端点，按完成顺序处理
+        candidates = captured + [url for url in api_urls if url not in captured_urls]
+        api_results = []
+        auth_required = []
+        for result in self.prober.probe(candidates):
+            response = result['response']
+            if response is not None and response.ok and len(response.text) > 100:  # 有实际内容
+                api_results.append((api_urls[result['url']], len(response.text)))
+            elif response is not None and response.status_code in (401, 403) and result.get('request') is not None:
+                # 捕获文件中不保存凭据，重放的请求未登录
+                auth_required.append((api_urls[result['url']], response.status_code))
         
         if api_results:
             print("发现API端点:")
             for endpoint, size in api_results:
                 print(f"  {endpoint}: {size} 字节")
+        if auth_required:
+            print("需要认证的API端点（捕获的请求不含凭据）:")
+            for endpoint, status in auth_required:
+                print(f"  {endpoint}: {status}")
     
     def extract_pdf_links_from_content(self, content, base_url):
         """从内容中提取PDF链接"""
@@ -151,7 +179,7 @@ class SystemBrowserCrawler:
                 
                 pdf_links.append(full_url)
         
-        return list(set(pdf_links))  # 去重
+        return LinkSet(pdf_links).to_list()  # 去重（保持发现顺序）
     
     def download_pdf_file(self, pdf_url):
         """下载PDF文件"""
@@ -161,7 +189,8 @@ class SystemBrowserCrawler:
             filename = os.path.basename(parsed_url.path)
             
             if not filename or not filename.endswith('.pdf'):
-                filename = f"pdf_{int(time.time())}.pdf"
+                # 按URL生成稳定的文件名，同一秒内的多个下载不会互相覆盖
+                filename = f"pdf_{hashlib.sha1(pdf_url.encode('utf-8')).hexdigest()[:12]}.pdf"
             
             # 清理文件名
             filename = self.sanitize_filename(filename)
@@ -172,30 +201,24 @@ class SystemBrowserCrawler:
                 print(f"文件已存在: {filename}")
                 return True
             
-            # 使用curl下载
-            result = subprocess.run([
-                'curl', '-s', '-L', '-o', filepath,
-                '-H', 'User-Agent: Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                pdf_url
-            ], capture_output=True, timeout=60)
+            result = self.download_engine.download(pdf_url, filepath)
             
-            if result.returncode == 0:
-                # 检查文件大小
-                if os.path.getsize(filepath) > 100:  # 至少100字节
-                    file_size = os.path.getsize(filepath)
-                    print(f"✓ 下载成功: {filename} ({file_size} 字节)")
-                    self.downloaded_files.append({
-                        'filename': filename,
-                        'url': pdf_url,
-                        'size': file_size
-                    })
-                    return True
+            # 检查文件大小
+            file_size = result['size']
+            if file_size > 100:  # 至少100字节
+                if result['deduplicated']:
+                    print(f"✓ 下载成功: {filename} ({file_size} 字节, 内容重复，已链接到已有文件)")
                 else:
-                    os.remove(filepath)  # 删除无效文件
-                    print(f"✗ 文件太小或无效: {filename}")
-                    return False
+                    print(f"✓ 下载成功: {filename} ({file_size} 字节)")
+                self.downloaded_files.append({
+                    'filename': filename,
+                    'url': pdf_url,
+                    'size': file_size
+                })
+                return True
             else:
-                print(f"✗ 下载失败: {filename}")
+                os.remove(filepath)  # 删除无效文件
+                print(f"✗ 文件太小或无效: {filename}")
                 return False
                 
         except Exception as e:
@@ -218,7 +241,7 @@ class SystemBrowserCrawler:
             
             # 2. 获取主页面内容
             print("\n2. 获取主页面内容...")
-            main_content = self.get_page_content_with_curl(self.base_url)
+            main_content = self.get_page_content(self.base_url)
             
             if not main_content:
                 print("无法获取页面内容")
@@ -242,7 +265,6 @@ class SystemBrowserCrawler:
                 for i, pdf_url in enumerate(pdf_links, 1):
                     print(f"[{i}/{len(pdf_links)}] 下载: {pdf_url}")
                     self.download_pdf_file(pdf_url)
-                    time.sleep(1)  # 短暂暂停
             else:
                 print("未发现PDF链接")
             
@@ -256,6 +278,8 @@ class SystemBrowserCrawler:
             print("爬虫运行完成!")
             print(f"运行时间: {time.time() - start_time:.2f} 秒")
             print(f"下载文件数: {len(self.downloaded_files)}")
+            print(self.scheduler.summary())
+            print(self.session.pool_stats.summary())
             
             if self.downloaded_files:
                 print("\n下载的文件列表:")
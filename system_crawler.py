@@ -9,59 +9,37 @@ import os
 import re
 import requests
 import json
-import time
-import subprocess
 from urllib.parse import urljoin, urlparse
 from pathlib import Path
 
+from download_engine import DownloadEngine
+from link_set import LinkSet
+from blob_store import BlobStore
+from rate_limiter import get_scheduler
+from http_client import get_session
+from js_scanner import get_js_scanner, endpoint_urls
+from endpoint_cache import get_endpoint_cache, bundle_urls
+
 class SystemLevelCrawler:
     def __init__(self, base_url="https://ydydj.univsport.com/level/Levelnotice"):
         self.base_url = base_url
         self.download_dir = "downloads"
-        self.session = requests.Session()
-        self.setup_session()
+        # 进程内共享连接池（请求头取自 config.HEADERS），页面和附件复用 keep-alive 连接
+        self.session = get_session()
         self.setup_directories()
-        
-    def setup_session(self):
-        """设置请求会话"""
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-        })
+        self.scheduler = get_scheduler()
+        self.download_engine = DownloadEngine(self.session, blob_store=BlobStore(), scheduler=self.scheduler)
+        # 打包文件分析结果缓存：打包文件名不变时不重新下载和扫描
+        self.endpoint_cache = get_endpoint_cache()
         
     def setup_directories(self):
         """创建下载目录"""
         Path(self.download_dir).mkdir(exist_ok=True)
         
-    def get_page_with_curl(self, url):
-        """使用curl获取页面内容"""
-        try:
-            result = subprocess.run([
-                'curl', '-s', '-L', '-H', 'User-Agent: Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36',
-                url
-            ], capture_output=True, text=True, timeout=30)
-            
-            if result.returncode == 0:
-                return result.stdout
-            else:
-                print(f"curl命令失败: {result.stderr}")
-                return None
-        except Exception as e:
-            print(f"使用curl获取页面失败: {e}")
-            return None
-    
     def get_page_content(self, url):
-        """获取页面内容（优先使用curl）"""
-        # 先尝试使用curl
-        content = self.get_page_with_curl(url)
-        if content:
-            return content
-        
-        # 如果curl失败，使用requests
+        """获取页面内容"""
         try:
+            self.scheduler.wait(url)
             response = self.session.get(url, timeout=30)
             response.raise_for_status()
             return response.text
@@ -71,33 +49,24 @@ class SystemLevelCrawler:
     
     def analyze_javascript_file(self, js_url):
         """分析JavaScript文件，查找API端点"""
-        print(f"正在分析JavaScript文件: {js_url}")
-        
-        js_content = self.get_page_content(js_url)
-        if not js_content:
-            return []
-        
-        # 查找API端点模式
-        api_patterns = [
-            r'"(/api/[^"]+)"',
-            r'"(/level/[^"]+)"',
-            r'url:\s*["\']([^"\']+)["\']',
-            r'fetch\(["\']([^"\']+)["\']',
-            r'axios\.get\(["\']([^"\']+)["\']',
-        ]
-        
-        endpoints = []
-        for pattern in api_patterns:
-            matches = re.findall(pattern, js_content)
-            for match in matches:
-                if match.startswith('/'):
-                    full_url = urljoin(self.base_url, match)
-                    endpoints.append(full_url)
-                elif 'http' in match:
-                    endpoints.append(match)
-        
-        # 去重
-        unique_endpoints = list(set(endpoints))
+        result = self.endpoint_cache.get(js_url)
+        if result is not None:
+            print(f"打包文件未变化，使用缓存的端点: {js_url}")
+        else:
+            print(f"正在分析JavaScript文件: {js_url}")
+            try:
+                self.scheduler.wait(js_url)
+                response = self.session.get(js_url, timeout=30, stream=True)
+                response.raise_for_status()
+                # 边下载边扫描：所有端点模式一次完成，不把整个打包文件读入内存
+                result = get_js_scanner().scan_chunks(response.iter_content(64 * 1024))
+            except requests.RequestException as e:
+                print(f"获取页面失败: {js_url}, 错误: {e}")
+                return []
+            self.endpoint_cache.put(js_url, result, page=self.base_url)
+        
+        # 去重（保持发现顺序）
+        unique_endpoints = LinkSet(endpoint_urls(result['endpoints'], self.base_url)).to_list()
         
         print(f"找到 {len(unique_endpoints)} 个可能的API端点")
         for endpoint in unique_endpoints[:10]:  # 只显示前10个
@@ -113,7 +82,8 @@ class SystemLevelCrawler:
             print(f"尝试API端点: {endpoint}")
             
             try:
-                # 尝试GET请求
+                # 尝试GET请求（按主机限速，不同主机的端点互不等待）
+                self.scheduler.wait(endpoint)
                 response = self.session.get(endpoint, timeout=10)
                 
                 if response.status_code == 200:
@@ -142,14 +112,12 @@ class SystemLevelCrawler:
                     
             except Exception as e:
                 print(f"  ✗ 调用失败: {e}")
-            
-            time.sleep(0.5)  # 短暂暂停
         
         return results
     
     def extract_links_from_api_data(self, api_results):
         """从API数据中提取链接"""
-        links = []
+        links = LinkSet()
         
         for result in api_results:
             if result['type'] == 'json':
@@ -160,11 +128,11 @@ class SystemLevelCrawler:
                 # 从HTML中提取链接
                 links.extend(self.extract_links_from_text(result['data'], result['endpoint']))
         
-        return links
+        return links.to_list()
     
     def extract_links_from_text(self, text, base_url):
         """从文本中提取链接"""
-        links = []
+        links = LinkSet()
         
         # 各种链接模式
         link_patterns = [
@@ -182,14 +150,14 @@ class SystemLevelCrawler:
                 else:
                     full_url = match
                 
-                if full_url.startswith('http') and full_url not in [l['url'] for l in links]:
-                    links.append({
+                if full_url.startswith('http') and full_url not in links:
+                    links.add({
                         'url': full_url,
                         'text': self.get_link_text_from_url(full_url),
                         'source': base_url
                     })
         
-        return links
+        return links.to_list()
     
     def get_link_text_from_url(self, url):
         """从URL中提取有意义的文本"""
@@ -227,24 +195,21 @@ class SystemLevelCrawler:
             
             print(f"正在下载: {filename}")
             
-            # 使用curl下载（更稳定）
-            result = subprocess.run([
-                'curl', '-s', '-L', '-o', filepath, url
-            ], capture_output=True, timeout=60)
+            # 先写入 .part 文件，中断后再次运行会断点续传
+            result = self.download_engine.download(url, filepath)
             
-            if result.returncode == 0:
-                file_size = os.path.getsize(filepath)
-                print(f"✓ 下载完成: {filepath} ({file_size} 字节)")
-                
-                return {
-                    'filename': filename,
-                    'filepath': filepath,
-                    'size': file_size,
-                    'url': url
-                }
+            file_size = result['size']
+            if result['resumed_bytes']:
+                print(f"✓ 续传完成: {filepath} ({file_size} 字节, 续传自 {result['resumed_bytes']} 字节)")
             else:
-                print(f"✗ 下载失败: {result.stderr}")
-                return None
+                print(f"✓ 下载完成: {filepath} ({file_size} 字节)")
+            
+            return {
+                'filename': filename,
+                'filepath': filepath,
+                'size': file_size,
+                'url': url
+            }
                 
         except Exception as e:
             print(f"下载文件失败: {url}, 错误: {e}")
@@ -280,11 +245,12 @@ class SystemLevelCrawler:
         print("页面获取成功")
         
         # 分析JavaScript文件
-        js_pattern = r'src="([^"]*\.js)"'
-        js_matches = re.findall(js_pattern, first_level_html, re.IGNORECASE)
+        js_matches = bundle_urls(first_level_html, self.base_url)
+        # 页面不再引用的旧打包文件从缓存中删除
+        self.endpoint_cache.prune(self.base_url, js_matches)
         
         if js_matches:
-            js_url = urljoin(self.base_url, js_matches[0])
+            js_url = js_matches[0]
             endpoints = self.analyze_javascript_file(js_url)
             
             if endpoints:
@@ -337,6 +303,9 @@ class SystemLevelCrawler:
         else:
             print("\n未找到可下载文件")
         
+        print(self.scheduler.summary())
+        print(self.session.pool_stats.summary())
+        print(self.endpoint_cache.summary())
         print(f"\n文件保存在: {os.path.abspath(self.download_dir)}")
 
 def main():
@@ -4,13 +4,14 @@
 测试爬虫 - 用于验证网站结构和链接
 """
 
-import time
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 
+from selenium_waits import wait_until_ready
+
 class WebsiteTester:
     def __init__(self, url="https://ydydj.univsport.com/level/Levelnotice"):
         self.url = url
@@ -48,7 +49,7 @@ class WebsiteTester:
         
         # 等待JavaScript加载
         print("等待JavaScript加载...")
-        time.sleep(5)
+        wait_until_ready(self.driver, timeout=5)
         
         # 获取页面基本信息
         print("\n=== 页面基本信息 ===")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+下载引擎回归测试 - 使用 benchmark 中的本地HTTP夹具服务器，不访问目标网站
+用法: python -m unittest test_download_engine
+"""
+
+import os
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+
+import requests
+
+from benchmark import FixtureHandler, FixtureServer
+from download_engine import DownloadEngine, PART_SUFFIX, STATE_SUFFIX
+
+
+class RecordingHandler(FixtureHandler):
+    """记录每个请求的方法、Range 和 If-Range"""
+
+    def do_GET(self, head=False):
+        self.server.requests.append((self.command, self.headers.get('Range'), self.headers.get('If-Range')))
+        super().do_GET(head)
+
+
+class DownloadEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filepath = os.path.join(self.directory, 'doc.pdf')
+        # 单连接流式下载，便于检查请求头
+        self.engine = DownloadEngine(requests.Session(), max_workers=1, timeout=5)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def serve(self, **attrs):
+        server = FixtureServer(RecordingHandler, **attrs)
+        server.server.requests = []
+        return server
+
+    def expected_body(self, file_size):
+        return (b'%PDF-1.4\n' + bytes(range(256)) * (file_size // 256))[:file_size]
+
+    def test_concurrent_downloads_to_same_path(self):
+        """多个线程同时下载到同一路径：只下载一次，其余线程使用同一结果，不留下 .part 和旁路文件"""
+        file_size = 256 * 1024
+        with self.serve(latency=0.05, file_size=file_size, bandwidth=2 * 1024 * 1024) as server:
+            url = f"{server.base_url}/file/doc.pdf"
+            results, errors = [], []
+
+            def worker():
+                try:
+                    results.append(self.engine.download(url, self.filepath))
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=worker) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            gets = [request for request in server.server.requests if request[0] == 'GET']
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(result['size'] == file_size for result in results))
+        self.assertEqual(len(gets), 1)
+        with open(self.filepath, 'rb') as f:
+            self.assertEqual(f.read(), self.expected_body(file_size))
+        self.assertFalse(os.path.exists(self.filepath + PART_SUFFIX))
+        self.assertFalse(os.path.exists(self.filepath + PART_SUFFIX + STATE_SUFFIX))
+
+    def test_resume_from_part_file(self):
+        """已有 .part 和旁路文件时用 Range + If-Range 只请求剩余部分"""
+        file_size = 64 * 1024
+        body = self.expected_body(file_size)
+        etag = f'"{file_size:x}"'
+        written = 20000
+        part_path = self.filepath + PART_SUFFIX
+
+        with self.serve(latency=0, file_size=file_size) as server:
+            url = f"{server.base_url}/file/doc.pdf"
+            with open(part_path, 'wb') as f:
+                f.write(body[:written])
+            with open(part_path + STATE_SUFFIX, 'w', encoding='utf-8') as f:
+                json.dump({'url': url, 'etag': etag, 'last_modified': None, 'size': file_size,
+                           'bytes_written': written, 'parts_done': []}, f)
+
+            result = self.engine.download(url, self.filepath)
+            gets = [request for request in server.server.requests if request[0] == 'GET']
+
+        self.assertEqual(gets, [('GET', f"bytes={written}-", etag)])
+        self.assertEqual(result['resumed_bytes'], written)
+        self.assertEqual(result['size'], file_size)
+        with open(self.filepath, 'rb') as f:
+            self.assertEqual(f.read(), body)
+        self.assertFalse(os.path.exists(part_path))
+        self.assertFalse(os.path.exists(part_path + STATE_SUFFIX))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+URL工具函数 - 入队和去重时作为键使用的URL规范化
+"""
+
+import re
+from functools import lru_cache
+from urllib.parse import urlsplit, urlunsplit
+
+DEFAULT_PORTS = {'http': '80', 'https': '443'}
+PERCENT_ESCAPE = re.compile(r'%[0-9a-fA-F]{2}')
+
+
+def remove_dot_segments(path):
+    """去掉路径中的 '.' 和 '..' 段（RFC 3986 5.2.4）"""
+    if '.' not in path:
+        return path
+
+    output = []
+    segments = path.split('/')
+    for index, segment in enumerate(segments):
+        if segment == '.':
+            if index == len(segments) - 1:
+                output.append('')
+        elif segment == '..':
+            if len(output) > 1:
+                output.pop()
+            if index == len(segments) - 1:
+                output.append('')
+        else:
+            output.append(segment)
+    return '/'.join(output)
+
+
+def canonical_netloc(scheme, netloc):
+    """主机名转为小写，去掉默认端口；用户名和密码保持原样"""
+    userinfo, at, hostport = netloc.rpartition('@')
+    hostport = hostport.lower()
+    host, colon, port = hostport.rpartition(':')
+    if colon and ']' not in port:
+        if port == '' or port == DEFAULT_PORTS.get(scheme):
+            hostport = host
+    return f"{userinfo}{at}{hostport}"
+
+
+def canonical_query(query):
+    """按参数名排序查询串（同名参数保持原顺序），保留原始编码，去掉空参数"""
+    if not query:
+        return ''
+    pairs = [pair for pair in query.split('&') if pair]
+    if len(pairs) > 1:
+        pairs.sort(key=lambda pair: pair.partition('=')[0])
+    return '&'.join(pairs)
+
+
+@lru_cache(maxsize=65536)
+def canonicalize_url(url):
+    """生成规范化URL，只作为去重和已访问集合的键（请求和解析相对链接仍使用原始URL）
+
+    协议和主机名小写、去掉默认端口和片段（#...）、解析 '.' / '..' 路径段、
+    百分号编码统一为大写、去掉非根路径末尾的 '/'、查询参数按名称排序；
+    单页应用的路由片段（#/... 或 #!...）对应不同页面，予以保留
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = canonical_netloc(scheme, parts.netloc)
+
+    path = PERCENT_ESCAPE.sub(lambda match: match.group(0).upper(), parts.path)
+    path = remove_dot_segments(path)
+    if netloc and not path:
+        path = '/'
+    elif len(path) > 1 and path.endswith('/'):
+        path = path.rstrip('/') or '/'
+
+    query = canonical_query(PERCENT_ESCAPE.sub(lambda match: match.group(0).upper(), parts.query))
+    fragment = parts.fragment if parts.fragment.startswith(('/', '!')) else ''
+    return urlunsplit((scheme, netloc, path, query, fragment))
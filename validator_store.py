@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+持久化校验值存储 - 按URL保存 ETag / Last-Modified / Content-Length
+增量爬取时发送条件请求，304 响应视为“未变化”
+"""
+
+import os
+import time
+import sqlite3
+import threading
+
+from config import VALIDATOR_DB_NAME
+
+
+class ValidatorStore:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # 并发抓取时多个线程共用同一个连接，由锁保护
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS validators (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_length INTEGER,
+                updated_at REAL
+            )
+        """)
+        self._conn.commit()
+
+    @classmethod
+    def for_directory(cls, directory):
+        """在下载目录中打开（或创建）校验值数据库"""
+        return cls(os.path.join(directory, VALIDATOR_DB_NAME))
+
+    def get(self, url):
+        """获取URL的校验值，不存在时返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, content_length FROM validators WHERE url = ?", (url,)
+            ).fetchone()
+
+        if row is None:
+            return None
+        return {'etag': row[0], 'last_modified': row[1], 'content_length': row[2]}
+
+    def conditional_headers(self, url, filepath=None):
+        """生成条件请求头；指定 filepath 时本地文件必须存在，否则返回空字典"""
+        if filepath is not None and not os.path.exists(filepath):
+            return {}
+
+        validators = self.get(url)
+        if validators is None:
+            return {}
+
+        headers = {}
+        if validators['etag']:
+            headers['If-None-Match'] = validators['etag']
+        if validators['last_modified']:
+            headers['If-Modified-Since'] = validators['last_modified']
+        return headers
+
+    def update(self, url, etag=None, last_modified=None, content_length=None):
+        """保存URL的校验值；没有任何校验值时删除旧记录"""
+        with self._lock:
+            if not etag and not last_modified:
+                self._conn.execute("DELETE FROM validators WHERE url = ?", (url,))
+            else:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO validators VALUES (?, ?, ?, ?, ?)",
+                    (url, etag, last_modified, content_length, time.time())
+                )
+            self._conn.commit()
+
+    def update_from_response(self, url, response):
+        """从响应头中保存校验值"""
+        length = response.headers.get('content-length')
+        self.update(
+            url,
+            etag=response.headers.get('etag'),
+            last_modified=response.headers.get('last-modified'),
+            content_length=int(length) if length and length.isdigit() else None,
+        )
+
+    def forget(self, url):
+        """删除URL的校验值（下次会完整下载）"""
+        self.update(url)
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
@@ -7,22 +7,40 @@
 """
 
 import os
-import time
-import requests
-from selenium import webdriver
+import threading
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
 from urllib.parse import urljoin, urlparse
 import re
 from pathlib import Path
 
+from download_engine import DownloadEngine
+from blob_store import BlobStore
+from link_set import LinkSet
+from rate_limiter import get_scheduler
+from browser_pool import get_browser_pool
+from selenium_waits import wait_until_ready
+from cdp_capture import get_network_capture
+from resource_blocker import get_page_costs
+
 class LevelNoticeCrawler:
     def __init__(self, base_url="https://ydydj.univsport.com/level/Levelnotice"):
         self.base_url = base_url
         self.download_dir = "downloads"
         self.setup_directories()
+        # 每主机令牌桶限速：页面导航和附件下载按各自主机的预算放行
+        self.scheduler = get_scheduler()
+        self.download_engine = DownloadEngine(blob_store=BlobStore(), scheduler=self.scheduler)
+        # 浏览器池：第一层页面借用一个浏览器，第二层页面由池中的浏览器并行渲染
+        self.pool = get_browser_pool()
+        # CDP_CAPTURE 开启时记录页面渲染中的 XHR / fetch 请求，供之后的运行直接重放
+        self.capture = get_network_capture()
+        # 每个页面的传输字节数和加载时间
+        self.page_costs = get_page_costs()
+        # 第二层页面并行处理时登记各文件的目标路径：同一文件只下载一次，不同文件不共用同一路径
+        self.claimed_urls = LinkSet()
+        self.claimed_paths = set()
+        self.claim_lock = threading.Lock()
         self.driver = None
         self.setup_driver()
         
@@ -31,66 +49,33 @@ class LevelNoticeCrawler:
         Path(self.download_dir).mkdir(exist_ok=True)
         
     def setup_driver(self):
-        """设置Chrome浏览器驱动"""
-        chrome_options = Options()
-        chrome_options.add_argument('--headless=new')  # 使用新的无头模式
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--window-size=1920,1080')
-        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        
-        # 设置下载路径
-        prefs = {
-            "download.default_directory": os.path.abspath(self.download_dir),
-            "download.prompt_for_download": False,
-            "download.directory_upgrade": True,
-            "safebrowsing.enabled": True
-        }
-        chrome_options.add_experimental_option("prefs", prefs)
-        
-        try:
-            from webdriver_manager.chrome import ChromeDriverManager
-            from selenium.webdriver.chrome.service import Service
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-        except Exception as e:
-            print(f"使用webdriver_manager失败: {e}")
-            # 如果webdriver_manager不可用，尝试使用Chromium
-            try:
-                # 尝试使用Chromium
-                chrome_options.binary_location = '/snap/bin/chromium'
-                self.driver = webdriver.Chrome(options=chrome_options)
-                self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-            except Exception as e2:
-                print(f"使用Chromium也失败: {e2}")
-                # 最后尝试直接使用Chrome
-                try:
-                    self.driver = webdriver.Chrome(options=chrome_options)
-                    self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-                except Exception as e3:
-                    print(f"所有浏览器驱动尝试都失败: {e3}")
-                    raise
-        
+        """从浏览器池借出浏览器（池中没有空闲浏览器时启动新的Chrome）"""
+        self.driver = self.pool.acquire()
         self.driver.implicitly_wait(10)
         
-    def wait_for_page_load(self, timeout=10):
+    def release_driver(self):
+        """把第一层页面使用的浏览器归还浏览器池"""
+        if self.driver:
+            self.pool.release(self.driver)
+            self.driver = None
+        
+    def wait_for_page_load(self, timeout=10, driver=None):
         """等待页面加载完成"""
-        WebDriverWait(self.driver, timeout).until(
+        WebDriverWait(driver or self.driver, timeout).until(
             lambda driver: driver.execute_script("return document.readyState") == "complete"
         )
         
     def get_first_level_links(self):
         """获取第一层链接"""
         print("正在访问目标网站...")
+        self.scheduler.wait(self.base_url)
         self.driver.get(self.base_url)
         self.wait_for_page_load()
         
-        # 等待页面内容加载（针对SPA应用）
-        time.sleep(5)
+        # 等待页面内容加载（针对SPA应用）：网络空闲且DOM静止后继续，最多5秒
+        wait_until_ready(self.driver, timeout=5)
+        self.capture.collect(self.driver)
+        self.page_costs.record(self.driver)
         
         print("正在查找第一层链接...")
         
@@ -116,13 +101,7 @@ class LevelNoticeCrawler:
                 print(f"查找选择器 {selector} 时出错: {e}")
         
         # 去重
-        unique_links = []
-        seen_urls = set()
-        
-        for link in first_level_links:
-            if link['url'] not in seen_urls:
-                unique_links.append(link)
-                seen_urls.add(link['url'])
+        unique_links = LinkSet(first_level_links).to_list()
         
         print(f"找到 {len(unique_links)} 个第一层链接")
         return unique_links
@@ -192,23 +171,24 @@ class LevelNoticeCrawler:
         
         return True
     
-    def crawl_second_level(self, first_level_link):
-        """爬取第二层页面"""
+    def crawl_second_level(self, driver, first_level_link):
+        """在池中的浏览器上爬取第二层页面（直接打开URL，不再点击后返回第一层页面）"""
         print(f"\n正在访问第二层页面: {first_level_link['text']}")
         print(f"URL: {first_level_link['url']}")
         
         try:
-            # 点击链接进入第二层页面
-            if first_level_link.get('element'):
-                first_level_link['element'].click()
-            else:
-                self.driver.get(first_level_link['url'])
+            # 与第一层页面相同的隐式等待（归还时浏览器池恢复为创建时的值）
+            driver.implicitly_wait(10)
+            self.scheduler.wait(first_level_link['url'])
+            driver.get(first_level_link['url'])
             
-            self.wait_for_page_load()
-            time.sleep(3)  # 等待页面加载
+            self.wait_for_page_load(driver=driver)
+            wait_until_ready(driver, timeout=3)  # 等待页面渲染完成
+            self.capture.collect(driver)
+            self.page_costs.record(driver)
             
             # 查找可下载文件
-            download_links = self.find_download_links()
+            download_links = self.find_download_links(driver)
             
             # 下载文件
             downloaded_files = []
@@ -222,12 +202,8 @@ class LevelNoticeCrawler:
         except Exception as e:
             print(f"爬取第二层页面时出错: {e}")
             return []
-        finally:
-            # 返回第一层页面
-            self.driver.back()
-            self.wait_for_page_load()
     
-    def find_download_links(self):
+    def find_download_links(self, driver=None):
         """在第二层页面中查找下载链接"""
         download_selectors = [
             "a[href*='.pdf']",
@@ -244,7 +220,7 @@ class LevelNoticeCrawler:
         
         for selector in download_selectors:
             try:
-                elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
+                elements = (driver or self.driver).find_elements(By.CSS_SELECTOR, selector)
                 for element in elements:
                     url = element.get_attribute("href")
                     if url and self.is_downloadable(url):
@@ -258,13 +234,7 @@ class LevelNoticeCrawler:
                 print(f"查找下载链接 {selector} 时出错: {e}")
         
         # 去重
-        unique_downloads = []
-        seen_urls = set()
-        
-        for link in download_links:
-            if link['url'] not in seen_urls:
-                unique_downloads.append(link)
-                seen_urls.add(link['url'])
+        unique_downloads = LinkSet(download_links).to_list()
         
         print(f"找到 {len(unique_downloads)} 个可下载文件")
         return unique_downloads
@@ -284,34 +254,41 @@ class LevelNoticeCrawler:
             category_dir = os.path.join(self.download_dir, self.sanitize_filename(category_name))
             Path(category_dir).mkdir(exist_ok=True)
             
-            filepath = os.path.join(category_dir, filename)
+            filepath = self.claim_path(os.path.join(category_dir, filename), url)
+            if filepath is None:
+                print(f"已由其他页面下载，跳过: {filename}")
+                return None
+            filename = os.path.basename(filepath)
             
             print(f"正在下载: {filename}")
             
-            # 使用requests下载文件
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            
-            response = requests.get(url, headers=headers, stream=True)
-            response.raise_for_status()
-            
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
+            # 使用共享下载引擎（大文件自动分块并行下载）
+            result = self.download_engine.download(url, filepath)
             
             print(f"✓ 下载完成: {filepath}")
             return {
                 'filename': filename,
                 'filepath': filepath,
-                'size': os.path.getsize(filepath)
+                'size': result['size']
             }
             
         except Exception as e:
             print(f"下载文件时出错: {e}")
             return None
     
+    def claim_path(self, filepath, url):
+        """登记 url 的目标路径：同一URL已登记过时返回 None，路径已被其他URL占用时加编号"""
+        name, ext = os.path.splitext(filepath)
+        number = 1
+        with self.claim_lock:
+            if not self.claimed_urls.add(url):
+                return None
+            while filepath in self.claimed_paths:
+                number += 1
+                filepath = f"{name}_{number}{ext}"
+            self.claimed_paths.add(filepath)
+        return filepath
+    
     def get_filename_from_url(self, url, link_text):
         """从URL或链接文本中提取文件名"""
         # 从URL中提取文件名
@@ -360,13 +337,16 @@ class LevelNoticeCrawler:
             for i, link in enumerate(first_level_links, 1):
                 print(f"{i}. {link['text']} - {link['url']}")
             
-            # 爬取第二层页面并下载文件
+            # 第一层页面已处理完，归还浏览器，第二层页面放入工作队列由浏览器池并行渲染
+            self.release_driver()
+            results = self.pool.map(self.crawl_second_level, first_level_links, default=list)
+            
+            # 按链接顺序显示下载结果
             total_downloaded = 0
             
-            for i, link in enumerate(first_level_links, 1):
+            for i, (link, downloaded_files) in enumerate(zip(first_level_links, results), 1):
                 print(f"\n[{i}/{len(first_level_links)}] 处理链接: {link['text']}")
                 
-                downloaded_files = self.crawl_second_level(link)
                 total_downloaded += len(downloaded_files)
                 
                 # 显示下载结果
@@ -376,14 +356,18 @@ class LevelNoticeCrawler:
                         print(f"    ✓ {file_info['filename']} ({file_info['size']} bytes)")
                 else:
                     print("  未找到可下载文件")
-                
-                # 短暂暂停，避免请求过快
-                time.sleep(2)
             
             print(f"\n" + "=" * 60)
             print(f"爬虫运行完成!")
             print(f"总共处理了 {len(first_level_links)} 个第一层链接")
             print(f"总共下载了 {total_downloaded} 个文件")
+            print(self.scheduler.summary())
+            print(self.download_engine.session.pool_stats.summary())
+            print(self.pool.summary())
+            print(self.page_costs.summary())
+            if self.capture.enabled:
+                self.capture.save()
+                print(self.capture.summary())
             print(f"文件保存在: {os.path.abspath(self.download_dir)}")
             print("=" * 60)
             
@@ -393,10 +377,10 @@ class LevelNoticeCrawler:
             self.close()
     
     def close(self):
-        """关闭浏览器驱动"""
+        """归还浏览器（浏览器池在进程退出时关闭所有浏览器）"""
         if self.driver:
-            self.driver.quit()
-            print("浏览器已关闭")
+            self.release_driver()
+            print("浏览器已归还浏览器池")
 
 def main():
     """主函数"""